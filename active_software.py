@@ -25,9 +25,16 @@
 import os
 import re
 import sys
-import json
+import time
 
-from .os_util import os_info, conform_path_slash
+from .os_util import os_info, fslash, conform_path_slash, expand_env_vars
+from .events import SNAPSHOT_BUILT, emit_event, has_event_callbacks
+from .env_expansion import compile_template
+from .resolve_cache import get_fs_dep_state
+from .install_probe import get_install_probe
+from .sw_env_index import get_sw_env_index
+from .spec_includes import get_spec_include_resolver
+from .sw_version import VersionFormat
 
 
 if sys.version_info.major >= 3:
@@ -46,7 +53,13 @@ class ActiveSoftwareSnapshot(object):
     VER_TOKEN_REGEX = re.compile(VER_TOKEN_PATTERN)
 
     def __init__(self, active_sw_list, sw_defs_d, prj_code, prj_sw_versions_d,
-                 path_slash=None):
+                 path_slash=None, env_d=None):
+
+        start_t = time.perf_counter()
+
+        # environment that ${...} in install locations is expanded against,
+        # defaults to os.environ
+        self.env_d = env_d
 
         self.active_sw_list = active_sw_list
         self.active_sw_name_list = [sw_name.split('@')[0] for sw_name in
@@ -60,8 +73,79 @@ class ActiveSoftwareSnapshot(object):
         self.sw_info_is_generated = False
         self.sw_need_version_list = None
 
+        # state of every file and folder looked at while building the
+        # snapshot and its env spec, keyed by path (see resolve_cache)
+        self.fs_deps = {}
+        # existence of install location candidates, by path
+        self.probe_deps = {}
+
+        # seconds taken to load each active sw package's env spec, and the
+        # env spec list of each, filled in by get_active_sw_env_spec() ...
+        # the spec lists are shared with snapshots derived from this one, so
+        # are never changed once built
+        self.spec_load_secs_by_sw = {}
+        self.env_spec_list_by_sw = {}
+
         self.active_sw_defs_d = self._build_active_sw_info(sw_defs_d)
 
+        if has_event_callbacks(SNAPSHOT_BUILT):
+            emit_event(SNAPSHOT_BUILT, {
+                'active_sw_count': len(self.info_by_active_sw),
+                'probe_count': len(self.probe_deps),
+                'secs': time.perf_counter() - start_t,
+            })
+
+    @classmethod
+    def from_sw_info(cls, active_sw_list, info_by_active_sw, prj_code,
+                     prj_sw_versions_d, path_slash=None):
+
+        # Snapshot rebuilt from already evaluated sw info (e.g. from a
+        # resolved env bundle) without looking at any sw definitions,
+        # install locations or spec files. info_by_active_sw is as given by
+        # get_portable_sw_info(), so without the compiled version objects
+        snapshot = cls.__new__(cls)
+
+        snapshot.env_d = None
+        snapshot.active_sw_list = active_sw_list
+        snapshot.active_sw_name_list = [sw_name.split('@')[0] for sw_name in
+                                                            active_sw_list]
+        snapshot.sw_versions_d = prj_sw_versions_d
+        snapshot.prj_code = prj_code
+        snapshot.path_slash = path_slash if path_slash is not None else os.sep
+
+        snapshot.fs_deps = {}
+        snapshot.probe_deps = {}
+        snapshot.spec_load_secs_by_sw = {}
+        snapshot.env_spec_list_by_sw = {}
+        snapshot.active_sw_defs_d = None
+
+        snapshot.info_by_active_sw = {}
+        for (active_sw, portable_info) in info_by_active_sw.items():
+            sw_info = dict(portable_info)
+            sw_info['version_regex'] = None
+            sw_info['parsed_version'] = None
+            if not sw_info['is_dev_install']:
+                version_format = VersionFormat.get(sw_info['version_format'])
+                sw_info['version_regex'] = version_format.regex
+                sw_info['parsed_version'] = version_format.parse(
+                                            sw_info['version_info']['VER'])
+            snapshot.info_by_active_sw[active_sw] = sw_info
+
+        snapshot.sw_need_version_list = [
+            sw for sw in snapshot.info_by_active_sw.keys()
+                if not snapshot.info_by_active_sw[sw]['is_dev_install']]
+        snapshot.sw_info_is_generated = True
+
+        return snapshot
+
+    def get_portable_sw_info(self):
+
+        # info_by_active_sw without the compiled regex and version objects,
+        # so it can be written to JSON
+        return {active_sw: {k: v for (k, v) in sw_info.items()
+                                if k not in ('version_regex', 'parsed_version')}
+                    for (active_sw, sw_info) in self.info_by_active_sw.items()}
+
     def get_active_sw_names(self):
 
         return self.active_sw_name_list
@@ -96,27 +180,15 @@ class ActiveSoftwareSnapshot(object):
             raise Exception(
                 'No version or dev tag specified for sw "%s"' % sw_name)
 
-    def is_sw_dev_installed(self, sw_name):
-
-        return self.info_by_active_sw[sw_name]['is_dev_install']
-
-    def _build_version_format_regex(self, version_format_str):
+    def get_sw_parsed_version(self, sw_name):
 
-        replace_d = {
-            '.': '\\.',
-            '{MAJOR}': '(?P<MAJOR>[a-zA-Z0-9\-_]+)',
-            '{MINOR}': '(?P<MINOR>[a-zA-Z0-9\-_]+)',
-            '{BUILD}': '(?P<BUILD>[a-zA-Z0-9\-_]+)',
-            '{REVISION}': '(?P<REVISION>[a-zA-Z0-9\-_]+)',
-        }
+        # SwVersion (see sw_version) of the active sw, comparable with other
+        # parsed versions ... None for direct path dev installs
+        return self.info_by_active_sw[sw_name]['parsed_version']
 
-        version_regex_pattern = '^%s$' % version_format_str
-
-        for replace_key in replace_d.keys():
-            version_regex_pattern = version_regex_pattern.replace(
-                                        replace_key, replace_d[replace_key])
+    def is_sw_dev_installed(self, sw_name):
 
-        return (version_regex_pattern, re.compile(version_regex_pattern))
+        return self.info_by_active_sw[sw_name]['is_dev_install']
 
     def _expand_embedded_dependant_sw_versions(self, input_str):
 
@@ -170,6 +242,12 @@ class ActiveSoftwareSnapshot(object):
 
         return out_str
 
+    def _expandvars(self, path):
+
+        if self.env_d is None:
+            return os.path.expandvars(path)
+        return expand_env_vars(path, self.env_d)
+
     def _get_specific_install_location(self, install_loc_d):
 
         raw_install_loc = None
@@ -178,18 +256,18 @@ class ActiveSoftwareSnapshot(object):
             if os_specificity in install_loc_d:
                 value = install_loc_d[os_specificity]
                 if type(value) is list:
-                    raw_install_loc = [os.path.expandvars(p) for p in value]
+                    raw_install_loc = [self._expandvars(p) for p in value]
                 else:
                     # otherwise assume it is a string value for location
-                    raw_install_loc = os.path.expandvars(value)
+                    raw_install_loc = self._expandvars(value)
                 break
         if not raw_install_loc and '_all' in install_loc_d:
             value = install_loc_d['_all']
             if type(value) is list:
-                raw_install_loc = [os.path.expandvars(p) for p in value]
+                raw_install_loc = [self._expandvars(p) for p in value]
             else:
                 # otherwise assume it is a string value for location
-                raw_install_loc = os.path.expandvars(value)
+                raw_install_loc = self._expandvars(value)
 
         return raw_install_loc
 
@@ -226,7 +304,7 @@ class ActiveSoftwareSnapshot(object):
                         )
                     override_version = bits[1]
                     path_by_os_spec = {
-                        os_spec: os.path.expandvars(path)
+                        os_spec: self._expandvars(path)
                         for (os_spec, path) in
                             [entry.split('=') for entry in bits[2].split(',')]
                     }
@@ -262,9 +340,13 @@ class ActiveSoftwareSnapshot(object):
                     'Install location for os "%s" is not defined'
                     ' for software "%s"' % (os_info.os, active_sw))
 
+            ver_pattern = None
+            ver_regex = None
             if not is_dev_install:
-                ver_pattern, ver_regex = self._build_version_format_regex(
-                                                    sw_def['version_format'])
+                # compiled once per process for each distinct format
+                version_format = VersionFormat.get(sw_def['version_format'])
+                ver_pattern = version_format.pattern
+                ver_regex = version_format.regex
 
             self.info_by_active_sw[active_sw] = {
                 'install_location': raw_install_loc,
@@ -280,6 +362,7 @@ class ActiveSoftwareSnapshot(object):
             if is_dev_install:
                 self.info_by_active_sw[active_sw]['version_info'] = {
                                                     'VER': override_version}
+                self.info_by_active_sw[active_sw]['parsed_version'] = None
         # end of "for active_sw ..."
 
         # Now loop through info_by_active_sw dict to capture version numbers
@@ -307,17 +390,16 @@ class ActiveSoftwareSnapshot(object):
             else:
                 version = self.sw_versions_d[active_sw]
 
-            regex_result = sw_info['version_regex'].match(version)
-            if not regex_result:
+            sw_version = VersionFormat.get(
+                                sw_info['version_format']).parse(version)
+            if sw_version is None:
                 raise Exception(
                     'Version "%s" provided for sw "%s" is not valid - the '
                     'regex pattern for its formatting is "%s"' % (
                             version, active_sw, sw_info['version_pattern']))
 
-            version_info = {'VER': version}
-            version_info.update(regex_result.groupdict())
-
-            sw_info['version_info'] = version_info
+            sw_info['version_info'] = sw_version.info
+            sw_info['parsed_version'] = sw_version
 
         # Loop through and expand install loction paths with version info and
         # dependant sw version info
@@ -326,12 +408,14 @@ class ActiveSoftwareSnapshot(object):
             install_loc = sw_info['install_location']
 
             if type(install_loc) is list:
-                for raw_install_loc_str in install_loc:
-                    install_loc_str = \
-                        self._evaluate_install_loc_str(raw_install_loc_str,
-                                                       active_sw, sw_info)
-                    if os.path.isdir(install_loc_str):
-                        break
+                install_loc_str_list = [
+                    self._evaluate_install_loc_str(raw_install_loc_str,
+                                                   active_sw, sw_info)
+                        for raw_install_loc_str in install_loc]
+                # first existing candidate, or the last one if none exist
+                install_loc_str = (
+                        self._find_first_install_dir(install_loc_str_list)
+                            or install_loc_str_list[-1])
             else:
                 # just have a straight str here ...
                 install_loc_str = \
@@ -342,6 +426,65 @@ class ActiveSoftwareSnapshot(object):
 
         self.sw_info_is_generated = True
 
+    def _get_fs_dep_state(self, path):
+
+        fs_dep_state = get_fs_dep_state(path)
+        self.fs_deps[path] = fs_dep_state
+        return fs_dep_state
+
+    def _isdir(self, path):
+
+        return self._get_fs_dep_state(path) == 'dir'
+
+    def _find_sw_envs_spec_file(self, sw_name, try_spec_filename_list):
+
+        # candidates under ENVR_CFG_SW_ENVS_ROOT are looked up in the index
+        # of that folder (see sw_env_index), which saves stat'ing the less
+        # specific candidates after the file it finds
+        sw_envs_root = (os.environ if self.env_d is None
+                            else self.env_d).get('ENVR_CFG_SW_ENVS_ROOT')
+        indexed_filepath = get_sw_env_index(sw_envs_root).find_env_spec_file(
+                                            sw_name, try_spec_filename_list)
+
+        # if the index has nothing, or turns out to be out of date, fall
+        # back to checking for the files directly
+        check_directly = indexed_filepath is None
+
+        for try_spec_filename in try_spec_filename_list:
+            if not try_spec_filename:
+                continue
+            try_spec_filepath = '%s/%s/%s' % (sw_envs_root, sw_name,
+                                              try_spec_filename)
+            if check_directly or \
+                    fslash(try_spec_filepath) == indexed_filepath:
+                if self._isfile(try_spec_filepath):
+                    return try_spec_filepath
+                check_directly = True
+            elif self._isfile(try_spec_filepath):
+                # a more specific candidate, not there according to the
+                # index, but the index is only re-checked every so often ...
+                # what is found here is what a cached resolve depends on
+                return try_spec_filepath
+
+        return None
+
+    def _find_first_install_dir(self, path_list):
+
+        # install location candidates are probed concurrently, with a
+        # timeout and a host-local cache (see install_probe)
+        isdir_list = get_install_probe().probe_dirs(path_list)
+        self.probe_deps.update(zip(path_list, isdir_list))
+
+        for (path, isdir) in zip(path_list, isdir_list):
+            if isdir:
+                return path
+        return None
+
+    def _isfile(self, path):
+
+        # file states are recorded as [mtime, size], folders as 'dir'
+        return type(self._get_fs_dep_state(path)) is list
+
     def _evaluate_install_loc_str(self, install_loc_str, active_sw, sw_info):
 
         # first expand dependant software version tags, e.g.
@@ -358,36 +501,32 @@ class ActiveSoftwareSnapshot(object):
 
         return install_loc_str
 
-    def _expand_includes(self, env_spec_dirpath, env_spec_list):
+    def _expand_includes(self, env_spec_filepath, env_spec_list):
 
-        new_env_spec_list = []
-
-        for spec_entry in env_spec_list:
-            if 'INCLUDES' in spec_entry:
-                # read list of include .json files to read and add spec to list
-                for include_path in spec_entry['INCLUDES']:
-                    if include_path[0] == '.':  # relative path "./" or "../"
-                        include_path = '%s/%s' % (env_spec_dirpath,
-                                                  include_path)
-                    with open(include_path, 'r') as in_fp:
-                        inc_spec_list = json.load(in_fp)
-
-                    new_env_spec_list += inc_spec_list
-            else:
-                new_env_spec_list.append(spec_entry)
-
-        return new_env_spec_list
+        # nested INCLUDES are resolved too, and parsed include files are
+        # shared across snapshots (see spec_includes)
+        return get_spec_include_resolver().resolve(
+                        env_spec_filepath, env_spec_list,
+                        self._get_fs_dep_state)
 
     def _process_var_name_embedded_dependent_versions(self, spec_list):
 
+        # Returns spec_list with "[@sw:{...}]" tokens in env var names
+        # expanded. Specs (and groups) that change are replaced by updated
+        # copies, so spec lists shared between snapshots are left as-is.
+        new_spec_list = []
         for spec in spec_list:
             if type(spec) is not dict:
+                new_spec_list.append(spec)
                 continue
 
             if 'group' in spec:
                 # need to process group's own spec_list
-                self._process_var_name_embedded_dependent_versions(
+                spec = dict(spec)
+                spec['spec_list'] = \
+                    self._process_var_name_embedded_dependent_versions(
                                                         spec['spec_list'])
+                new_spec_list.append(spec)
                 continue
 
             var_name_key = None
@@ -404,90 +543,167 @@ class ActiveSoftwareSnapshot(object):
                     new_evar_name = \
                         self._process_str_with_embedded_dependent_sw_versions(
                                                                     evar_name)
+                    spec = dict(spec)
                     spec[var_name_key] = new_evar_name
 
-    def get_active_sw_env_spec(self):
+            new_spec_list.append(spec)
+
+        return new_spec_list
+
+    def _get_reusable_env_spec_lists(self, info_by_active_sw):
+
+        # env spec lists of this snapshot that another snapshot, with sw
+        # info info_by_active_sw, would load identically ... same install
+        # location and version gives the same spec file and the same
+        # ${@...} expansions
+        reusable_by_sw = {}
+        for (sw_name, sw_info) in info_by_active_sw.items():
+            if sw_name not in self.env_spec_list_by_sw:
+                continue
+            prev_sw_info = self.info_by_active_sw.get(sw_name)
+            if prev_sw_info is None:
+                continue
+            if [prev_sw_info['install_location'], prev_sw_info['version_info'],
+                    prev_sw_info['is_dev_install']] == \
+                        [sw_info['install_location'], sw_info['version_info'],
+                            sw_info['is_dev_install']]:
+                reusable_by_sw[sw_name] = self.env_spec_list_by_sw[sw_name]
+
+        return reusable_by_sw
+
+    def get_active_sw_env_spec(self, max_workers=None, prev_snapshot=None):
+
+        # With max_workers > 1 (default from ENVR_SW_SPEC_LOAD_WORKERS) the
+        # env spec files of the active sw packages, and their includes, are
+        # loaded on a thread pool. Either way the per-package results are
+        # merged in info_by_active_sw order.
+        #
+        # With prev_snapshot (a snapshot that already loaded its env specs)
+        # the spec lists of packages that are the same in both are reused
+        # instead of loaded again.
+        if max_workers is None:
+            max_workers = int(os.getenv('ENVR_SW_SPEC_LOAD_WORKERS', '1'))
+
+        sw_name_list = list(self.info_by_active_sw.keys())
+        self.spec_load_secs_by_sw = {}
+        self.env_spec_list_by_sw = {}
+
+        if prev_snapshot is not None:
+            self.env_spec_list_by_sw.update(
+                    prev_snapshot._get_reusable_env_spec_lists(
+                                                    self.info_by_active_sw))
+            # states of the files the reused spec lists were loaded from
+            self.fs_deps.update(prev_snapshot.fs_deps)
+            for sw_name in self.env_spec_list_by_sw.keys():
+                self.spec_load_secs_by_sw[sw_name] = 0.0
+
+        load_sw_name_list = [sw_name for sw_name in sw_name_list
+                                if sw_name not in self.env_spec_list_by_sw]
+
+        if max_workers > 1 and len(load_sw_name_list) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                sw_env_spec_list_list = list(executor.map(
+                                            self._get_timed_sw_env_spec,
+                                            load_sw_name_list))
+        else:
+            sw_env_spec_list_list = [self._get_timed_sw_env_spec(sw_name)
+                                        for sw_name in load_sw_name_list]
+
+        self.env_spec_list_by_sw.update(zip(load_sw_name_list,
+                                            sw_env_spec_list_list))
 
         env_spec_list = []
+        for sw_name in sw_name_list:
+            env_spec_list += self.env_spec_list_by_sw[sw_name]
+
+        return self._process_var_name_embedded_dependent_versions(
+                                                            env_spec_list)
 
-        for sw_name in self.info_by_active_sw.keys():
-            sw_info = self.info_by_active_sw[sw_name]
-            sw_name_upper = sw_name.upper()
+    def _get_timed_sw_env_spec(self, sw_name):
 
+        start_t = time.time()
+        try:
+            return self._get_sw_env_spec(sw_name)
+        finally:
+            self.spec_load_secs_by_sw[sw_name] = time.time() - start_t
+
+    def _get_sw_env_spec(self, sw_name):
+
+        env_spec_list = []
+
+        sw_info = self.info_by_active_sw[sw_name]
+        sw_name_upper = sw_name.upper()
+
+        env_spec_list.append({
+            'var': 'ENVR_SW_%s__INSTALL' % sw_name.upper(), 
+            'value': sw_info['install_location']
+        })
+        # DEBUG
+        try:
             env_spec_list.append({
-                'var': 'ENVR_SW_%s__INSTALL' % sw_name.upper(), 
-                'value': sw_info['install_location']
+                'var': 'ENVR_SW_%s__VER' % sw_name.upper(), 
+                'value': sw_info['version_info']['VER']
             })
-            # DEBUG
-            try:
-                env_spec_list.append({
-                    'var': 'ENVR_SW_%s__VER' % sw_name.upper(), 
-                    'value': sw_info['version_info']['VER']
-                })
-            except:
-                print('')
-                print('sw_info: %s' % sw_info)
-                print('')
-                raise
-
-            if not sw_info['is_dev_install']:
-                # ver_part_key_list = ['MAJOR', 'MINOR', 'BUILD', 'REVISION']
-                ver_part_key_list = ['MAJOR', 'MINOR']
-                for ver_part_key in ver_part_key_list:
-                    if ver_part_key in sw_info['version_info']:
-                        env_spec_list.append({
-                            'var': 'ENVR_SW_%s__V%s' % (sw_name_upper,
-                                                       ver_part_key), 
-                            'value': sw_info['version_info'][ver_part_key],
-                        })
-                # if 'MAJOR' in sw_info['version_info'] and \
-                #         'MINOR' in sw_info['version_info']:
-                #     mm_value = '%s%s' % (sw_info['version_info']['MAJOR'],
-                #                         sw_info['version_info']['MINOR'])
-                #     env_spec_list.append({
-                #         'var':'ENVR_SW_%s__VMM' % sw_name.upper(), 
-                #         'value': mm_value
-                #     })
-
-            # Find env spec JSON file ... first look at root of install
-            # location for the given active sw ...
-            env_spec_filepath = ('%s/envrunner_env.json' %
-                                            sw_info['install_location'])
-            install_env_spec_filepath = env_spec_filepath
-
-            if not os.path.isfile(env_spec_filepath):
-                env_spec_filepath = None
-                # fall back to central sw_envs
-                try_spec_filename_list = [
-                    '%s_%s_env.json' % (sw_name,
-                                        sw_info['version_info']['VER']),
-                    ('%s_%s_env.json' % (sw_name,
-                                         sw_info['version_info']['MAJOR'])
-                            if 'MAJOR' in sw_info['version_info']
-                            else None),
-                    '%s_env.json' % sw_name,
-                ]
-                for try_spec_filename in try_spec_filename_list:
-                    try_spec_filepath = '%s/%s/%s' % (
-                            os.getenv('ENVR_CFG_SW_ENVS_ROOT'),
-                            sw_name, try_spec_filename)
-                    if os.path.isfile(try_spec_filepath):
-                        env_spec_filepath = try_spec_filepath
-                        break
-
-            if not env_spec_filepath:
-                raise Exception('Unable to find env spec config file for '
-                                'sw named "%s" (install env spec: %s)' %
-                                (sw_name, install_env_spec_filepath))
-
-            with open(env_spec_filepath, 'r') as env_spec_fp:
-                env_spec_dirpath = os.path.dirname(env_spec_filepath)
-                loaded_env_spec_list = self._expand_includes(env_spec_dirpath,
-                                                    json.load(env_spec_fp))
-                env_spec_list += self._expand_sw_at_tags_in_env_var_values(
-                                        sw_name, loaded_env_spec_list)
-
-        self._process_var_name_embedded_dependent_versions(env_spec_list)
+        except:
+            print('')
+            print('sw_info: %s' % sw_info)
+            print('')
+            raise
+
+        if not sw_info['is_dev_install']:
+            # ver_part_key_list = ['MAJOR', 'MINOR', 'BUILD', 'REVISION']
+            ver_part_key_list = ['MAJOR', 'MINOR']
+            for ver_part_key in ver_part_key_list:
+                if ver_part_key in sw_info['version_info']:
+                    env_spec_list.append({
+                        'var': 'ENVR_SW_%s__V%s' % (sw_name_upper,
+                                                   ver_part_key), 
+                        'value': sw_info['version_info'][ver_part_key],
+                    })
+            # if 'MAJOR' in sw_info['version_info'] and \
+            #         'MINOR' in sw_info['version_info']:
+            #     mm_value = '%s%s' % (sw_info['version_info']['MAJOR'],
+            #                         sw_info['version_info']['MINOR'])
+            #     env_spec_list.append({
+            #         'var':'ENVR_SW_%s__VMM' % sw_name.upper(), 
+            #         'value': mm_value
+            #     })
+
+        # Find env spec JSON file ... first look at root of install
+        # location for the given active sw ...
+        env_spec_filepath = ('%s/envrunner_env.json' %
+                                        sw_info['install_location'])
+        install_env_spec_filepath = env_spec_filepath
+
+        if not self._isfile(env_spec_filepath):
+            env_spec_filepath = None
+            # fall back to central sw_envs
+            try_spec_filename_list = [
+                '%s_%s_env.json' % (sw_name,
+                                    sw_info['version_info']['VER']),
+                ('%s_%s_env.json' % (sw_name,
+                                     sw_info['version_info']['MAJOR'])
+                        if 'MAJOR' in sw_info['version_info']
+                        else None),
+                '%s_env.json' % sw_name,
+            ]
+            env_spec_filepath = self._find_sw_envs_spec_file(
+                                                sw_name,
+                                                try_spec_filename_list)
+
+        if not env_spec_filepath:
+            raise Exception('Unable to find env spec config file for '
+                            'sw named "%s" (install env spec: %s)' %
+                            (sw_name, install_env_spec_filepath))
+
+        env_spec_file_state = self.fs_deps.get(env_spec_filepath)
+        loaded_env_spec_list = self._expand_includes(
+                env_spec_filepath,
+                get_spec_include_resolver().load_spec_file(
+                                    env_spec_filepath, env_spec_file_state))
+        env_spec_list += self._expand_sw_at_tags_in_env_var_values(
+                                sw_name, loaded_env_spec_list)
 
         return env_spec_list
 
@@ -500,7 +716,9 @@ class ActiveSoftwareSnapshot(object):
             return
 
         def _expand_esw_at(s):
-            return s.replace('${@', '${ENVR_SW_%s__' % sw_caps_name)
+            if '${@' not in s:
+                return s
+            return compile_template(s).render_sw_at_refs(sw_caps_name)
 
         # value can be a string, a list of strings, or a dict with values
         # that can be a string, or list
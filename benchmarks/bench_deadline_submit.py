@@ -0,0 +1,178 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import json
+import time
+import getopt
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.renderfarm.deadline_submitters import (
+    DeadlineWebServiceSubmitter
+)
+from envrunner.renderfarm.stub_deadline_webservice import (
+    StubDeadlineWebService
+)
+
+
+def usage():
+
+    print('')
+    print('  Usage: python %s [OPTIONS]' % os.path.basename(sys.argv[0]))
+    print('')
+    print('      Measures Deadline Web Service job submission throughput,')
+    print('      with a new connection per job against pooled keep-alive')
+    print('      connections. Runs against a local stand-in web service')
+    print('      unless a URL is given.')
+    print('')
+    print('      OPTIONS')
+    print('      -------')
+    print('         -h | --help ... print this usage message and exit')
+    print('         -j | --json ... print results as JSON')
+    print('         -n <count> | --jobs=<count> ... jobs per mode '
+          '(default: 200)')
+    print('         -c <count> | --connections=<count> ... pool size '
+          '(default: 4)')
+    print('         -d <ms> | --delay=<ms> ... stand-in web service response')
+    print('                                    delay per job (default: 5)')
+    print('         -u <url> | --url=<url> ... submit to this (real) Deadline')
+    print('                                    Web Service instead ... jobs')
+    print('                                    are submitted suspended')
+    print('')
+
+
+def build_job_d(job_idx):
+
+    return {
+        'job_info': {'Name': '[ENVRUNNER submit benchmark] job %s' % job_idx,
+                     'Plugin': 'ENVRTaskRunner', 'Frames': '1001',
+                     'InitialStatus': 'Suspended'},
+        'plugin_info': {'Version': 3.7},
+        'job_info_file': '',
+        'plugin_info_file': '',
+        'aux_files': [],
+    }
+
+
+def time_submissions(url, job_count, max_connections, keep_alive):
+
+    submitter = DeadlineWebServiceSubmitter(url,
+                                            max_connections=max_connections,
+                                            keep_alive=keep_alive)
+    job_d_list = [build_job_d(job_idx) for job_idx in range(job_count)]
+    try:
+        start_t = time.time()
+        job_id_list = submitter.submit_jobs(job_d_list)
+        secs = time.time() - start_t
+    finally:
+        submitter.close()
+
+    return {
+        'jobs': job_count,
+        'failed': job_id_list.count(None),
+        'secs': secs,
+        'jobs_per_sec': job_count / secs if secs else 0.0,
+        'pool_stats': submitter.pool.stats,
+    }
+
+
+if __name__ == '__main__':
+
+    short_opt_str = 'hjn:c:d:u:'
+    long_opt_list = ['help', 'json', 'jobs=', 'connections=', 'delay=',
+                     'url=']
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
+    except getopt.GetoptError as err:
+        print('')
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    as_json = False
+    job_count = 200
+    max_connections = 4
+    delay_ms = 5.0
+    url = None
+
+    for o, a in opts:
+        if o in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif o in ('-j', '--json'):
+            as_json = True
+        elif o in ('-n', '--jobs'):
+            job_count = int(a)
+        elif o in ('-c', '--connections'):
+            max_connections = int(a)
+        elif o in ('-d', '--delay'):
+            delay_ms = float(a)
+        elif o in ('-u', '--url'):
+            url = a
+
+    stub = None
+    if url is None:
+        stub = StubDeadlineWebService(response_delay=delay_ms / 1000.0).start()
+        url = stub.url
+
+    mode_list = [
+        ('new_connection_per_job', 1, False),
+        ('keep_alive', 1, True),
+        ('keep_alive_pool', max_connections, True),
+    ]
+
+    try:
+        results = {}
+        for (mode, connections, keep_alive) in mode_list:
+            results[mode] = time_submissions(url, job_count, connections,
+                                             keep_alive)
+    finally:
+        if stub is not None:
+            results['stub_stats'] = stub.stats
+            stub.stop()
+
+    if as_json:
+        print(json.dumps(results, indent=4, sort_keys=True))
+        sys.exit(0)
+
+    print('')
+    print(':: Deadline Web Service submission of %s jobs to %s ...' % (
+                                        job_count, 'stand-in web service '
+                                        '(%s ms per job)' % delay_ms
+                                            if stub is not None else url))
+    print('')
+    print('    %-24s %12s %10s %8s' % ('mode', 'connections', 'jobs/sec',
+                                       'failed'))
+    for (mode, connections, keep_alive) in mode_list:
+        print('    %-24s %12s %10.1f %8s' % (
+                    mode, results[mode]['pool_stats']['connections_opened'],
+                    results[mode]['jobs_per_sec'], results[mode]['failed']))
+    print('')
@@ -0,0 +1,146 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import getopt
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.env_expansion import EnvVarExpander
+
+
+def usage():
+
+    print('')
+    print('  Usage: python %s [OPTIONS]' % os.path.basename(sys.argv[0]))
+    print('')
+    print('      OPTIONS')
+    print('      -------')
+    print('         -h | --help ... print this usage message and exit')
+    print('         -j | --json ... print results as JSON')
+    print('         -d <depth> | --depth=<depth> ... depth of ${VAR} chains')
+    print('                                          (default: 8)')
+    print('')
+
+
+def build_value_by_var(num_vars, chain_depth):
+
+    # Chains of vars that each reference the previous var in the chain plus
+    # a base env var and the head of the first chain (fan-in), e.g.
+    #
+    #   BENCH_C0_V0 = ${HOME}/c0_v0
+    #   BENCH_C0_V1 = ${BENCH_C0_V0}/c0_v1:${HOME}
+    #   ...
+    value_by_var = {}
+    for var_idx in range(num_vars):
+        chain_idx = var_idx // chain_depth
+        link_idx = var_idx % chain_depth
+        var_name = 'BENCH_C%s_V%s' % (chain_idx, link_idx)
+        if link_idx == 0:
+            value = '${HOME}/c%s_v0:${BENCH_C0_V0}' % chain_idx
+            if chain_idx == 0:
+                value = '${HOME}/c0_v0'
+        else:
+            value = '${BENCH_C%s_V%s}/c%s_v%s:${HOME}' % (
+                            chain_idx, link_idx - 1, chain_idx, link_idx)
+        value_by_var[var_name] = value
+
+    return value_by_var
+
+
+def time_expansion(value_by_var, repeat=3):
+
+    best_secs = None
+    for _ in range(repeat):
+        start_t = time.time()
+        expander = EnvVarExpander(value_by_var)
+        expander.expand_all()
+        elapsed_secs = time.time() - start_t
+        if best_secs is None or elapsed_secs < best_secs:
+            best_secs = elapsed_secs
+
+    report_d = expander.get_report()
+    if report_d['cycles'] or report_d['unresolved_refs_by_var']:
+        raise Exception('Benchmark env did not fully expand: %s' % report_d)
+
+    return best_secs
+
+
+if __name__ == '__main__':
+
+    short_opt_str = 'hjd:'
+    long_opt_list = ['help', 'json', 'depth=']
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
+    except getopt.GetoptError as err:
+        print('')
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    as_json = False
+    chain_depth = 8
+
+    for o, a in opts:
+        if o in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif o in ('-j', '--json'):
+            as_json = True
+        elif o in ('-d', '--depth'):
+            chain_depth = int(a)
+
+    results = []
+    for num_vars in (250, 500, 1000, 2000, 4000, 8000):
+        value_by_var = build_value_by_var(num_vars, chain_depth)
+        elapsed_secs = time_expansion(value_by_var)
+        results.append({
+            'num_vars': num_vars,
+            'chain_depth': chain_depth,
+            'secs': elapsed_secs,
+            'usecs_per_var': (elapsed_secs / num_vars) * 1000000.0,
+        })
+
+    if as_json:
+        print(json.dumps(results, indent=4, sort_keys=True))
+        sys.exit(0)
+
+    print('')
+    print(':: ${VAR} expansion scaling (chain depth %s) ...' % chain_depth)
+    print('')
+    print('    %10s %12s %14s' % ('num vars', 'total ms', 'usecs / var'))
+    for result_d in results:
+        print('    %10s %12.3f %14.3f' % (result_d['num_vars'],
+                                          result_d['secs'] * 1000.0,
+                                          result_d['usecs_per_var']))
+    print('')
+    print('    (linear scaling shows as a flat "usecs / var" column)')
+    print('')
@@ -0,0 +1,377 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import getopt
+import shutil
+import tempfile
+import subprocess
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+from synthetic_cfg import DEFAULT_DIMENSIONS, build_synthetic_cfg_tree
+
+
+# --- Resolution at synthetic scale ------------------------------------------
+#
+#   For each scenario a synthetic config tree is generated (see
+#   synthetic_cfg) and timed in its own python process, as the ENVR_CFG_*
+#   roots are read when envrunner is imported. Scenarios are the default
+#   dimensions plus sweeps of one dimension at a time.
+#
+#   Results are written as JSON (-o), and a previous results file can be
+#   given with --compare to see the change of each metric, e.g. between
+#   two commits.
+#
+# ----------------------------------------------------------------------------
+
+BENCH_RESULTS_FORMAT_VERSION = 1
+
+_SWEEP_VALUES_BY_DIM = {
+    'num_sw': [5, 20, 80],
+    'specs_per_sw': [5, 20, 80],
+    'groups_per_sw': [0, 2, 8],
+    'include_fanout': [0, 2, 8],
+    'var_chain_depth': [1, 8, 64],
+    'sw_at_per_sw': [0, 2, 8],
+}
+
+_METRIC_NAMES = [
+    'active_sw_snapshot',
+    'sw_env_spec_load',
+    'envr_env_uncached',
+    'envr_env_cached',
+    'launch_overhead',
+]
+
+_SLOWER_RATIO = 1.1
+
+
+def usage():
+
+    print('')
+    print('  Usage: python %s [OPTIONS]' % os.path.basename(sys.argv[0]))
+    print('')
+    print('      Times ActiveSoftwareSnapshot, EnvRunnerEnv construction')
+    print('      (with and without the resolve cache) and launch overhead')
+    print('      against synthetic config trees of increasing size.')
+    print('')
+    print('      OPTIONS')
+    print('      -------')
+    print('         -h | --help ... print this usage message and exit')
+    print('         -j | --json ... print results as JSON')
+    print('         -o <file> | --output=<file> ... write results as JSON')
+    print('         -n <count> | --repeat=<count> ... timed runs per')
+    print('                                           metric (default: 5)')
+    print('         --quick ... only the default and the largest value of')
+    print('                     each dimension')
+    print('         --compare=<file> ... compare against results written')
+    print('                              earlier with -o')
+    print('')
+
+
+def get_scenario_list(quick=False):
+
+    # (scenario name, dimensions) list, default dimensions first
+    scenario_list = [('default', dict(DEFAULT_DIMENSIONS))]
+    for dim_name in sorted(_SWEEP_VALUES_BY_DIM.keys()):
+        sweep_values = _SWEEP_VALUES_BY_DIM[dim_name]
+        if quick:
+            sweep_values = sweep_values[-1:]
+        for dim_value in sweep_values:
+            if dim_value == DEFAULT_DIMENSIONS[dim_name]:
+                continue
+            dims = dict(DEFAULT_DIMENSIONS)
+            dims[dim_name] = dim_value
+            scenario_list.append(('%s=%s' % (dim_name, dim_value), dims))
+
+    return scenario_list
+
+
+def get_git_commit():
+
+    try:
+        with open(os.devnull, 'w') as null_fp:
+            return subprocess.check_output(
+                        ['git', 'rev-parse', 'HEAD'], cwd=ENVRUNNER_ROOT,
+                        stderr=null_fp).decode('utf-8').strip()
+    except (IOError, OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize_ms(secs_list):
+
+    # first run separately, it pays for cold caches
+    sorted_secs_list = sorted(secs_list[1:] or secs_list)
+    return {
+        'first_ms': secs_list[0] * 1000.0,
+        'best_ms': sorted_secs_list[0] * 1000.0,
+        'median_ms': sorted_secs_list[len(sorted_secs_list) // 2] * 1000.0,
+    }
+
+
+def run_scenario(scenario_dims, repeat):
+
+    tmp_root = tempfile.mkdtemp(prefix='envr_bench_scale_')
+    try:
+        tree_info = build_synthetic_cfg_tree('%s/cfg' % tmp_root,
+                                             **scenario_dims)
+        tree_info['repeat'] = repeat
+        tree_info['runner_cfg_filepath'] = '%s/bench_runner.json' % tmp_root
+        with open(tree_info['runner_cfg_filepath'], 'w') as out_fp:
+            json.dump({'active_sw': tree_info['active_sw_list'],
+                       'command': sys.executable, 'args': ['-c', 'pass']},
+                      out_fp)
+
+        worker_filepath = '%s/worker.json' % tmp_root
+        with open(worker_filepath, 'w') as out_fp:
+            json.dump(tree_info, out_fp)
+
+        worker_env_d = dict(os.environ)
+        for env_var in ('ENVR_CFG_SITE_ROOT', 'ENVR_CFG_PROJECTS_ROOT',
+                        'ENVR_CFG_SW_ENVS_ROOT'):
+            worker_env_d.pop(env_var, None)
+        worker_env_d.update({
+            'ENVR_CFG_ROOT': tree_info['cfg_root'],
+            'ENVR_ALL_USERS_DATA_ROOT': '%s/data' % tmp_root,
+            'ENVR_LOCAL_CACHE_ROOT': '%s/local_cache' % tmp_root,
+        })
+
+        with open(os.devnull, 'w') as null_fp:
+            subprocess.check_call([sys.executable, os.path.abspath(__file__),
+                                   '--worker=%s' % worker_filepath],
+                                  stdout=null_fp, env=worker_env_d)
+
+        with open('%s/results.json' % tmp_root, 'r') as in_fp:
+            return json.load(in_fp)
+    finally:
+        shutil.rmtree(tmp_root)
+
+
+def run_worker(worker_filepath):
+
+    # runs in a process of its own, with ENVR_CFG_ROOT set to the tree
+    from envrunner.active_software import ActiveSoftwareSnapshot
+    from envrunner.config_cache import load_config_json
+    from envrunner.env_mechanism import (
+        EnvRunnerEnv,
+        ENVR_CFG_SITE_ROOT,
+        ENVR_CFG_PROJECTS_ROOT,
+    )
+    from envrunner.launch_timings import LaunchTimings
+    from envrunner.runner import run_launch_config
+
+    with open(worker_filepath, 'r') as in_fp:
+        tree_info = json.load(in_fp)
+
+    prj_code = tree_info['prj_code']
+    active_sw_list = tree_info['active_sw_list']
+    repeat = tree_info['repeat'] + 1  # plus the first, cold, run
+
+    def _load_configs():
+        return (
+            load_config_json('%s/site_env.json' % ENVR_CFG_SITE_ROOT),
+            load_config_json('%s/sw_definitions.json' % ENVR_CFG_SITE_ROOT),
+            load_config_json('%s/%s/%s_env.json' % (
+                            ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code)),
+            load_config_json('%s/%s/%s_sw_versions.json' % (
+                            ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code)),
+        )
+
+    secs_list_by_metric = {metric: [] for metric in _METRIC_NAMES}
+
+    for _ in range(repeat):
+        (site_env_spec_list, sw_defs_d,
+            prj_env_spec_list, prj_sw_versions_d) = _load_configs()
+        start_t = time.perf_counter()
+        snapshot = ActiveSoftwareSnapshot(active_sw_list, sw_defs_d,
+                                          prj_code, prj_sw_versions_d)
+        mid_t = time.perf_counter()
+        snapshot.get_active_sw_env_spec()
+        end_t = time.perf_counter()
+        secs_list_by_metric['active_sw_snapshot'].append(mid_t - start_t)
+        secs_list_by_metric['sw_env_spec_load'].append(end_t - mid_t)
+
+    for (metric, use_resolve_cache) in (('envr_env_uncached', False),
+                                        ('envr_env_cached', True)):
+        for _ in range(repeat):
+            (site_env_spec_list, sw_defs_d,
+                prj_env_spec_list, prj_sw_versions_d) = _load_configs()
+            start_t = time.perf_counter()
+            envr_env = EnvRunnerEnv(active_sw_list, sw_defs_d,
+                                    site_env_spec_list, prj_code,
+                                    prj_sw_versions_d, prj_env_spec_list,
+                                    use_resolve_cache=use_resolve_cache)
+            secs_list_by_metric[metric].append(
+                                            time.perf_counter() - start_t)
+
+    for _ in range(repeat):
+        timings = LaunchTimings()
+        run_launch_config(prj_code, tree_info['runner_cfg_filepath'],
+                          timings=timings)
+        secs_list_by_metric['launch_overhead'].append(
+                                            timings.get_overhead_secs())
+
+    results_d = {
+        'dimensions': tree_info['dimensions'],
+        'env_var_count': len(envr_env.get_env_d()),
+        'env_spec_count': len(envr_env.get_env_spec_list()),
+        'metrics': {metric: summarize_ms(secs_list_by_metric[metric])
+                        for metric in _METRIC_NAMES},
+        'last_launch_phases_ms': {
+            phase_d['name']: phase_d['ms']
+                for phase_d in timings.to_dict()['phases']},
+    }
+
+    with open('%s/results.json' % os.path.dirname(worker_filepath),
+              'w') as out_fp:
+        json.dump(results_d, out_fp, indent=4, sort_keys=True)
+
+
+def print_results(results_d):
+
+    print('')
+    print(':: EnvRunnerEnv resolution at synthetic scale (best ms of %s) ...'
+          % results_d['repeat'])
+    print('')
+    print('    %-22s %7s %10s %10s %10s %10s %10s' % (
+                'scenario', 'vars', 'snapshot', 'spec load', 'uncached',
+                'cached', 'launch'))
+    for (scenario_name, scenario_d) in results_d['scenario_list']:
+        metrics_d = scenario_d['metrics']
+        print('    %-22s %7s %10.2f %10.2f %10.2f %10.2f %10.2f' % (
+                    scenario_name, scenario_d['env_var_count'],
+                    metrics_d['active_sw_snapshot']['best_ms'],
+                    metrics_d['sw_env_spec_load']['best_ms'],
+                    metrics_d['envr_env_uncached']['best_ms'],
+                    metrics_d['envr_env_cached']['best_ms'],
+                    metrics_d['launch_overhead']['best_ms']))
+    print('')
+
+
+def print_comparison(results_d, baseline_d):
+
+    if baseline_d.get('__version__') != BENCH_RESULTS_FORMAT_VERSION:
+        raise Exception('Baseline results are from a different version of '
+                        'this benchmark')
+
+    baseline_by_scenario = dict(baseline_d['scenario_list'])
+
+    print('')
+    print(':: Compared to baseline (commit %s), best ms ...' %
+          baseline_d.get('git_commit'))
+    print('')
+    print('    %-22s %-20s %10s %10s %8s' % (
+                'scenario', 'metric', 'baseline', 'now', 'ratio'))
+    for (scenario_name, scenario_d) in results_d['scenario_list']:
+        if scenario_name not in baseline_by_scenario:
+            continue
+        base_metrics_d = baseline_by_scenario[scenario_name]['metrics']
+        for metric in _METRIC_NAMES:
+            if metric not in base_metrics_d:
+                continue
+            base_ms = base_metrics_d[metric]['best_ms']
+            now_ms = scenario_d['metrics'][metric]['best_ms']
+            ratio = now_ms / base_ms if base_ms else 0.0
+            print('    %-22s %-20s %10.2f %10.2f %7.2fx%s' % (
+                        scenario_name, metric, base_ms, now_ms, ratio,
+                        ' SLOWER' if ratio > _SLOWER_RATIO else ''))
+    print('')
+
+
+if __name__ == '__main__':
+
+    short_opt_str = 'hjo:n:'
+    long_opt_list = ['help', 'json', 'output=', 'repeat=', 'quick',
+                     'compare=', 'worker=']
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
+    except getopt.GetoptError as err:
+        print('')
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    as_json = False
+    output_filepath = None
+    repeat = 5
+    quick = False
+    compare_filepath = None
+
+    for o, a in opts:
+        if o in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif o in ('-j', '--json'):
+            as_json = True
+        elif o in ('-o', '--output'):
+            output_filepath = a
+        elif o in ('-n', '--repeat'):
+            repeat = int(a)
+        elif o == '--quick':
+            quick = True
+        elif o == '--compare':
+            compare_filepath = a
+        elif o == '--worker':
+            run_worker(a)
+            sys.exit(0)
+
+    results_d = {
+        '__type__': 'envr_bench_results',
+        '__version__': BENCH_RESULTS_FORMAT_VERSION,
+        'benchmark': 'env_scale',
+        'git_commit': get_git_commit(),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'time': time.time(),
+        'repeat': repeat,
+        'scenario_list': [],
+    }
+
+    for (scenario_name, scenario_dims) in get_scenario_list(quick):
+        if not as_json:
+            print(':: running scenario "%s" ...' % scenario_name)
+        results_d['scenario_list'].append(
+                    [scenario_name, run_scenario(scenario_dims, repeat)])
+
+    if output_filepath:
+        with open(output_filepath, 'w') as out_fp:
+            out_fp.write('%s\n' % json.dumps(results_d, indent=4,
+                                             sort_keys=True))
+
+    if as_json:
+        print(json.dumps(results_d, indent=4, sort_keys=True))
+        sys.exit(0)
+
+    print_results(results_d)
+
+    if compare_filepath:
+        with open(compare_filepath, 'r') as in_fp:
+            print_comparison(results_d, json.load(in_fp))
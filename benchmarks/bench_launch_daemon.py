@@ -0,0 +1,195 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import getopt
+import shutil
+import tempfile
+import subprocess
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.launch_daemon import launch_via_daemon, send_daemon_request
+
+
+def usage():
+
+    print('')
+    print('  Usage: python %s [OPTIONS] <projectCode> [<activeSw> ...]' %
+          os.path.basename(sys.argv[0]))
+    print('')
+    print('      Compares end-to-end launch latency of launch_runner.py')
+    print('      in-process against launching via the launch daemon, for a')
+    print('      runner config that runs a no-op python child.')
+    print('')
+    print('      OPTIONS')
+    print('      -------')
+    print('         -h | --help ... print this usage message and exit')
+    print('         -j | --json ... print results as JSON')
+    print('         -n <count> | --repeat=<count> ... launches per mode')
+    print('                                           (default: 10)')
+    print('')
+
+
+def time_launches(launch_fn, repeat):
+
+    secs_list = []
+    for _ in range(repeat):
+        start_t = time.time()
+        launch_fn()
+        secs_list.append(time.time() - start_t)
+
+    secs_list.sort()
+    return {
+        'best_ms': secs_list[0] * 1000.0,
+        'median_ms': secs_list[len(secs_list) // 2] * 1000.0,
+        'repeat': repeat,
+    }
+
+
+def wait_for_daemon(socket_path, timeout=30.0):
+
+    start_t = time.time()
+    while time.time() - start_t < timeout:
+        if send_daemon_request({'op': 'ping'}, socket_path):
+            return
+        time.sleep(0.05)
+
+    raise Exception('Launch daemon did not start on "%s"' % socket_path)
+
+
+if __name__ == '__main__':
+
+    short_opt_str = 'hjn:'
+    long_opt_list = ['help', 'json', 'repeat=']
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
+    except getopt.GetoptError as err:
+        print('')
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    as_json = False
+    repeat = 10
+
+    for o, a in opts:
+        if o in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif o in ('-j', '--json'):
+            as_json = True
+        elif o in ('-n', '--repeat'):
+            repeat = int(a)
+
+    if len(args) < 1:
+        print('')
+        print('*** ERROR: expecting a project code ... see usage below ...')
+        usage()
+        sys.exit(3)
+
+    prj_code = args[0]
+    active_sw_list = args[1:]
+
+    tmp_root = tempfile.mkdtemp(prefix='envr_bench_daemon_')
+    socket_path = os.path.join(tmp_root, 'daemon.sock')
+    runner_cfg_filepath = os.path.join(tmp_root, 'bench_runner.json')
+
+    with open(runner_cfg_filepath, 'w') as out_fp:
+        json.dump({'active_sw': active_sw_list, 'command': sys.executable,
+                   'args': ['-c', 'pass']}, out_fp)
+
+    bin_dir = os.path.join(ENVRUNNER_ROOT, 'bin')
+    launch_runner_cmd = [sys.executable,
+                         os.path.join(bin_dir, 'launch_runner.py')]
+
+    bench_env_d = dict(os.environ, ENVR_LAUNCH_DAEMON_SOCKET=socket_path)
+
+    def _launch_runner(extra_args):
+        with open(os.devnull, 'w') as null_fp:
+            subprocess.check_call(launch_runner_cmd + extra_args +
+                                  [prj_code, runner_cfg_filepath],
+                                  stdout=null_fp, env=bench_env_d)
+
+    daemon_p = None
+    try:
+        results = {}
+        results['in_process'] = time_launches(
+                                    lambda: _launch_runner([]), repeat)
+
+        daemon_p = subprocess.Popen(
+                        [sys.executable,
+                         os.path.join(bin_dir, 'launch_daemon.py'),
+                         '--socket', socket_path,
+                         '--warm', '%s:%s' % (prj_code, runner_cfg_filepath)],
+                        stdout=subprocess.PIPE, env=bench_env_d)
+        wait_for_daemon(socket_path)
+
+        results['via_daemon'] = time_launches(
+                                    lambda: _launch_runner(['--via-daemon']),
+                                    repeat)
+
+        # client call only, i.e. without the client interpreter start up
+        def _client_launch():
+            with open(os.devnull, 'w') as null_fp:
+                stdout_fd = os.dup(1)
+                os.dup2(null_fp.fileno(), 1)
+                try:
+                    d_info = launch_via_daemon(prj_code, runner_cfg_filepath,
+                                               socket_path=socket_path)
+                finally:
+                    os.dup2(stdout_fd, 1)
+                    os.close(stdout_fd)
+            if d_info is None:
+                raise Exception('Launch daemon did not handle the request')
+
+        results['daemon_client_call'] = time_launches(_client_launch, repeat)
+        results['daemon_stats'] = send_daemon_request({'op': 'stats'},
+                                                      socket_path)
+    finally:
+        if daemon_p is not None:
+            send_daemon_request({'op': 'shutdown'}, socket_path)
+            daemon_p.wait()
+        shutil.rmtree(tmp_root)
+
+    if as_json:
+        print(json.dumps(results, indent=4, sort_keys=True))
+        sys.exit(0)
+
+    print('')
+    print(':: End-to-end launch latency, project "%s", active sw %s ...' % (
+                                                    prj_code, active_sw_list))
+    print('')
+    print('    %-20s %10s %10s' % ('mode', 'best ms', 'median ms'))
+    for mode in ('in_process', 'via_daemon', 'daemon_client_call'):
+        print('    %-20s %10.2f %10.2f' % (mode, results[mode]['best_ms'],
+                                           results[mode]['median_ms']))
+    print('')
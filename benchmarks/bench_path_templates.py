@@ -0,0 +1,91 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.env_mechanism import EnvRunnerEnv
+
+
+def build_prj_env_spec_list(num_roots, num_path_entries):
+
+    # a handful of root vars, and path specs with many templated entries
+    # built from those roots
+    spec_list = []
+    for root_idx in range(num_roots):
+        spec_list.append({'var': 'BENCH_ROOT_%s' % root_idx,
+                          'value': '${HOME}/bench/root_%s' % root_idx})
+
+    for path_var in ('PATH', 'PYTHONPATH', 'BENCH_PLUGIN_PATH'):
+        entry_list = [
+            '${BENCH_ROOT_%s}/pkg_%s/lib/${BENCH_ROOT_0}/%s' % (
+                        entry_idx % num_roots, entry_idx, path_var.lower())
+            for entry_idx in range(num_path_entries)
+        ]
+        spec_list.append({'path': path_var, 'mode': 'pre',
+                          'value': {'_all': entry_list}})
+
+    return spec_list
+
+
+def time_resolution(prj_env_spec_list, repeat=5):
+
+    best_secs = None
+    for _ in range(repeat):
+        start_t = time.time()
+        EnvRunnerEnv([], {}, [], 'bench', {}, prj_env_spec_list,
+                     use_resolve_cache=False)
+        elapsed_secs = time.time() - start_t
+        if best_secs is None or elapsed_secs < best_secs:
+            best_secs = elapsed_secs
+
+    return best_secs
+
+
+if __name__ == '__main__':
+
+    tmp_data_root = tempfile.mkdtemp(prefix='envr_bench_')
+    os.environ['ENVR_ALL_USERS_DATA_ROOT'] = tmp_data_root
+
+    try:
+        print('')
+        print(':: EnvRunnerEnv resolution with templated path entries ...')
+        print('')
+        print('    %12s %12s' % ('path entries', 'best ms'))
+        for num_path_entries in (100, 200, 400, 800):
+            prj_env_spec_list = build_prj_env_spec_list(8, num_path_entries)
+            elapsed_secs = time_resolution(prj_env_spec_list)
+            print('    %12s %12.3f' % (num_path_entries,
+                                       elapsed_secs * 1000.0))
+        print('')
+    finally:
+        shutil.rmtree(tmp_data_root)
@@ -0,0 +1,206 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import getopt
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.renderfarm.stdout_classifier import (
+    load_stdout_classifier, PROGRESS_A_OF_B_PATTERN, PROGRESS_PERCENT_PATTERN
+)
+
+
+# the per-handler patterns the ENVRTaskRunner plugin registers one by one
+_PER_HANDLER_PATTERNS = [
+    '^((.*)(WARNING|Warning)(.*))$',
+    'Exception: (.*)',
+    'SyntaxError: (.*)',
+    PROGRESS_A_OF_B_PATTERN,
+    PROGRESS_PERCENT_PATTERN,
+]
+
+
+def usage():
+
+    print('')
+    print('  Usage: python %s [OPTIONS]' % os.path.basename(sys.argv[0]))
+    print('')
+    print('      Compares classifying synthetic render stdout with one regex')
+    print('      search per handler pattern per line against the combined,')
+    print('      prefiltered stdout classifier.')
+    print('')
+    print('      OPTIONS')
+    print('      -------')
+    print('         -h | --help ... print this usage message and exit')
+    print('         -j | --json ... print results as JSON')
+    print('         -n <count> | --lines=<count> ... lines of stdout '
+          '(default: 200000)')
+    print('         -l <chars> | --long-line=<chars> ... length of the long')
+    print('                                   lines mixed in (default: 4000)')
+    print('         -f <file> | --handlers-file=<file> ... stdout handling')
+    print('                                   JSON file (default: the one in')
+    print('                                   renderfarm/submission_examples)')
+    print('')
+
+
+def build_lines(line_count, long_line_chars):
+
+    rand = random.Random(1001)
+    noise = 'abcdefghijklmnopqrstuvwxyz0123456789 .:/_-[]'
+    line_list = []
+    for line_idx in range(line_count):
+        roll = rand.random()
+        if roll < 0.001:
+            line_list.append('Render Warning: sample clamp on light %s' %
+                             line_idx)
+        elif roll < 0.003:
+            line_list.append('Progress: rendering bucket (%s of %s)' % (
+                                        line_idx % 100 + 1, 100))
+        elif roll < 0.01:
+            line_list.append(''.join([rand.choice(noise)
+                                        for _ in range(long_line_chars)]))
+        else:
+            line_list.append('[render] bucket %s done, %s rays, %.3f secs' % (
+                                line_idx, rand.randint(1000, 999999),
+                                rand.random()))
+    return line_list
+
+
+def time_per_handler(line_list, pattern_list):
+
+    regex_list = [re.compile(p) for p in pattern_list]
+    start_t = time.time()
+    match_count = 0
+    for line in line_list:
+        for regex in regex_list:
+            if regex.search(line) is not None:
+                match_count += 1
+    return (time.time() - start_t, match_count)
+
+
+def time_classifier(line_list, classifier):
+
+    start_t = time.time()
+    match_count = 0
+    for line in line_list:
+        match_count += len(classifier.classify(line))
+    return (time.time() - start_t, match_count)
+
+
+if __name__ == '__main__':
+
+    short_opt_str = 'hjn:l:f:'
+    long_opt_list = ['help', 'json', 'lines=', 'long-line=', 'handlers-file=']
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
+    except getopt.GetoptError as err:
+        print('')
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    as_json = False
+    line_count = 200000
+    long_line_chars = 4000
+    handlers_filepath = os.path.join(
+                            ENVRUNNER_ROOT, 'renderfarm', 'submission_examples',
+                            'job_stdout_handling_regex_patterns.json')
+
+    for o, a in opts:
+        if o in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif o in ('-j', '--json'):
+            as_json = True
+        elif o in ('-n', '--lines'):
+            line_count = int(a)
+        elif o in ('-l', '--long-line'):
+            long_line_chars = int(a)
+        elif o in ('-f', '--handlers-file'):
+            handlers_filepath = a
+
+    with open(handlers_filepath, 'r') as in_fp:
+        stdout_handlers_d = json.load(in_fp)
+    pattern_list = (_PER_HANDLER_PATTERNS +
+                    stdout_handlers_d.get('WarningRegexList', []) +
+                    stdout_handlers_d.get('ErrorRegexList', []))
+
+    line_list = build_lines(line_count, long_line_chars)
+
+    start_t = time.time()
+    classifier = load_stdout_classifier(handlers_filepath)
+    compile_secs = time.time() - start_t
+
+    start_t = time.time()
+    load_stdout_classifier(handlers_filepath)
+    cached_load_secs = time.time() - start_t
+
+    (per_handler_secs, per_handler_matches) = time_per_handler(line_list,
+                                                               pattern_list)
+    (classifier_secs, classifier_matches) = time_classifier(line_list,
+                                                            classifier)
+
+    results = {
+        'lines': line_count,
+        'patterns': len(pattern_list),
+        'prefilter_literals': sorted(classifier.literals or []),
+        'per_handler_secs': per_handler_secs,
+        'per_handler_matches': per_handler_matches,
+        'classifier_secs': classifier_secs,
+        'classifier_matches': classifier_matches,
+        'speedup': per_handler_secs / classifier_secs
+                        if classifier_secs else 0.0,
+        'classifier_compile_ms': compile_secs * 1000.0,
+        'classifier_cached_load_ms': cached_load_secs * 1000.0,
+    }
+
+    if as_json:
+        print(json.dumps(results, indent=4, sort_keys=True))
+        sys.exit(0)
+
+    print('')
+    print(':: Classifying %s lines of stdout with %s patterns ...' % (
+                                            line_count, len(pattern_list)))
+    print('')
+    print('    per handler regexes: %8.3f secs (%s matches)' % (
+                                per_handler_secs, per_handler_matches))
+    print('    stdout classifier:   %8.3f secs (%s matches)' % (
+                                classifier_secs, classifier_matches))
+    print('    speed up:            %8.1fx' % results['speedup'])
+    print('')
+    print('    classifier compile: %.2f ms, cached load: %.3f ms' % (
+                results['classifier_compile_ms'],
+                results['classifier_cached_load_ms']))
+    print('')
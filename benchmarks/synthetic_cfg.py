@@ -0,0 +1,280 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import getopt
+
+
+# --- Synthetic ENVR_CFG_ROOT trees ------------------------------------------
+#
+#   Builds a complete config tree (site, projects, sw_envs) of a given size
+#   for benchmarking resolution at scale. Dimensions:
+#
+#       num_sw ... number of sw definitions, all of them active
+#       specs_per_sw ... env specs in each sw env spec file
+#       groups_per_sw ... group specs in each sw env spec file, every other
+#                         one "requires" a sw that is not active
+#       include_fanout ... INCLUDES files per sw env spec file (picked from
+#                          a shared pool, each including a common file too)
+#       var_chain_depth ... depth of the ${VAR} chain in the project env,
+#                           referenced by sw env specs at the end of it
+#       sw_at_per_sw ... "[@sw:{MAJOR}]" tokens per sw (in var names, and
+#                        one in the install location of every sw but the
+#                        first one)
+#
+#   Install locations do not exist, so sw env spec files come from the
+#   sw_envs root.
+#
+# ----------------------------------------------------------------------------
+
+SYNTHETIC_PRJ_CODE = 'synprj'
+
+DEFAULT_DIMENSIONS = {
+    'num_sw': 20,
+    'specs_per_sw': 20,
+    'groups_per_sw': 2,
+    'include_fanout': 2,
+    'var_chain_depth': 8,
+    'sw_at_per_sw': 2,
+}
+
+_INCLUDE_POOL_SIZE = 8
+
+
+def _get_sw_name(sw_idx):
+
+    return 'syn_sw_%03d' % sw_idx
+
+
+def _get_sw_version(sw_idx):
+
+    return '%s.%s.%s' % (sw_idx % 5 + 1, sw_idx % 10, sw_idx)
+
+
+def _write_json(filepath, data):
+
+    dirpath = os.path.dirname(filepath)
+    if not os.path.isdir(dirpath):
+        os.makedirs(dirpath)
+    with open(filepath, 'w') as out_fp:
+        out_fp.write('%s\n' % json.dumps(data, indent=4, sort_keys=True))
+
+
+def _build_sw_spec(sw_idx, spec_idx, chain_tip_var):
+
+    # cycles through the kinds of spec entries found in real sw env files
+    sw_caps_name = _get_sw_name(sw_idx).upper()
+    spec_kind = spec_idx % 4
+
+    if spec_kind == 0:
+        return {'var': '%s_SETTING_%s' % (sw_caps_name, spec_idx),
+                'value': '${%s}/${@VER}/setting_%s' % (chain_tip_var,
+                                                      spec_idx)}
+    elif spec_kind == 1:
+        return {'path': 'PATH', 'mode': 'pre',
+                'value': {'_all': ['${@INSTALL}/bin_%s' % spec_idx]}}
+    elif spec_kind == 2:
+        return {'single_path': '%s_DATA_%s' % (sw_caps_name, spec_idx),
+                'value': {'_all': '${@INSTALL}/data/%s' % spec_idx}}
+    return {'path': 'SYN_PLUGIN_PATH', 'mode': 'post',
+            'value': {'_all': ['${@INSTALL}/plugins_%s' % spec_idx,
+                               '${%s}/plugins/%s' % (chain_tip_var,
+                                                     spec_idx)]}}
+
+
+def _build_sw_env_spec_list(sw_idx, dims, chain_tip_var):
+
+    num_sw = dims['num_sw']
+    sw_caps_name = _get_sw_name(sw_idx).upper()
+
+    spec_list = ['# synthetic env spec for %s' % _get_sw_name(sw_idx)]
+    spec_list += [_build_sw_spec(sw_idx, spec_idx, chain_tip_var)
+                    for spec_idx in range(dims['specs_per_sw'])]
+
+    for group_idx in range(dims['groups_per_sw']):
+        if group_idx % 2:
+            required_sw = 'syn_inactive_sw'
+        else:
+            required_sw = _get_sw_name((sw_idx + group_idx + 1) % num_sw)
+        spec_list.append({
+            'group': '%s_GROUP_%s' % (sw_caps_name, group_idx),
+            'requires': [required_sw],
+            'spec_list': [
+                {'var': '%s_WITH_%s' % (sw_caps_name, required_sw.upper()),
+                 'value': '${@VER}'},
+                {'path': 'PYTHONPATH', 'mode': 'pre',
+                 'value': {'_all': ['${@INSTALL}/python/%s' % group_idx]}},
+            ],
+        })
+
+    for at_idx in range(dims['sw_at_per_sw']):
+        spec_list.append({
+            'var': '%s_FOR_BASE[@%s:{MAJOR}]_%s' % (sw_caps_name,
+                                                    _get_sw_name(0), at_idx),
+            'value': '${@INSTALL}/for_base/%s' % at_idx})
+
+    if dims['include_fanout']:
+        spec_list.append({'INCLUDES': [
+            '../../includes/inc_%03d.json' % (
+                                (sw_idx + inc_idx) % _INCLUDE_POOL_SIZE)
+                for inc_idx in range(dims['include_fanout'])]})
+
+    return spec_list
+
+
+def build_synthetic_cfg_tree(cfg_root, **dim_kwargs):
+
+    # Writes a synthetic config tree into cfg_root, returns a dict with the
+    # dimensions used, the project code and active sw list
+    dims = dict(DEFAULT_DIMENSIONS)
+    for (dim_name, dim_value) in dim_kwargs.items():
+        if dim_name not in dims:
+            raise Exception('Unknown synthetic cfg dimension "%s"' % dim_name)
+        dims[dim_name] = int(dim_value)
+
+    if dims['num_sw'] < 1:
+        raise Exception('Synthetic cfg needs at least one sw definition')
+
+    cfg_root = os.path.abspath(cfg_root).replace('\\', '/')
+    chain_depth = max(1, dims['var_chain_depth'])
+    chain_tip_var = 'SYN_CHAIN_%s' % (chain_depth - 1)
+
+    _write_json('%s/site/site_env.json' % cfg_root, [
+        '# synthetic site env',
+        {'single_path': 'SYN_SITE_ROOT', 'value': {'_all': '%s/site_root' %
+                                                                cfg_root}},
+        {'var': 'SYN_LICENSE_SERVER', 'value': '5053@syn-license'},
+    ])
+
+    sw_defs_d = {}
+    sw_versions_d = {}
+    for sw_idx in range(dims['num_sw']):
+        sw_name = _get_sw_name(sw_idx)
+        install_loc = '%s/installs/%s/{VER}' % (cfg_root, sw_name)
+        if sw_idx and dims['sw_at_per_sw']:
+            install_loc += '/for_base[@%s:{MAJOR}]' % _get_sw_name(0)
+        sw_defs_d[sw_name] = {
+            'version_format': '{MAJOR}.{MINOR}.{BUILD}',
+            'install_location': {'_all': install_loc},
+        }
+        sw_versions_d[sw_name] = _get_sw_version(sw_idx)
+
+        _write_json('%s/sw_envs/%s/%s_env.json' % (cfg_root, sw_name, sw_name),
+                    _build_sw_env_spec_list(sw_idx, dims, chain_tip_var))
+
+    _write_json('%s/site/sw_definitions.json' % cfg_root, sw_defs_d)
+
+    if dims['include_fanout']:
+        _write_json('%s/includes/inc_common.json' % cfg_root, [
+            {'var': 'SYN_INC_COMMON', 'value': '${SYN_SITE_ROOT}/common'},
+        ])
+        for inc_idx in range(_INCLUDE_POOL_SIZE):
+            _write_json('%s/includes/inc_%03d.json' % (cfg_root, inc_idx), [
+                {'var': 'SYN_INC_%03d' % inc_idx,
+                 'value': '${SYN_INC_COMMON}/inc_%s' % inc_idx},
+                {'path': 'SYN_INC_PATH', 'mode': 'post',
+                 'value': {'_all': ['${@INSTALL}/inc_%s' % inc_idx]}},
+                {'INCLUDES': ['./inc_common.json']},
+            ])
+
+    # the chain is declared last to first, so expansion has to order it
+    prj_env_spec_list = [
+        {'var': 'SYN_CHAIN_%s' % chain_idx,
+         'value': ('${SYN_CHAIN_%s}/d%s' % (chain_idx - 1, chain_idx)
+                        if chain_idx else '${SYN_SITE_ROOT}/chain')}
+            for chain_idx in reversed(range(chain_depth))]
+    prj_env_spec_list.append({'var': 'SYN_SHOW', 'value': SYNTHETIC_PRJ_CODE})
+
+    _write_json('%s/projects/%s/%s_env.json' % (
+                        cfg_root, SYNTHETIC_PRJ_CODE, SYNTHETIC_PRJ_CODE),
+                prj_env_spec_list)
+    _write_json('%s/projects/%s/%s_sw_versions.json' % (
+                        cfg_root, SYNTHETIC_PRJ_CODE, SYNTHETIC_PRJ_CODE),
+                sw_versions_d)
+
+    return {
+        'cfg_root': cfg_root,
+        'dimensions': dims,
+        'prj_code': SYNTHETIC_PRJ_CODE,
+        'active_sw_list': sorted(sw_defs_d.keys()),
+    }
+
+
+def usage():
+
+    print('')
+    print('  Usage: python %s [OPTIONS] <cfgRoot>' %
+          os.path.basename(sys.argv[0]))
+    print('')
+    print('      Writes a synthetic ENVR_CFG_ROOT tree into <cfgRoot>, e.g.')
+    print('      to try bin/check_environment.py against it.')
+    print('')
+    print('      OPTIONS')
+    print('      -------')
+    print('         -h | --help ... print this usage message and exit')
+    for dim_name in sorted(DEFAULT_DIMENSIONS.keys()):
+        print('         --%s=<n> ... (default: %s)' % (
+                    dim_name.replace('_', '-'), DEFAULT_DIMENSIONS[dim_name]))
+    print('')
+
+
+if __name__ == '__main__':
+
+    short_opt_str = 'h'
+    long_opt_list = ['help'] + ['%s=' % dim_name.replace('_', '-')
+                                    for dim_name in DEFAULT_DIMENSIONS.keys()]
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
+    except getopt.GetoptError as err:
+        print('')
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    dim_kwargs = {}
+
+    for o, a in opts:
+        if o in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        else:
+            dim_kwargs[o[2:].replace('-', '_')] = a
+
+    if len(args) != 1:
+        print('')
+        print('*** ERROR: expecting 1 argument ... see usage below ...')
+        usage()
+        sys.exit(3)
+
+    tree_info = build_synthetic_cfg_tree(args[0], **dim_kwargs)
+
+    print('')
+    print(':: synthetic cfg tree written to: %s' % tree_info['cfg_root'])
+    print('   ... project code: %s' % tree_info['prj_code'])
+    print('   ... dimensions: %s' % json.dumps(tree_info['dimensions'],
+                                              sort_keys=True))
+    print('')
@@ -0,0 +1,108 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import time
+import getopt
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/../..' % THIS_DIR)
+
+from envrunner.os_util import ENVR_CFG_SW_ENVS_ROOT
+from envrunner.sw_env_index import (
+    build_sw_env_index,
+    get_local_index_filepath,
+    PUBLISHED_INDEX_FILENAME,
+)
+
+
+def usage():
+
+    print('')
+    print('  Usage: python %s [OPTIONS]' % os.path.basename(sys.argv[0]))
+
+    print('')
+    print('      Rebuilds the index of env spec files under the sw_envs')
+    print('      config root, e.g. after publishing configs.')
+    print('')
+    print('      OPTIONS')
+    print('      -------')
+    print('         -h | --help ... print this usage message and exit')
+    print('         -r | --root <path> ... sw_envs root to index, defaults to')
+    print('                   ENVR_CFG_SW_ENVS_ROOT (%s)' %
+          ENVR_CFG_SW_ENVS_ROOT)
+    print('         -p | --publish ... also write the index into the sw_envs')
+    print('                   root as "%s", for all hosts' %
+          PUBLISHED_INDEX_FILENAME)
+    print('')
+
+
+if __name__ == '__main__':
+
+    short_opt_str = 'hr:p'
+    long_opt_list = ['help', 'root=', 'publish']
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
+    except getopt.GetoptError as err:
+        print('')
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    sw_envs_root = ENVR_CFG_SW_ENVS_ROOT
+    publish = False
+
+    for o, a in opts:
+        if o in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif o in ('-r', '--root'):
+            sw_envs_root = os.path.abspath(a)
+        elif o in ('-p', '--publish'):
+            publish = True
+
+    if not os.path.isdir(sw_envs_root):
+        print('')
+        print('*** ERROR: sw_envs root "%s" is not a folder' % sw_envs_root)
+        print('')
+        sys.exit(3)
+
+    start_t = time.time()
+    sw_env_index = build_sw_env_index(sw_envs_root, publish=publish)
+    elapsed_secs = time.time() - start_t
+
+    num_files = sum([len(sw_dir_info['files']) for sw_dir_info in
+                        sw_env_index.sw_dir_info_by_sw.values()])
+    print('')
+    print(':: Indexed %s sw folders (%s files) under "%s" in %.1f ms' % (
+                len(sw_env_index.sw_name_list), num_files,
+                sw_env_index.sw_envs_root, elapsed_secs * 1000.0))
+    print('   ... saved to %s' % get_local_index_filepath(sw_envs_root))
+    if publish:
+        print('   ... published to %s/%s' % (sw_env_index.sw_envs_root,
+                                             PUBLISHED_INDEX_FILENAME))
+    print('')
@@ -25,8 +25,11 @@
 import os
 import sys
 import json
+import time
 import getopt
 
+_START_TIME = time.perf_counter()
+
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 sys.path.append('%s/../..' % _THIS_DIR)
@@ -36,6 +39,11 @@ from envrunner.env_mechanism import (
     ENVR_CFG_SITE_ROOT,
     ENVR_CFG_PROJECTS_ROOT,
 )
+from envrunner.config_cache import load_config_json, get_config_cache_stats
+from envrunner.install_probe import get_install_probe_stats
+from envrunner.launch_timings import LaunchTimings, NULL_LAUNCH_TIMINGS
+
+_IMPORTED_TIME = time.perf_counter()
 
 
 def usage():
@@ -48,44 +56,63 @@ def usage():
     print('      OPTIONS')
     print('      -------')
     print('         -h | --help ... print this usage message and exit')
+    print('         --timings ... print a per-phase breakdown of the time')
+    print('                       taken to resolve the environment and')
+    print('                       write it as JSON into the user session')
+    print('                       folder')
     print('')
 
 
-def print_env_details(prj_code, launch_cfg_filepath):
+def _load_configs(prj_code, launch_cfg_filepath):
 
     site_spec_list_file = '%s/site_env.json' % ENVR_CFG_SITE_ROOT
 
-    with open(site_spec_list_file, 'r') as fp:
-        site_env_spec_list = json.load(fp)
+    site_env_spec_list = load_config_json(site_spec_list_file)
 
     prj_spec_list_file = (
         '%s/%s/%s_env.json' % (ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code))
 
-    with open(prj_spec_list_file, 'r') as fp:
-        prj_env_spec_list = json.load(fp)
+    prj_env_spec_list = load_config_json(prj_spec_list_file)
 
     prj_sw_versions_file = (
         '%s/%s/%s_sw_versions.json' % (
                             ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code))
 
-    with open(prj_sw_versions_file, 'r') as fp:
-        prj_sw_versions_d = json.load(fp)
+    prj_sw_versions_d = load_config_json(prj_sw_versions_file)
 
     site_sw_defs_file = '%s/sw_definitions.json' % ENVR_CFG_SITE_ROOT
 
-    with open(site_sw_defs_file, 'r') as fp:
-        site_sw_defs_d = json.load(fp)
+    site_sw_defs_d = load_config_json(site_sw_defs_file)
 
     with open(launch_cfg_filepath, 'r') as fp:
         launch_cfg_d = json.load(fp)
 
+    return (site_env_spec_list, prj_env_spec_list, prj_sw_versions_d,
+            site_sw_defs_d, launch_cfg_d)
+
+
+def print_env_details(prj_code, launch_cfg_filepath, timings=None):
+
+    if timings is None:
+        timings = NULL_LAUNCH_TIMINGS
+
+    with timings.phase('config_load'):
+        (site_env_spec_list, prj_env_spec_list, prj_sw_versions_d,
+            site_sw_defs_d, launch_cfg_d) = _load_configs(
+                                            prj_code, launch_cfg_filepath)
+
     active_sw_list = launch_cfg_d['active_sw']
 
     extra_env_spec_list = launch_cfg_d.get('extra_env', [])
 
-    envr_env = EnvRunnerEnv(active_sw_list, site_sw_defs_d, site_env_spec_list,
-                            prj_code, prj_sw_versions_d, prj_env_spec_list,
-                            extra_env_spec_list=extra_env_spec_list)
+    # only inspected, so resolved without writing a user session
+    with timings.phase('envr_env_init'):
+        envr_env = EnvRunnerEnv(active_sw_list, site_sw_defs_d,
+                                site_env_spec_list, prj_code,
+                                prj_sw_versions_d, prj_env_spec_list,
+                                extra_env_spec_list=extra_env_spec_list,
+                                timings=timings, pure=True)
+
     print('')
     print('==== Env Spec List ==================================')
     envr_env.print_env_spec_list()
@@ -94,11 +121,61 @@ def print_env_details(prj_code, launch_cfg_filepath):
     print('==== Applied Environment ============================')
     envr_env.print_applied_env()
 
+    print('')
+    print('==== Sw Env Spec Load Times =========================')
+    print('')
+    if envr_env.resolved_from_cache:
+        print(':: (resolved environment was loaded from the resolve cache)')
+    else:
+        spec_load_secs_by_sw = envr_env.active_sw_snapshot.spec_load_secs_by_sw
+        for sw_name in envr_env.active_sw_snapshot.info_by_active_sw.keys():
+            if sw_name in spec_load_secs_by_sw:
+                print('   %8.2f ms  %s' % (
+                        spec_load_secs_by_sw[sw_name] * 1000.0, sw_name))
+    print('')
+
+    print('')
+    print('==== Config Cache ===================================')
+    print('')
+    stats_d = get_config_cache_stats()
+    for stat_key in sorted(stats_d.keys()):
+        print(':: %s = %s' % (stat_key, stats_d[stat_key]))
+    print('')
+
+    print('')
+    print('==== Install Location Probes ========================')
+    print('')
+    stats_d = get_install_probe_stats()
+    probe_record_by_path = stats_d.pop('probe_records')
+    for stat_key in sorted(stats_d.keys()):
+        print(':: %s = %s' % (stat_key, stats_d[stat_key]))
+    for path in sorted(probe_record_by_path.keys()):
+        record_d = probe_record_by_path[path]
+        print('   %8.2f ms  %-9s %s' % (
+                    record_d['latency'] * 1000.0,
+                    ('TIMED OUT' if record_d['timed_out']
+                        else ('dir' if record_d['isdir'] else 'missing')),
+                    path))
+    print('')
+
+    if timings is not NULL_LAUNCH_TIMINGS:
+        print('')
+        print('==== Timings ========================================')
+        print('')
+        print(timings.format_report())
+        print('')
+        timings_filepath = timings.write_json(
+                            envr_env.user_current_session_root,
+                            envr_env.user_session_info['session_ts_str'])
+        if timings_filepath:
+            print(':: timings written to: %s' % timings_filepath)
+            print('')
+
 
 if __name__ == '__main__':
 
     short_opt_str = 'h'
-    long_opt_list = ['help']
+    long_opt_list = ['help', 'timings']
 
     try:
         opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
@@ -111,11 +188,15 @@ if __name__ == '__main__':
     prj_code = None
     runner_cfg_filepath = None
     detach_subprocess = False
+    timings = None
 
     for o, a in opts:
         if o in ('-h', '--help'):
             usage()
             sys.exit(0)
+        elif o == '--timings':
+            timings = LaunchTimings(start_time=_START_TIME)
+            timings.add_phase('envrunner_import', _START_TIME, _IMPORTED_TIME)
 
     if len(args) != 2:
         print('')
@@ -126,5 +207,5 @@ if __name__ == '__main__':
     prj_code = args[0]
     runner_cfg_filepath = os.path.abspath(args[1])
 
-    print_env_details(prj_code, runner_cfg_filepath)
+    print_env_details(prj_code, runner_cfg_filepath, timings=timings)
 
@@ -0,0 +1,127 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import getopt
+
+THIS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/../..' % THIS_DIR)
+
+from envrunner.launch_daemon import (
+    LaunchDaemon,
+    get_default_socket_path,
+    send_daemon_request,
+)
+
+
+def usage():
+
+    print('')
+    print('  Usage: python %s [OPTIONS]' % os.path.basename(sys.argv[0]))
+
+    print('')
+    print('      Runs the envrunner launch daemon in the foreground, use')
+    print('      "launch_runner.py --via-daemon" to launch through it.')
+    print('')
+    print('      OPTIONS')
+    print('      -------')
+    print('         -h | --help ... print this usage message and exit')
+    print('         -s | --socket <path> ... Unix socket path to listen on,')
+    print('                   defaults to:')
+    print('                   %s' % get_default_socket_path())
+    print('         -w | --warm <projectCode>:<runnerCfgFilepath> ... resolve')
+    print('                   this runner config at start up, can be given')
+    print('                   more than once')
+    print('         --status ... print stats of the running daemon and exit')
+    print('         --stop ... stop the running daemon and exit')
+    print('')
+
+
+if __name__ == '__main__':
+
+    short_opt_str = 'hs:w:'
+    long_opt_list = ['help', 'socket=', 'warm=', 'status', 'stop']
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
+    except getopt.GetoptError as err:
+        print('')
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    socket_path = None
+    warm_list = []
+    client_op = None
+
+    for o, a in opts:
+        if o in ('-h', '--help'):
+            usage()
+            sys.exit(0)
+        elif o in ('-s', '--socket'):
+            socket_path = os.path.abspath(a)
+        elif o in ('-w', '--warm'):
+            if ':' not in a:
+                print('')
+                print('*** ERROR: expecting <projectCode>:<runnerCfgFilepath> '
+                      'for --warm, got "%s"' % a)
+                usage()
+                sys.exit(3)
+            warm_list.append(a.split(':', 1))
+        elif o == '--status':
+            client_op = 'stats'
+        elif o == '--stop':
+            client_op = 'shutdown'
+
+    if client_op:
+        reply_d = send_daemon_request({'op': client_op}, socket_path)
+        if reply_d is None:
+            print('')
+            print(':: No launch daemon running on "%s"' %
+                  (socket_path or get_default_socket_path()))
+            print('')
+            sys.exit(1)
+        print(json.dumps(reply_d, indent=4, sort_keys=True))
+        sys.exit(0)
+
+    daemon = LaunchDaemon(socket_path)
+
+    for (prj_code, runner_cfg_filepath) in warm_list:
+        print(':: Warming "%s" for project "%s" ...' % (runner_cfg_filepath,
+                                                         prj_code))
+        daemon.warm(prj_code, runner_cfg_filepath)
+
+    print(':: envrunner launch daemon listening on "%s" (pid %s) ...' %
+          (daemon.socket_path, os.getpid()))
+    sys.stdout.flush()
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+    print(':: envrunner launch daemon stopped.')
@@ -24,14 +24,15 @@
 
 import os
 import sys
+import time
 import getopt
 
+_START_TIME = time.perf_counter()
+
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 
 sys.path.append('%s/../..' % THIS_DIR)
 
-from envrunner.runner import run_launch_config
-
 
 def usage():
 
@@ -46,13 +47,53 @@ def usage():
     print('         -d | --detach ... specify this flag if you want to detach')
     print('                           the child subprocess from the python')
     print('                           process.')
+    print('         --via-daemon ... launch through the envrunner launch')
+    print('                          daemon (see launch_daemon.py), falls')
+    print('                          back to launching in-process if the')
+    print('                          daemon is not running.')
+    print('         --timings ... print a per-phase breakdown of the launch')
+    print('                       time and write it as JSON into the user')
+    print('                       session folder. Not available together')
+    print('                       with --via-daemon.')
+    print('')
+
+
+def report_timings(timings):
+
+    print('')
+    print('==== Launch Timings =================================')
     print('')
+    print(timings.format_report())
+    print('')
+
+    info_d = timings.info_d
+    if 'user_current_session_root' not in info_d:
+        return  # failed before there was a session folder
+
+    timings_filepath = timings.write_json(
+                            info_d['user_current_session_root'],
+                            info_d['session_ts_str'])
+    if timings_filepath:
+        print(':: launch timings written to: %s' % timings_filepath)
+        print('')
+
+
+def exit_on_child_failure(returncode):
+
+    # exits with the launched process's return code when it failed, the
+    # same way whether the daemon or this process launched it
+    if returncode:
+        print('')
+        print('*** ERROR: launched process exited with return code %s' %
+              returncode)
+        print('')
+        sys.exit(returncode)
 
 
 if __name__ == '__main__':
 
     short_opt_str = 'hd'
-    long_opt_list = ['help', 'detach']
+    long_opt_list = ['help', 'detach', 'via-daemon', 'timings']
 
     try:
         opts, args = getopt.getopt(sys.argv[1:], short_opt_str, long_opt_list)
@@ -65,6 +106,8 @@ if __name__ == '__main__':
     prj_code = None
     runner_cfg_filepath = None
     detach_subprocess = False
+    via_daemon = False
+    report_timings_flag = False
 
     for o, a in opts:
         if o in ('-h', '--help'):
@@ -72,6 +115,17 @@ if __name__ == '__main__':
             sys.exit(0)
         elif o in ('-d', '--detach'):
             detach_subprocess = True
+        elif o == '--via-daemon':
+            via_daemon = True
+        elif o == '--timings':
+            report_timings_flag = True
+
+    if via_daemon and report_timings_flag:
+        print('')
+        print('*** ERROR: --timings is not available with --via-daemon ... '
+              'see usage below ...')
+        usage()
+        sys.exit(2)
 
     if len(args) != 2:
         print('')
@@ -88,8 +142,45 @@ if __name__ == '__main__':
     print('   ... runner cfg: %s' % runner_cfg_filepath)
     print('')
 
-    p_info = run_launch_config(prj_code, runner_cfg_filepath,
-                               detach_subprocess=detach_subprocess)
+    if via_daemon:
+        # only needs the standard library, the rest of envrunner is not
+        # imported when the daemon handles the launch
+        from envrunner.launch_daemon import launch_via_daemon
+
+        d_info = launch_via_daemon(prj_code, runner_cfg_filepath,
+                                   detach_subprocess=detach_subprocess)
+        if d_info is not None:
+            print('')
+            print(':: launched via daemon, %s' % d_info)
+            print('')
+            exit_on_child_failure(d_info.get('returncode'))
+            sys.exit(0)
+
+        print(':: launch daemon not available, launching in-process ...')
+        print('')
+
+    import subprocess
+
+    timings = None
+    if report_timings_flag:
+        from envrunner.launch_timings import LaunchTimings
+
+        timings = LaunchTimings(start_time=_START_TIME)
+        with timings.phase('envrunner_import'):
+            from envrunner.runner import run_launch_config
+    else:
+        from envrunner.runner import run_launch_config
+
+    try:
+        p_info = run_launch_config(prj_code, runner_cfg_filepath,
+                                   detach_subprocess=detach_subprocess,
+                                   timings=timings)
+    except subprocess.CalledProcessError as err:
+        exit_on_child_failure(err.returncode)
+        raise
+    finally:
+        if timings is not None:
+            report_timings(timings)
 
     # if not detaching then p_info will be None
     print('')
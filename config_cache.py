@@ -0,0 +1,224 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from .os_util import fslash, get_local_cache_root
+from .events import CONFIG_LOADED, emit_event, has_event_callbacks
+
+
+# --- Parsed config cache ----------------------------------------------------
+#
+#   Config .json files (site_env.json, <prj>_env.json, etc.) usually live
+#   under ENVR_CFG_ROOT on a network share. Each file is served from an
+#   in-process LRU first, then from a host-local on-disk copy of its parsed
+#   contents, and only read from the share when neither is valid.
+#
+#   Validity of a cached entry is determined by the path, modification time
+#   and size of the source file, so a single stat() of the source replaces
+#   an open() + read() + json parse.
+#
+#   Set ENVR_CONFIG_DISK_CACHE=0 to disable the on-disk tier.
+#
+# ----------------------------------------------------------------------------
+
+_DEFAULT_MAX_ENTRIES = 64
+
+
+def copy_json_data(data):
+
+    # Fast deep copy for data loaded from JSON (dicts, lists and scalars).
+    # Callers are free to mutate loaded config data (e.g. site specs get
+    # marked with "site": True) so cached data is never handed out directly.
+    data_type = type(data)
+    if data_type is dict:
+        return {k: copy_json_data(v) for (k, v) in data.items()}
+    elif data_type is list:
+        return [copy_json_data(v) for v in data]
+    return data
+
+
+def get_file_stamp(filepath):
+
+    st = os.stat(filepath)
+    return [st.st_mtime, st.st_size]
+
+
+class ConfigCache(object):
+
+    def __init__(self, max_entries=_DEFAULT_MAX_ENTRIES, disk_cache_dir=None):
+
+        self.max_entries = max_entries
+        self.disk_cache_dir = disk_cache_dir
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+        }
+
+    def load_json(self, json_filepath):
+
+        start_t = time.perf_counter()
+        filepath = fslash(os.path.abspath(json_filepath))
+        stamp = get_file_stamp(filepath)
+
+        entry_data = None
+        with self._lock:
+            entry = self._entries.pop(filepath, None)
+            if entry is not None:
+                if entry['stamp'] == stamp:
+                    self.stats['memory_hits'] += 1
+                    self._entries[filepath] = entry  # most recently used
+                    entry_data = copy_json_data(entry['data'])
+                else:
+                    self.stats['invalidations'] += 1
+                    entry = None
+
+        if entry is not None:
+            self._emit_config_loaded(filepath, 'memory', stamp, start_t)
+            return entry_data
+
+        source = 'disk'
+        data = self._read_disk_cache(filepath, stamp)
+        if data is not None:
+            with self._lock:
+                self.stats['disk_hits'] += 1
+        else:
+            source = 'file'
+            with open(filepath, 'r') as in_fp:
+                data = json.load(in_fp)
+            with self._lock:
+                self.stats['misses'] += 1
+            self._write_disk_cache(filepath, stamp, data)
+
+        with self._lock:
+            self._entries[filepath] = {'stamp': stamp, 'data': data}
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        data = copy_json_data(data)
+        self._emit_config_loaded(filepath, source, stamp, start_t)
+        return data
+
+    def _emit_config_loaded(self, filepath, source, stamp, start_t):
+
+        if has_event_callbacks(CONFIG_LOADED):
+            emit_event(CONFIG_LOADED, {
+                'path': filepath,
+                'source': source,
+                'size': stamp[1],
+                'secs': time.perf_counter() - start_t,
+            })
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+
+        with self._lock:
+            stats_d = self.stats.copy()
+        stats_d['entries'] = len(self._entries)
+        return stats_d
+
+    def _get_disk_cache_filepath(self, filepath):
+
+        path_hash = hashlib.sha1(filepath.encode('utf-8')).hexdigest()
+        return '%s/%s.json' % (self.disk_cache_dir, path_hash)
+
+    def _read_disk_cache(self, filepath, stamp):
+
+        if not self.disk_cache_dir:
+            return None
+
+        cache_filepath = self._get_disk_cache_filepath(filepath)
+        try:
+            with open(cache_filepath, 'r') as in_fp:
+                cache_d = json.load(in_fp)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if cache_d.get('path') != filepath or cache_d.get('stamp') != stamp:
+            with self._lock:
+                self.stats['invalidations'] += 1
+            return None
+
+        return cache_d.get('data')
+
+    def _write_disk_cache(self, filepath, stamp, data):
+
+        if not self.disk_cache_dir:
+            return
+
+        cache_filepath = self._get_disk_cache_filepath(filepath)
+        tmp_filepath = '%s.%s.tmp' % (cache_filepath, os.getpid())
+
+        # failure to write the local cache must never break a launch
+        try:
+            if not os.path.isdir(self.disk_cache_dir):
+                os.makedirs(self.disk_cache_dir)
+            with open(tmp_filepath, 'w') as out_fp:
+                json.dump({'path': filepath, 'stamp': stamp, 'data': data},
+                          out_fp)
+            os.replace(tmp_filepath, cache_filepath)
+        except (IOError, OSError):
+            pass
+
+
+_CONFIG_CACHE = None
+
+
+def get_config_cache():
+
+    global _CONFIG_CACHE
+
+    if _CONFIG_CACHE is None:
+        disk_cache_dir = None
+        if os.getenv('ENVR_CONFIG_DISK_CACHE', '1') != '0':
+            disk_cache_dir = get_local_cache_root('config_cache')
+        _CONFIG_CACHE = ConfigCache(disk_cache_dir=disk_cache_dir)
+
+    return _CONFIG_CACHE
+
+
+def load_config_json(json_filepath):
+
+    return get_config_cache().load_json(json_filepath)
+
+
+def get_config_cache_stats():
+
+    return get_config_cache().get_stats()
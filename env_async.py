@@ -0,0 +1,272 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import time
+import asyncio
+import subprocess
+
+from .env_mechanism import _emit_process_spawned, _emit_process_exited
+
+
+# --- asyncio launch interface -----------------------------------------------
+#
+#   Coroutine counterparts of the EnvRunnerEnv launch methods, for use from
+#   an asyncio event loop. Nothing here blocks the loop, so a single loop
+#   can supervise many envrunner launched processes at once.
+#
+#   This module is Python 3 only, EnvRunnerEnv imports it on first use of
+#   one of its async_*() methods.
+#
+# ----------------------------------------------------------------------------
+
+PIPE = asyncio.subprocess.PIPE
+DEVNULL = asyncio.subprocess.DEVNULL
+STDOUT = asyncio.subprocess.STDOUT
+
+DEFAULT_STOP_GRACE_PERIOD = 5.0
+
+
+class AsyncEnvProcess(object):
+
+    # Handle on a child process started by create_subprocess()
+
+    def __init__(self, process, cmd_and_args, start_t=None):
+
+        self.process = process
+        self.cmd_and_args = cmd_and_args
+        self.start_time = time.time()
+        self.end_time = None
+
+        # perf_counter() time the launch started, for the events
+        self._start_t = (start_t if start_t is not None
+                            else time.perf_counter())
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    @property
+    def returncode(self):
+        return self.process.returncode
+
+    @property
+    def duration(self):
+        return (self.end_time or time.time()) - self.start_time
+
+    def stdout_lines(self, encoding='utf-8'):
+        return iter_stream_lines(self.process.stdout, encoding)
+
+    def stderr_lines(self, encoding='utf-8'):
+        return iter_stream_lines(self.process.stderr, encoding)
+
+    async def output_lines(self, encoding='utf-8'):
+
+        # stdout and stderr lines interleaved in the order they arrive, as
+        # (stream_name, line) tuples
+        queue = asyncio.Queue()
+
+        async def _pump(stream_name, stream):
+            try:
+                async for line in iter_stream_lines(stream, encoding):
+                    await queue.put((stream_name, line))
+            finally:
+                await queue.put(None)
+
+        pump_list = []
+        for (stream_name, stream) in (('stdout', self.process.stdout),
+                                      ('stderr', self.process.stderr)):
+            if stream is not None:
+                pump_list.append(asyncio.ensure_future(
+                                                _pump(stream_name, stream)))
+        try:
+            remaining = len(pump_list)
+            while remaining:
+                item = await queue.get()
+                if item is None:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            for pump in pump_list:
+                pump.cancel()
+
+    def terminate(self):
+
+        if self.process.returncode is None:
+            try:
+                self.process.terminate()
+            except ProcessLookupError:
+                pass
+
+    def kill(self):
+
+        if self.process.returncode is None:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def stop(self, grace_period=DEFAULT_STOP_GRACE_PERIOD):
+
+        # terminate, then kill if still running after grace_period seconds
+        self.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), grace_period)
+        except asyncio.TimeoutError:
+            self.kill()
+            await self.process.wait()
+
+        self._set_exited()
+        return self.process.returncode
+
+    async def wait(self, timeout=None,
+                   grace_period=DEFAULT_STOP_GRACE_PERIOD):
+
+        # On timeout, or if the awaiting task is cancelled, the process is
+        # stopped before asyncio.TimeoutError/CancelledError is raised
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            await asyncio.shield(self.stop(grace_period))
+            raise
+
+        self._set_exited()
+        return self.process.returncode
+
+    async def communicate(self, input=None, timeout=None,
+                          grace_period=DEFAULT_STOP_GRACE_PERIOD):
+
+        try:
+            out, err = await asyncio.wait_for(
+                                self.process.communicate(input), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            await asyncio.shield(self.stop(grace_period))
+            raise
+
+        self._set_exited()
+        return (out, err)
+
+    def _set_exited(self):
+
+        # called wherever waiting on the process finishes, the exit is only
+        # recorded (and emitted) once
+        if self.end_time is None:
+            self.end_time = time.time()
+            _emit_process_exited(self.cmd_and_args, self, self._start_t)
+
+
+async def iter_stream_lines(stream, encoding='utf-8'):
+
+    # async iterator of decoded lines (without line endings) from a
+    # subprocess stream
+    if stream is None:
+        return
+
+    while True:
+        line = await stream.readline()
+        if not line:
+            break
+        if encoding:
+            line = line.decode(encoding, 'replace')
+            yield line.rstrip('\r\n')
+        else:
+            yield line.rstrip(b'\r\n')
+
+
+async def create_subprocess(cmd_and_args, child_env_d, stdin=None,
+                            stdout=PIPE, stderr=PIPE, cwd=None, **kwargs):
+
+    # cmd_and_args should already be expanded against child_env_d, as done
+    # by EnvRunnerEnv.async_launch_subprocess()
+    start_t = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+                            *cmd_and_args, stdin=stdin, stdout=stdout,
+                            stderr=stderr, cwd=cwd, env=child_env_d, **kwargs)
+
+    env_proc = AsyncEnvProcess(process, cmd_and_args, start_t)
+    _emit_process_spawned(cmd_and_args, env_proc, False, start_t)
+    return env_proc
+
+
+async def run(cmd_and_args, child_env_d, timeout=None, cwd=None,
+              grace_period=DEFAULT_STOP_GRACE_PERIOD):
+
+    # Runs to completion capturing output, returns a result dict in the same
+    # form as the entries returned by EnvRunnerEnv.launch_many()
+    result_d = {
+        'command': cmd_and_args[0],
+        'args': list(cmd_and_args[1:]),
+        'returncode': None,
+        'duration': 0.0,
+        'stdout': '',
+        'stderr': '',
+        'status': 'error',
+        'error': None,
+    }
+
+    start_t = time.time()
+    try:
+        env_proc = await create_subprocess(cmd_and_args, child_env_d,
+                                           stdin=DEVNULL, cwd=cwd)
+    except OSError as os_err:
+        result_d.update({'duration': time.time() - start_t,
+                         'error': str(os_err)})
+        return result_d
+
+    try:
+        out, err = await env_proc.communicate(timeout=timeout,
+                                              grace_period=grace_period)
+    except asyncio.TimeoutError:
+        result_d.update({
+            'returncode': env_proc.returncode,
+            'duration': env_proc.duration,
+            'status': 'timeout',
+            'error': 'Timed out after %s seconds' % timeout,
+        })
+        return result_d
+
+    result_d.update({
+        'returncode': env_proc.returncode,
+        'duration': env_proc.duration,
+        'stdout': out.decode('utf-8', 'replace'),
+        'stderr': err.decode('utf-8', 'replace'),
+        'status': 'ok' if env_proc.returncode == 0 else 'failed',
+    })
+    return result_d
+
+
+async def check_call(cmd_and_args, child_env_d, timeout=None, cwd=None,
+                     grace_period=DEFAULT_STOP_GRACE_PERIOD):
+
+    # async counterpart of subprocess.check_call(), child output is not
+    # captured
+    env_proc = await create_subprocess(cmd_and_args, child_env_d,
+                                       stdout=None, stderr=None, cwd=cwd)
+
+    returncode = await env_proc.wait(timeout=timeout,
+                                     grace_period=grace_period)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd_and_args)
+
+    return returncode
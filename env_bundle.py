@@ -0,0 +1,169 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import json
+
+from .os_util import os_info, conform_env_key
+from .install_probe import get_install_probe
+
+
+# --- Resolved env bundle ----------------------------------------------------
+#
+#   A resolved env bundle is a compact, versioned JSON file holding the
+#   result of resolving an EnvRunnerEnv, so it can be re-used on another
+#   host (e.g. a render farm worker) without resolving the session spec
+#   again. It holds:
+#
+#       fingerprint ... resolve key (see resolve_cache.build_resolve_key) of
+#                       the inputs, which includes os_info and path slash,
+#                       so a bundle only matches the platform it was made on
+#
+#       env_deps, probe_deps ... base env var values and install location
+#                                existence that resolution depended on
+#
+#       the resolved env spec and info by env var, from which the final env
+#       is evaluated ... path type env vars are pre/post-pended to the base
+#       values of the host loading the bundle, like a normal resolve does
+#
+#       the active sw info (install locations, versions, dev installs)
+#
+#   A bundle is only used when all of the above still match on the loading
+#   host, otherwise it is resolved as normal.
+#
+# ----------------------------------------------------------------------------
+
+ENV_BUNDLE_FORMAT_VERSION = 1
+
+ENV_BUNDLE_TYPE = 'resolved_env_bundle'
+ENV_BUNDLE_FILENAME = 'envrunner_env_bundle.json'
+
+
+def get_platform_info(path_slash):
+
+    return {
+        'os': os_info.os,
+        'distro': os_info.distro,
+        'version': os_info.version,
+        'path_slash': path_slash,
+        'pathsep': os.pathsep,
+    }
+
+
+def build_env_bundle(envr_env):
+
+    # Returns the bundle dict of a resolved EnvRunnerEnv, or None if its
+    # resolved env is specific to its session
+    env_var_refs = envr_env.get_env_var_refs()
+    if 'ENVR_SESSION_SPEC_FILE' in env_var_refs:
+        return None
+
+    # path type env vars are merged onto the loading host's base values, so
+    # only other referenced env vars need to match
+    path_var_names = set([
+                var_name for var_name in envr_env.env_var_names
+                    if envr_env.info_by_env_var[var_name]['type'] == 'path'])
+    env_dep_names = env_var_refs - path_var_names
+    env_dep_names.add('ENVR_CFG_SW_ENVS_ROOT')
+
+    snapshot = envr_env.active_sw_snapshot
+
+    return {
+        '__type__': ENV_BUNDLE_TYPE,
+        '__version__': ENV_BUNDLE_FORMAT_VERSION,
+        'fingerprint': envr_env.get_resolve_fingerprint(),
+        'platform': get_platform_info(envr_env.path_slash),
+        'project_code': envr_env.prj_code,
+        'active_sw_list': envr_env.active_sw_list,
+        'env_deps': {env_var: envr_env.get_base_env_value(env_var)
+                        for env_var in sorted(env_dep_names)},
+        'probe_deps': snapshot.probe_deps,
+        'env_spec_list': envr_env.env_spec_list,
+        'env_var_names': envr_env.env_var_names,
+        'info_by_env_var': envr_env.info_by_env_var,
+        'expansion_report': envr_env.expansion_report,
+        'active_sw_info': snapshot.get_portable_sw_info(),
+        'resulting_env_d': envr_env.resulting_env_d,  # for reference only
+    }
+
+
+def write_env_bundle(envr_env, bundle_filepath):
+
+    # Returns True if a bundle was written
+    bundle_d = build_env_bundle(envr_env)
+    if bundle_d is None:
+        return False
+
+    with open(bundle_filepath, 'w') as out_fp:
+        json.dump(bundle_d, out_fp, sort_keys=True, separators=(',', ':'))
+
+    return True
+
+
+def load_env_bundle(bundle_filepath):
+
+    # Returns the bundle dict, or None if there isn't a usable bundle file
+    try:
+        with open(bundle_filepath, 'r') as in_fp:
+            bundle_d = json.load(in_fp)
+    except (IOError, OSError, ValueError):
+        return None
+
+    if type(bundle_d) is not dict or \
+            bundle_d.get('__type__') != ENV_BUNDLE_TYPE or \
+            bundle_d.get('__version__') != ENV_BUNDLE_FORMAT_VERSION:
+        return None
+
+    return bundle_d
+
+
+def get_env_bundle_mismatch(bundle_d, fingerprint, env_d=None):
+
+    # Returns why bundle_d can not be used on this host, or None if it can
+    if env_d is None:
+        env_d = os.environ
+
+    if bundle_d['fingerprint'] != fingerprint:
+        if bundle_d['platform'] != get_platform_info(
+                                    bundle_d['platform']['path_slash']):
+            return 'made on a different platform (%s %s %s)' % (
+                                    bundle_d['platform']['os'],
+                                    bundle_d['platform']['distro'],
+                                    bundle_d['platform']['version'])
+        return 'inputs do not match'
+
+    for (env_var, value) in bundle_d['env_deps'].items():
+        if env_d.get(conform_env_key(env_var)) != value:
+            return 'env var "%s" does not match' % env_var
+
+    probe_deps = bundle_d['probe_deps']
+    if probe_deps:
+        path_list = list(probe_deps.keys())
+        isdir_list = get_install_probe().probe_dirs(path_list)
+        for (path, isdir) in zip(path_list, isdir_list):
+            if probe_deps[path] != isdir:
+                return 'install location "%s" does not match' % path
+
+    return None
@@ -0,0 +1,400 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import re
+
+
+# --- ${VAR} expansion engine ------------------------------------------------
+#
+#   Expands embedded "${VAR}" references in env var values by building the
+#   reference graph between the env vars once, then evaluating each var
+#   exactly once with everything it references evaluated before it.
+#
+#   Reference resolution rules (same as the original multi-pass expansion):
+#
+#       - a reference to a var defined by the spec list uses that var's
+#         expanded value, as long as that value is "complete" (does not
+#         itself still contain references to defined vars)
+#
+#       - references to path type vars, and references to vars that are
+#         part of a reference cycle, are left as-is
+#
+#       - any other reference is looked up in the base environment, and
+#         left as-is if it is not set there (or is empty)
+#
+#   Anything left as-is is reported, cycles are reported separately.
+#
+#   Given the expander of a previous resolution (expand_all(prev_expander)),
+#   only vars whose value changed, or that reference (directly or not) a
+#   var that changed or came or went, are expanded again. The results of
+#   all other vars are taken from prev_expander.
+#
+# ----------------------------------------------------------------------------
+
+EMBEDDED_VAR_REGEX = re.compile(r'\${([A-Za-z0-9_]+)}')
+
+# also matches "${@VER}" style references, that are relative to the sw
+# package whose env spec they are in
+TEMPLATE_REF_REGEX = re.compile(r'\${(@?[A-Za-z0-9_]+)}')
+
+_MAX_CACHED_TEMPLATES = 50000
+
+
+class EnvValueTemplate(object):
+
+    # A value string parsed once into alternating literal and reference
+    # parts, e.g. "${ROOT}/lib:${@INSTALL}/bin" is held as:
+    #
+    #     ['', 'ROOT', '/lib:', '@INSTALL', '/bin']
+    #
+    # (even indices are literals, odd indices are referenced var names)
+
+    __slots__ = ('source', 'parts', 'refs', 'has_sw_at_refs')
+
+    def __init__(self, source):
+
+        self.source = source
+        self.parts = (TEMPLATE_REF_REGEX.split(source)
+                        if '${' in source else [source])
+
+        refs = []
+        has_sw_at_refs = False
+        for ref_var in self.parts[1::2]:
+            if ref_var[0] == '@':
+                has_sw_at_refs = True
+            elif ref_var not in refs:
+                refs.append(ref_var)
+
+        self.refs = tuple(refs)
+        self.has_sw_at_refs = has_sw_at_refs
+
+    def render(self, value_by_ref):
+
+        # references missing from value_by_ref are left as-is
+        if len(self.parts) == 1:
+            return self.source
+
+        parts = self.parts[:]
+        for part_idx in range(1, len(parts), 2):
+            ref_var = parts[part_idx]
+            value = value_by_ref.get(ref_var)
+            parts[part_idx] = ('${%s}' % ref_var) if value is None else value
+
+        return ''.join(parts)
+
+    def render_sw_at_refs(self, sw_caps_name):
+
+        # "${@VER}" -> "${ENVR_SW_<SW_CAPS_NAME>__VER}"
+        if not self.has_sw_at_refs:
+            return self.source
+
+        parts = self.parts[:]
+        for part_idx in range(1, len(parts), 2):
+            ref_var = parts[part_idx]
+            if ref_var[0] == '@':
+                parts[part_idx] = '${ENVR_SW_%s__%s}' % (sw_caps_name,
+                                                         ref_var[1:])
+            else:
+                parts[part_idx] = '${%s}' % ref_var
+
+        return ''.join(parts)
+
+
+_TEMPLATE_BY_SOURCE = {}
+
+
+def compile_template(source):
+
+    # templates are immutable, so they are shared by every resolution in the
+    # process that sees the same value string
+    template = _TEMPLATE_BY_SOURCE.get(source)
+    if template is None:
+        if len(_TEMPLATE_BY_SOURCE) >= _MAX_CACHED_TEMPLATES:
+            _TEMPLATE_BY_SOURCE.clear()
+        template = EnvValueTemplate(source)
+        _TEMPLATE_BY_SOURCE[source] = template
+
+    return template
+
+
+def find_strongly_connected_vars(refs_by_var):
+
+    # Iterative Tarjan's algorithm. Groups are returned in dependency order,
+    # i.e. any group is preceded by all groups it references.
+    next_index = 0
+    index_by_var = {}
+    lowlink_by_var = {}
+    stack = []
+    on_stack = set()
+    group_list = []
+
+    for root_var in refs_by_var:
+        if root_var in index_by_var:
+            continue
+
+        index_by_var[root_var] = lowlink_by_var[root_var] = next_index
+        next_index += 1
+        stack.append(root_var)
+        on_stack.add(root_var)
+        work_list = [(root_var, iter(refs_by_var[root_var]))]
+
+        while work_list:
+            var_name, ref_iter = work_list[-1]
+            descended = False
+            for ref_var in ref_iter:
+                if ref_var not in index_by_var:
+                    index_by_var[ref_var] = lowlink_by_var[ref_var] = \
+                                                                next_index
+                    next_index += 1
+                    stack.append(ref_var)
+                    on_stack.add(ref_var)
+                    work_list.append((ref_var, iter(refs_by_var[ref_var])))
+                    descended = True
+                    break
+                elif ref_var in on_stack:
+                    lowlink_by_var[var_name] = min(lowlink_by_var[var_name],
+                                                   index_by_var[ref_var])
+            if descended:
+                continue
+
+            work_list.pop()
+            if work_list:
+                parent_var = work_list[-1][0]
+                lowlink_by_var[parent_var] = min(lowlink_by_var[parent_var],
+                                                 lowlink_by_var[var_name])
+
+            if lowlink_by_var[var_name] == index_by_var[var_name]:
+                group = []
+                while True:
+                    group_var = stack.pop()
+                    on_stack.discard(group_var)
+                    group.append(group_var)
+                    if group_var == var_name:
+                        break
+                group_list.append(group)
+
+    return group_list
+
+
+class EnvVarExpander(object):
+
+    def __init__(self, value_by_var, unexpandable_var_names=None,
+                 lookup_fn=None):
+
+        # value_by_var ... dict of env var name to raw value string for all
+        #                  "var" and "single_path" type env vars
+        #
+        # unexpandable_var_names ... names of vars that are defined by the
+        #                            spec list but have no single value to
+        #                            expand (i.e. path type env vars)
+        #
+        # lookup_fn ... used to look up references to vars not defined in
+        #               the spec list, defaults to os.getenv
+
+        self.value_by_var = value_by_var
+        self.template_by_var = {var_name: compile_template(value)
+                                    for (var_name, value) in
+                                        value_by_var.items()}
+        self.unexpandable_var_names = set(unexpandable_var_names or [])
+        self.lookup_fn = lookup_fn if lookup_fn is not None else os.getenv
+
+        self.expanded_by_var = {}
+        self.complete_var_set = set()
+        self.cycle_list = []
+        self.unresolved_refs_by_var = {}
+
+        # set by expand_all(prev_expander) ... vars that were expanded again,
+        # and names that changed between being defined, path type or not
+        # defined at all
+        self.expanded_var_set = None
+        self.changed_ref_set = set()
+
+        self._external_value_by_var = {}
+
+    def expand_all(self, prev_expander=None):
+
+        # prev_expander must have been used against the same base
+        # environment (lookup_fn results are reused)
+        defined_refs_by_var = {}
+        for (var_name, template) in self.template_by_var.items():
+            defined_refs_by_var[var_name] = [r for r in template.refs
+                                                if r in self.value_by_var]
+
+        if prev_expander is not None:
+            self.expanded_var_set = self._reuse_unchanged(prev_expander,
+                                                          defined_refs_by_var)
+            defined_refs_by_var = {
+                var_name: [r for r in defined_refs_by_var[var_name]
+                                if r in self.expanded_var_set]
+                    for var_name in self.expanded_var_set}
+        else:
+            self.expanded_var_set = set(self.value_by_var.keys())
+
+        group_list = find_strongly_connected_vars(defined_refs_by_var)
+
+        cyclic_var_set = set()
+        for group in group_list:
+            if len(group) > 1 or group[0] in defined_refs_by_var[group[0]]:
+                self.cycle_list.append(sorted(group))
+                cyclic_var_set.update(group)
+
+        for group in group_list:
+            for var_name in group:
+                self._expand_var(var_name, var_name in cyclic_var_set)
+
+        return self.expanded_by_var
+
+    def _reuse_unchanged(self, prev_expander, defined_refs_by_var):
+
+        # Takes the results of prev_expander for every var that would expand
+        # the same, returns the set of vars that need expanding again
+        prev_value_by_var = prev_expander.value_by_var
+
+        self.changed_ref_set = set(self.value_by_var.keys())
+        self.changed_ref_set.symmetric_difference_update(
+                                                prev_value_by_var.keys())
+        self.changed_ref_set.update(
+                self.unexpandable_var_names.symmetric_difference(
+                                        prev_expander.unexpandable_var_names))
+
+        expand_var_list = [
+            var_name for (var_name, value) in self.value_by_var.items()
+                if prev_value_by_var.get(var_name) != value or
+                    not self.changed_ref_set.isdisjoint(
+                                    self.template_by_var[var_name].refs)]
+
+        # ... plus everything referencing those, directly or not
+        referrers_by_var = {}
+        for (var_name, ref_list) in defined_refs_by_var.items():
+            for ref_var in ref_list:
+                referrers_by_var.setdefault(ref_var, []).append(var_name)
+
+        expand_var_set = set(expand_var_list)
+        while expand_var_list:
+            for referrer in referrers_by_var.get(expand_var_list.pop(), ()):
+                if referrer not in expand_var_set:
+                    expand_var_set.add(referrer)
+                    expand_var_list.append(referrer)
+
+        for var_name in self.value_by_var:
+            if var_name in expand_var_set:
+                continue
+            self.expanded_by_var[var_name] = \
+                                    prev_expander.expanded_by_var[var_name]
+            if var_name in prev_expander.complete_var_set:
+                self.complete_var_set.add(var_name)
+            if var_name in prev_expander.unresolved_refs_by_var:
+                self.unresolved_refs_by_var[var_name] = \
+                            prev_expander.unresolved_refs_by_var[var_name]
+
+        # cycles are only ever between vars that are all reused, or all
+        # expanded again
+        for cycle_var_list in prev_expander.cycle_list:
+            if cycle_var_list[0] not in expand_var_set and \
+                    cycle_var_list[0] in self.value_by_var:
+                self.cycle_list.append(cycle_var_list)
+
+        self._external_value_by_var = dict(
+                                    prev_expander._external_value_by_var)
+
+        return expand_var_set
+
+    def is_ref_changed(self, ref_var):
+
+        # whether a reference to ref_var may now expand differently than it
+        # did with the prev_expander given to expand_all()
+        return ref_var in self.expanded_var_set or \
+                    ref_var in self.changed_ref_set
+
+    def _expand_var(self, var_name, is_cyclic):
+
+        template = self.template_by_var[var_name]
+
+        if not template.refs:
+            self.expanded_by_var[var_name] = template.source
+            self.complete_var_set.add(var_name)
+            return
+
+        # vars in a cycle never become complete, so references back into
+        # the cycle are left as-is
+        expanded_value, unresolved_refs = self._render(template)
+        self.expanded_by_var[var_name] = expanded_value
+
+        if unresolved_refs:
+            self.unresolved_refs_by_var[var_name] = sorted(set(
+                                                            unresolved_refs))
+        # a var is complete when all of its references to other defined vars
+        # were expanded ... unset base env references don't count
+        if not is_cyclic and not [r for r in unresolved_refs
+                                    if self._is_defined(r)]:
+            self.complete_var_set.add(var_name)
+
+    def _is_defined(self, ref_var):
+
+        return (ref_var in self.value_by_var or
+                ref_var in self.unexpandable_var_names)
+
+    def _lookup_external(self, ref_var):
+
+        if ref_var not in self._external_value_by_var:
+            self._external_value_by_var[ref_var] = self.lookup_fn(ref_var)
+        return self._external_value_by_var[ref_var]
+
+    def _render(self, template):
+
+        value_by_ref = {}
+        unresolved_refs = []
+
+        for ref_var in template.refs:
+            if ref_var in self.value_by_var:
+                if ref_var in self.complete_var_set:
+                    value_by_ref[ref_var] = self.expanded_by_var[ref_var]
+                    continue
+            elif ref_var not in self.unexpandable_var_names:
+                ext_value = self._lookup_external(ref_var)
+                if ext_value:
+                    value_by_ref[ref_var] = ext_value
+                    continue
+            unresolved_refs.append(ref_var)
+
+        return (template.render(value_by_ref), unresolved_refs)
+
+    def expand_str(self, value_str):
+
+        # Expands references in a value that is not itself part of the
+        # reference graph (e.g. path type env var values), must be called
+        # after expand_all(). Returns (expanded_str, unresolved_ref_list)
+
+        template = compile_template(value_str)
+        if not template.refs:
+            return (value_str, [])
+        return self._render(template)
+
+    def get_report(self):
+
+        return {
+            'cycles': self.cycle_list,
+            'unresolved_refs_by_var': self.unresolved_refs_by_var,
+        }
@@ -23,20 +23,43 @@
 # -----------------------------------------------------------------------------
 
 import os
-import re
 import sys
 import json
 import time
 import getpass
 import datetime
+import itertools
+import threading
 import subprocess
 
 from .os_util import (
-    os_info, fslash, conform_path_slash, reset_bootstrap_env,
+    os_info, fslash, conform_path_slash, reset_bootstrap_env, expand_env_vars,
+    get_bootstrap_env_d, conform_env_key,
     ENVR_CFG_ROOT, ENVR_CFG_SITE_ROOT, ENVR_CFG_PROJECTS_ROOT,
     ENVR_CFG_SW_ENVS_ROOT
 )
 from .active_software import ActiveSoftwareSnapshot
+from .config_cache import load_config_json
+from .env_expansion import (
+    EMBEDDED_VAR_REGEX,
+    EnvVarExpander,
+    compile_template,
+)
+from .env_bundle import get_env_bundle_mismatch, load_env_bundle
+from .envr_logging import envr_info, envr_warning
+from .events import (
+    SPEC_FLATTENED,
+    VARS_EXPANDED,
+    SESSION_SPEC_WRITTEN,
+    PROCESS_SPAWNED,
+    PROCESS_EXITED,
+    emit_event,
+    has_event_callbacks,
+)
+from .launch_timings import NULL_LAUNCH_TIMINGS
+from .resolve_cache import (
+    build_resolve_key, collect_env_var_refs, get_resolve_cache
+)
 
 
 if sys.version_info.major > 2:
@@ -45,14 +68,12 @@ if sys.version_info.major > 2:
 
 _ENVRUNNER_PARENT_DIR = os.path.dirname(os.path.dirname(
                                             os.path.abspath(__file__)))
-EMBEDDED_VAR_PATTERN = r'\${[A-Za-z0-9_]+}'
 
 
 def get_all_embedded_vars(input_str):
 
     try:
-        embedded_var_list = [ev[2:-1] for ev in
-                                re.findall(EMBEDDED_VAR_PATTERN, input_str)]
+        embedded_var_list = EMBEDDED_VAR_REGEX.findall(input_str)
     except:
         print('>>>')
         print('>>>')
@@ -65,11 +86,24 @@ def get_all_embedded_vars(input_str):
     return embedded_var_list
 
 
-def get_user_session_info():
+def _which(cmd, search_path):
+
+    if sys.version_info.major < 3:
+        return None
+
+    import shutil
+    return shutil.which(cmd, path=search_path)
 
-    all_users_sessions_root = os.getenv('ENVR_ALL_USERS_SESSIONS_ROOT')
+
+def get_user_session_info(create_dirs=True, env_d=None):
+
+    # env_d defaults to os.environ
+    if env_d is None:
+        env_d = os.environ
+
+    all_users_sessions_root = env_d.get('ENVR_ALL_USERS_SESSIONS_ROOT')
     if not all_users_sessions_root:
-        envr_user_data_root = os.getenv('ENVR_ALL_USERS_DATA_ROOT')
+        envr_user_data_root = env_d.get('ENVR_ALL_USERS_DATA_ROOT')
         if envr_user_data_root:
             all_users_sessions_root = os.path.join(envr_user_data_root,
                                                    'envr_user_sessions')
@@ -96,7 +130,7 @@ def get_user_session_info():
     user_session_day_dirpath = '%s/%s/%s' % (all_users_sessions_root,
                                              getpass.getuser(),
                                              session_day_date_str)
-    if not os.path.isdir(user_session_day_dirpath):
+    if create_dirs and not os.path.isdir(user_session_day_dirpath):
         os.makedirs(user_session_day_dirpath)
 
     return {
@@ -108,46 +142,54 @@ def get_user_session_info():
 
 def _load_configs(prj_code):
 
+    # config files are served through the parsed config cache, so repeat
+    # launches only stat() these files instead of re-reading them
     site_spec_list_file = '%s/site_env.json' % ENVR_CFG_SITE_ROOT
-    with open(site_spec_list_file, 'r') as fp:
-        site_env_spec_list = json.load(fp)
+    site_env_spec_list = load_config_json(site_spec_list_file)
 
     prj_spec_list_file = (
         '%s/%s/%s_env.json' % (ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code))
-    with open(prj_spec_list_file, 'r') as fp:
-        prj_env_spec_list = json.load(fp)
+    prj_env_spec_list = load_config_json(prj_spec_list_file)
 
     prj_sw_versions_file = (
         '%s/%s/%s_sw_versions.json' % (
                             ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code))
-    with open(prj_sw_versions_file, 'r') as fp:
-        prj_sw_versions_d = json.load(fp)
+    prj_sw_versions_d = load_config_json(prj_sw_versions_file)
 
     site_sw_defs_file = '%s/sw_definitions.json' % ENVR_CFG_SITE_ROOT
-    with open(site_sw_defs_file, 'r') as fp:
-        sw_defs_d = json.load(fp)
+    sw_defs_d = load_config_json(site_sw_defs_file)
 
     return (
         site_env_spec_list, prj_env_spec_list, prj_sw_versions_d, sw_defs_d)
 
 
-def create_env(prj_code, active_sw_list, extra_env_spec_list=None):
+def create_env(prj_code, active_sw_list, extra_env_spec_list=None,
+               pure=False, base_env_d=None):
 
     (site_env_spec_list, prj_env_spec_list,
         prj_sw_versions_d, sw_defs_d) = _load_configs(prj_code)
 
     envr_env = EnvRunnerEnv(active_sw_list, sw_defs_d, site_env_spec_list,
                             prj_code, prj_sw_versions_d, prj_env_spec_list,
-                            extra_env_spec_list=extra_env_spec_list)
+                            extra_env_spec_list=extra_env_spec_list,
+                            pure=pure, base_env_d=base_env_d)
     return envr_env
 
 
-def create_from_launch_config(prj_code, launch_cfg_filepath):
+def create_from_launch_config(prj_code, launch_cfg_filepath, timings=None,
+                              pure=False, base_env_d=None):
+
+    # timings, if given, is a launch_timings.LaunchTimings to record the
+    # time taken by each phase in ... see EnvRunnerEnv for pure and
+    # base_env_d
+    if timings is None:
+        timings = NULL_LAUNCH_TIMINGS
 
     # We first load the launch config (runner .json file) and see if it
     # has a session spec ... session spec is processed differently
-    with open(launch_cfg_filepath, 'r') as fp:
-        launch_cfg_d = json.load(fp)
+    with timings.phase('launch_cfg_load'):
+        with open(launch_cfg_filepath, 'r') as fp:
+            launch_cfg_d = json.load(fp)
 
     if 'session_spec' in launch_cfg_d:
         session_spec_d = launch_cfg_d['session_spec']
@@ -158,26 +200,115 @@ def create_from_launch_config(prj_code, launch_cfg_filepath):
         active_sw_list = session_spec_d['full_active_sw_list']
         extra_env_spec_list = session_spec_d['extra_env_spec_list']
     else:
-        (site_env_spec_list, prj_env_spec_list,
-            prj_sw_versions_d, sw_defs_d) = _load_configs(prj_code)
+        with timings.phase('config_load'):
+            (site_env_spec_list, prj_env_spec_list,
+                prj_sw_versions_d, sw_defs_d) = _load_configs(prj_code)
 
         active_sw_list = launch_cfg_d['active_sw']
         extra_env_spec_list = launch_cfg_d.get('extra_env', [])
 
-    envr_env = EnvRunnerEnv(active_sw_list, sw_defs_d, site_env_spec_list,
-                            prj_code, prj_sw_versions_d, prj_env_spec_list,
-                            extra_env_spec_list=extra_env_spec_list)
+    # a resolved env bundle (see env_bundle) written alongside the launch
+    # config, e.g. at render farm submit time, saves resolving again
+    env_bundle_d = None
+    if launch_cfg_d.get('env_bundle'):
+        with timings.phase('env_bundle_load'):
+            env_bundle_d = load_env_bundle(os.path.join(
+                        os.path.dirname(os.path.abspath(launch_cfg_filepath)),
+                        launch_cfg_d['env_bundle']))
+
+    with timings.phase('envr_env_init'):
+        envr_env = EnvRunnerEnv(active_sw_list, sw_defs_d, site_env_spec_list,
+                                prj_code, prj_sw_versions_d, prj_env_spec_list,
+                                extra_env_spec_list=extra_env_spec_list,
+                                env_bundle_d=env_bundle_d, timings=timings,
+                                pure=pure, base_env_d=base_env_d)
 
     return (envr_env, launch_cfg_d)
 
 
+def diff_env_d(old_env_d, new_env_d):
+
+    # {"added": {var: value}, "removed": {var: old_value},
+    #  "changed": {var: [old_value, new_value]}}
+    diff_d = {'added': {}, 'removed': {}, 'changed': {}}
+
+    for (env_var, value) in new_env_d.items():
+        if env_var not in old_env_d:
+            diff_d['added'][env_var] = value
+        elif old_env_d[env_var] != value:
+            diff_d['changed'][env_var] = [old_env_d[env_var], value]
+
+    for (env_var, value) in old_env_d.items():
+        if env_var not in new_env_d:
+            diff_d['removed'][env_var] = value
+
+    return diff_d
+
+
+# numbers the session spec files of derived envs (see EnvRunnerEnv.with_sw)
+_DERIVED_ENV_COUNTER = itertools.count(1)
+
+
+def _emit_process_spawned(cmd_and_args, p, detach, start_t):
+
+    if has_event_callbacks(PROCESS_SPAWNED):
+        is_shell_str = isinstance(cmd_and_args, (str, unicode))
+        emit_event(PROCESS_SPAWNED, {
+            'pid': p.pid,
+            'cmd': cmd_and_args if is_shell_str else cmd_and_args[0],
+            'arg_count': 0 if is_shell_str else len(cmd_and_args) - 1,
+            'detach': detach,
+            'secs': time.perf_counter() - start_t,
+        })
+
+
+def _emit_process_exited(cmd_and_args, p, start_t):
+
+    if has_event_callbacks(PROCESS_EXITED):
+        emit_event(PROCESS_EXITED, {
+            'pid': p.pid,
+            'cmd': (cmd_and_args if isinstance(cmd_and_args, (str, unicode))
+                        else cmd_and_args[0]),
+            'returncode': p.returncode,
+            'secs': time.perf_counter() - start_t,
+        })
+
+
 class EnvRunnerEnv(object):
 
     def __init__(self, active_sw_list, sw_defs_d, site_env_spec_list,
                  prj_code, prj_sw_versions_d, prj_env_spec_list,
-                 extra_env_spec_list=None, path_slash=None):
-
-        reset_bootstrap_env()
+                 extra_env_spec_list=None, path_slash=None,
+                 use_resolve_cache=True, env_bundle_d=None, timings=None,
+                 pure=False, base_env_d=None):
+
+        # see launch_timings, phases are only timed when timings is given
+        self.timings = timings if timings is not None else NULL_LAUNCH_TIMINGS
+
+        # With pure, resolving has no side effects, for read-only uses like
+        # previews and validation: the site env is bootstrapped onto a
+        # private copy of os.environ (which is left as-is) and nothing is
+        # written ... no session folder or session spec file, unless and
+        # until the env is launched. The resulting env is the same.
+        #
+        # base_env_d (pure only) is the environment to resolve against in
+        # place of os.environ, e.g. a launch daemon client's environment.
+        if base_env_d is not None and not pure:
+            raise Exception('A base env can only be given for a pure env')
+
+        self.pure = pure
+        if pure:
+            if base_env_d is None:
+                self._base_env_d = dict(os.environ)
+            else:
+                # keyed like os.environ, so lookups of conformed names work
+                self._base_env_d = {conform_env_key(env_var): value
+                                        for (env_var, value) in
+                                            base_env_d.items()}
+            self._base_env_d.update(get_bootstrap_env_d())
+        else:
+            reset_bootstrap_env()
+            self._base_env_d = os.environ
 
         self.path_slash = path_slash if path_slash is not None else os.sep
         self.opposite_path_slash = '\\' if self.path_slash == '/' else '/'
@@ -191,7 +322,8 @@ class EnvRunnerEnv(object):
         self.sw_defs_d = sw_defs_d
 
         self.site_env_spec_list = site_env_spec_list
-        self._bootstrap_site_env()
+        with self.timings.phase('bootstrap_site_env'):
+            self._bootstrap_site_env()
 
         self.active_sw_list = active_sw_list
 
@@ -202,12 +334,15 @@ class EnvRunnerEnv(object):
         self.active_sw_set = set([a_sw.split('@')[0] for a_sw in
                                     self.active_sw_list])
 
-        self.user_session_info = get_user_session_info()
-        self.user_current_session_root = os.path.join(
+        with self.timings.phase('user_session_setup'):
+            self.user_session_info = get_user_session_info(
+                                                create_dirs=not pure,
+                                                env_d=self._base_env_d)
+            self.user_current_session_root = os.path.join(
                     self.user_session_info.get('user_session_day_dirpath'),
                     self.user_session_info.get('session_ts_str'))
-        if not os.path.isdir(self.user_current_session_root):
-            os.makedirs(self.user_current_session_root)
+            if not pure and not os.path.isdir(self.user_current_session_root):
+                os.makedirs(self.user_current_session_root)
 
         self.session_spec_file = os.path.join(
                     self.user_current_session_root,
@@ -215,32 +350,235 @@ class EnvRunnerEnv(object):
                             self.user_session_info.get('session_ts_str'),
                             self.user_session_info.get('user')))
 
-        session_spec_d = {
+        self.prj_env_spec_list = prj_env_spec_list
+
+        if extra_env_spec_list is None:
+            extra_env_spec_list = []
+        self.extra_env_spec_list = extra_env_spec_list
+
+        if pure:
+            self._pending_session_spec_d = self._build_session_spec_d()
+        else:
+            with self.timings.phase('session_spec_write'):
+                self._write_session_spec(self._build_session_spec_d())
+            self._pending_session_spec_d = None
+
+        self._active_sw_snapshot = None
+        self._expander = None
+        self._raw_path_spec_list_by_var = None
+
+        self.env_spec_list = None
+        self.resulting_env_d = None
+
+        self.env_var_names = None
+        self.info_by_env_var = None
+        self.has_embedded_by_env_var = None
+        self.expansion_report = None
+
+        # when inputs are identical to a previous resolution (see
+        # resolve_cache) the resolved env is reused instead of re-evaluated
+        self.resolved_from_cache = False
+        self.resolved_from_bundle = False
+        self._resolve_fingerprint = None
+
+        if env_bundle_d is not None:
+            with self.timings.phase('env_bundle_apply'):
+                bundle_used = self._load_from_env_bundle(env_bundle_d)
+            self.timings.add_info(resolved_from_bundle=bundle_used)
+            if bundle_used:
+                return
+
+        resolve_key = None
+        if use_resolve_cache:
+            with self.timings.phase('resolve_cache_lookup'):
+                resolve_key = self.get_resolve_fingerprint()
+                cache_hit = self._load_from_resolve_cache(resolve_key)
+            self.timings.add_info(resolved_from_cache=cache_hit)
+            if cache_hit:
+                return
+
+        with self.timings.phase('resolve'):
+            self._resolve()
+
+        if resolve_key:
+            with self.timings.phase('resolve_cache_store'):
+                self._store_in_resolve_cache(resolve_key)
+
+    def _build_session_spec_d(self):
+
+        return {
             '__type__': 'session_spec',
-            'project_code': prj_code,
-            'full_active_sw_list': active_sw_list[:],
+            'project_code': self.prj_code,
+            'full_active_sw_list': self.active_sw_list[:],
             'active_sw_name_list': sorted(list(self.active_sw_set)),
-            'site_env_spec_list': site_env_spec_list[:],
-            'prj_env_spec_list': prj_env_spec_list[:],
-            'extra_env_spec_list': extra_env_spec_list[:]
-                                        if extra_env_spec_list else [],
-            'prj_sw_versions_d': prj_sw_versions_d.copy(),
-            'active_sw_defs_d': {k: sw_defs_d[k] for k in sw_defs_d.keys()
-                                                if k in self.active_sw_set},
+            'site_env_spec_list': self.site_env_spec_list[:],
+            'prj_env_spec_list': self.prj_env_spec_list[:],
+            'extra_env_spec_list': self.extra_env_spec_list[:],
+            'prj_sw_versions_d': self.prj_sw_versions_d.copy(),
+            'active_sw_defs_d': {k: self.sw_defs_d[k]
+                                    for k in self.sw_defs_d.keys()
+                                        if k in self.active_sw_set},
             'session_spec_file': self.session_spec_file,
         }
 
+    def _write_session_spec(self, session_spec_d):
+
+        start_t = time.perf_counter()
+        if not os.path.isdir(self.user_current_session_root):
+            os.makedirs(self.user_current_session_root)
+        session_spec_str = '%s\n' % json.dumps(session_spec_d, indent=4,
+                                               sort_keys=True)
         with open(self.session_spec_file, 'w') as out_fp:
-            out_fp.write('%s\n' %
-                    json.dumps(session_spec_d, indent=4, sort_keys=True))
+            out_fp.write(session_spec_str)
+        if has_event_callbacks(SESSION_SPEC_WRITTEN):
+            emit_event(SESSION_SPEC_WRITTEN, {
+                'path': self.session_spec_file,
+                'size': len(session_spec_str),
+                'secs': time.perf_counter() - start_t,
+            })
+
+    def _write_pending_session_spec(self):
+
+        # session spec of a pure or derived env, only written once it is
+        # launched
+        if self._pending_session_spec_d is not None:
+            self._write_session_spec(self._pending_session_spec_d)
+            self._pending_session_spec_d = None
+
+    def with_sw(self, *sw_entries):
+
+        # Derived env with sw_entries added to the active sw, e.g.
+        # with_sw("maya_usd", "mtoa@v|5.2.1.0") ... an entry for a sw that
+        # is already active replaces that one. Returns (new_env, diff_d),
+        # see _derive()
+        active_sw_list = list(self.active_sw_list)
+        for sw_entry in sw_entries:
+            sw_name = sw_entry.split('@')[0]
+            for (sw_idx, active_sw) in enumerate(active_sw_list):
+                if active_sw.split('@')[0] == sw_name:
+                    active_sw_list[sw_idx] = sw_entry
+                    break
+            else:
+                active_sw_list.append(sw_entry)
+
+        return self._derive(active_sw_list)
+
+    def without_sw(self, *sw_names):
 
-        self.active_sw_snapshot = ActiveSoftwareSnapshot(
-                                        self.active_sw_list,
-                                        self.sw_defs_d,
-                                        self.prj_code,
-                                        self.prj_sw_versions_d)
+        # Derived env without sw_names, returns (new_env, diff_d)
+        for sw_name in sw_names:
+            if sw_name not in self.active_sw_set:
+                raise Exception('Software "%s" is not active, so cannot be '
+                                'removed' % sw_name)
 
-        sw_env_spec_list = self.active_sw_snapshot.get_active_sw_env_spec()
+        return self._derive([active_sw for active_sw in self.active_sw_list
+                                if active_sw.split('@')[0] not in sw_names])
+
+    def with_override(self, sw_name, version=None):
+
+        # Derived env with the version of active sw_name overridden, or
+        # back to the project version with version None. Returns
+        # (new_env, diff_d)
+        if sw_name not in self.active_sw_set:
+            raise Exception('Software "%s" is not active, so its version '
+                            'cannot be overridden' % sw_name)
+
+        return self.with_sw(sw_name if version is None
+                                    else '%s@v|%s' % (sw_name, version))
+
+    def _derive(self, active_sw_list):
+
+        # New env for active_sw_list, with everything else the same as this
+        # env. The site env is not bootstrapped again and the session folder
+        # is shared. The sw env specs of packages whose install location and
+        # version did not change are reused, and only env vars whose values
+        # reach a changed one are expanded again.
+        #
+        # Returns (new_env, diff_d) where diff_d is the diff_env_d() of the
+        # two resulting envs.
+        derived_env = EnvRunnerEnv.__new__(EnvRunnerEnv)
+
+        derived_env.timings = NULL_LAUNCH_TIMINGS
+        derived_env.pure = self.pure
+        derived_env._base_env_d = self._base_env_d
+        derived_env.path_slash = self.path_slash
+        derived_env.opposite_path_slash = self.opposite_path_slash
+        derived_env.prj_code = self.prj_code
+        derived_env.prj_sw_versions_d = self.prj_sw_versions_d
+        derived_env.sw_defs_d = self.sw_defs_d
+        derived_env.site_env_spec_list = self.site_env_spec_list
+        derived_env.prj_env_spec_list = self.prj_env_spec_list
+        derived_env.extra_env_spec_list = self.extra_env_spec_list
+
+        derived_env.active_sw_list = active_sw_list
+        derived_env.active_sw_set = set([a_sw.split('@')[0] for a_sw in
+                                            active_sw_list])
+
+        derived_env.user_session_info = self.user_session_info
+        derived_env.user_current_session_root = self.user_current_session_root
+        derived_env.session_spec_file = os.path.join(
+                    self.user_current_session_root,
+                    '%s_%s_envrunner_session_spec_%s.json' % (
+                            self.user_session_info.get('session_ts_str'),
+                            self.user_session_info.get('user'),
+                            next(_DERIVED_ENV_COUNTER)))
+        derived_env._pending_session_spec_d = \
+                                    derived_env._build_session_spec_d()
+
+        derived_env._active_sw_snapshot = None
+        derived_env._expander = None
+        derived_env._raw_path_spec_list_by_var = None
+
+        derived_env.env_spec_list = None
+        derived_env.resulting_env_d = None
+        derived_env.env_var_names = None
+        derived_env.info_by_env_var = None
+        derived_env.has_embedded_by_env_var = None
+        derived_env.expansion_report = None
+
+        derived_env.resolved_from_cache = False
+        derived_env.resolved_from_bundle = False
+        derived_env._resolve_fingerprint = None
+
+        derived_env._resolve(prev_env=self)
+
+        return (derived_env, diff_env_d(self.resulting_env_d,
+                                        derived_env.resulting_env_d))
+
+    @property
+    def active_sw_snapshot(self):
+
+        # not built up front when the resolved env came from the resolve cache
+        if self._active_sw_snapshot is None:
+            with self.timings.phase('active_sw_snapshot'):
+                self._active_sw_snapshot = ActiveSoftwareSnapshot(
+                                    self.active_sw_list,
+                                    self.sw_defs_d,
+                                    self.prj_code,
+                                    self.prj_sw_versions_d,
+                                    env_d=self._base_env_d if self.pure
+                                                            else None)
+        return self._active_sw_snapshot
+
+    def get_resolve_fingerprint(self):
+
+        # hash of all resolution inputs, see resolve_cache.build_resolve_key
+        if self._resolve_fingerprint is None:
+            self._resolve_fingerprint = build_resolve_key(
+                                self.prj_code, self.active_sw_list,
+                                self.sw_defs_d, self.site_env_spec_list,
+                                self.prj_sw_versions_d, self.prj_env_spec_list,
+                                self.extra_env_spec_list, self.path_slash)
+        return self._resolve_fingerprint
+
+    def _resolve(self, prev_env=None):
+
+        # prev_env, if given, is the env this one is derived from
+        active_sw_snapshot = self.active_sw_snapshot
+        with self.timings.phase('sw_env_spec_load'):
+            sw_env_spec_list = active_sw_snapshot.get_active_sw_env_spec(
+                    prev_snapshot=(prev_env._active_sw_snapshot
+                                        if prev_env is not None else None))
 
         prj_spec = {'var': 'ENVR_PRJ_CODE', 'value': self.prj_code}
         envr_session_spec = {
@@ -248,27 +586,132 @@ class EnvRunnerEnv(object):
             'value': self.session_spec_file,
         }
 
-        self.prj_env_spec_list = prj_env_spec_list
+        with self.timings.phase('flatten_spec_list'):
+            self.env_spec_list = self._flatten_spec_list(
+                                                [prj_spec] +
+                                                [envr_session_spec] +
+                                                self.site_env_spec_list +
+                                                sw_env_spec_list +
+                                                self.prj_env_spec_list +
+                                                self.extra_env_spec_list)
+        with self.timings.phase('process_spec_list'):
+            self._process_spec_list(prev_env)
+
+    def _load_from_resolve_cache(self, resolve_key):
+
+        entry = get_resolve_cache().lookup(resolve_key, self._base_env_d)
+        if entry is None:
+            return False
+
+        self._set_session_spec_file(entry)
+        entry['resulting_env_d']['ENVR_SESSION_SPEC_FILE'] = \
+                    entry['info_by_env_var']['ENVR_SESSION_SPEC_FILE']['value']
+
+        self.env_spec_list = entry['env_spec_list']
+        self.env_var_names = entry['env_var_names']
+        self.info_by_env_var = entry['info_by_env_var']
+        self.has_embedded_by_env_var = {}
+        self.resulting_env_d = entry['resulting_env_d']
+        self.expansion_report = entry['expansion_report']
+        self.resolved_from_cache = True
 
-        if extra_env_spec_list is None:
-            extra_env_spec_list = []
+        return True
 
-        self.env_spec_list = self._flatten_spec_list([prj_spec] +
-                                                     [envr_session_spec] +
-                                                     site_env_spec_list +
-                                                     sw_env_spec_list +
-                                                     prj_env_spec_list +
-                                                     extra_env_spec_list)
-        self.resulting_env_d = None
+    def _set_session_spec_file(self, resolved_d):
 
-        self.env_var_names = None
-        self.info_by_env_var = None
-        self.has_embedded_by_env_var = None
+        # The session spec file is the only session specific part of a
+        # resolved env (ones referencing it are never cached or bundled)
+        for spec in resolved_d['env_spec_list']:
+            if spec.get('single_path') == 'ENVR_SESSION_SPEC_FILE':
+                spec['value'] = self.session_spec_file
+        resolved_d['info_by_env_var']['ENVR_SESSION_SPEC_FILE']['value'] = \
+                conform_path_slash(self.session_spec_file, self.path_slash)
 
-        self._process_spec_list()
+    def _load_from_env_bundle(self, env_bundle_d):
+
+        mismatch = get_env_bundle_mismatch(env_bundle_d,
+                                           self.get_resolve_fingerprint(),
+                                           self._base_env_d)
+        if mismatch:
+            envr_info('Resolved env bundle not used, %s' % mismatch)
+            return False
+
+        self._set_session_spec_file(env_bundle_d)
+
+        self.env_spec_list = env_bundle_d['env_spec_list']
+        self.env_var_names = env_bundle_d['env_var_names']
+        self.info_by_env_var = env_bundle_d['info_by_env_var']
+        self.has_embedded_by_env_var = {}
+        self.expansion_report = env_bundle_d['expansion_report']
+        self._active_sw_snapshot = ActiveSoftwareSnapshot.from_sw_info(
+                                            self.active_sw_list,
+                                            env_bundle_d['active_sw_info'],
+                                            self.prj_code,
+                                            self.prj_sw_versions_d,
+                                            self.path_slash)
+
+        # path type env vars go onto this host's base values
+        self._evaluate_resulting_env()
+        self.resolved_from_bundle = True
+
+        return True
+
+    def get_env_var_refs(self):
+
+        # names of all env vars referenced via ${...} (or $VAR) by the specs
+        # and sw definitions that went into the resolved env
+        env_var_refs = collect_env_var_refs(self.env_spec_list)
+        collect_env_var_refs(
+                [self.sw_defs_d[sw] for sw in self.active_sw_set
+                                    if sw in self.sw_defs_d], env_var_refs)
+        collect_env_var_refs(self.active_sw_list, env_var_refs)
+        return env_var_refs
+
+    def _store_in_resolve_cache(self, resolve_key):
+
+        env_var_refs = self.get_env_var_refs()
+
+        if 'ENVR_SESSION_SPEC_FILE' in env_var_refs:
+            return  # resolved env is specific to this session
+
+        # base values of path vars are pre/post-pended to, so those count
+        # as referenced too
+        env_dep_names = env_var_refs.union(
+                    [var_name for var_name in self.env_var_names
+                        if self.info_by_env_var[var_name]['type'] == 'path'])
+        env_dep_names.add('ENVR_CFG_SW_ENVS_ROOT')
+
+        # a pure env keeps its entry in memory only
+        get_resolve_cache().store(resolve_key, {
+            'env_deps': {env_var: self.get_base_env_value(env_var)
+                            for env_var in env_dep_names},
+            'fs_deps': self.active_sw_snapshot.fs_deps,
+            'probe_deps': self.active_sw_snapshot.probe_deps,
+            'env_spec_list': self.env_spec_list,
+            'env_var_names': self.env_var_names,
+            'info_by_env_var': self.info_by_env_var,
+            'resulting_env_d': self.resulting_env_d,
+            'expansion_report': self.expansion_report,
+        }, persist=not self.pure)
+
+    def get_base_env_value(self, env_var, default=None):
+
+        # value in the environment the resolved env goes on top of, which is
+        # os.environ (after the site env bootstrap) unless pure
+        return self._base_env_d.get(conform_env_key(env_var), default)
+
+    def _expandvars(self, value):
+
+        if self.pure:
+            return expand_env_vars(value, self._base_env_d)
+        return os.path.expandvars(value)
 
     def _bootstrap_site_env(self):
 
+        # applies the site env spec list onto os.environ, or the private
+        # base env of a pure env
+        base_env_d = self._base_env_d
+
         for site_spec in self.site_env_spec_list:
             if type(site_spec) is not dict:
                 continue # skip comments in string entries
@@ -291,8 +734,9 @@ class EnvRunnerEnv(object):
                 else:
                     raise Exception('Unknown Site spec format - spec: %s' %
                                     site_spec)
-                if env_var in os.environ:
-                    del os.environ[env_var]
+                env_var = conform_env_key(env_var)
+                if env_var in base_env_d:
+                    del base_env_d[env_var]
 
             elif 'var' in site_spec or 'single_path' in site_spec:
                 spec_var = (site_spec['var'] if 'var' in site_spec
@@ -301,33 +745,35 @@ class EnvRunnerEnv(object):
                 if type(spec_value) is dict:
                     spec_value = self._get_os_specific_value_from_dict(
                                                         spec_var, spec_value)
+                spec_var = conform_env_key(spec_var)
                 if 'single_path' in site_spec:
-                    os.environ[spec_var] = conform_path_slash(
-                                                os.path.expandvars(spec_value),
+                    base_env_d[spec_var] = conform_path_slash(
+                                                self._expandvars(spec_value),
                                                 self.path_slash)
                 else:
-                    os.environ[spec_var] = spec_value
+                    base_env_d[spec_var] = spec_value
 
             elif 'path' in site_spec:
                 path_value_d = site_spec['value']
                 path_var = site_spec['path']
                 mode = site_spec['mode']
-                path_value = os.path.expandvars(
+                path_value = self._expandvars(
                     self._get_path_value_from_path_spec(path_value_d, path_var))
+                path_var = conform_env_key(path_var)
                 if mode == 'pre':
-                    os.environ[path_var] = os.pathsep.join([
-                                            path_value, os.environ[path_var]])
+                    base_env_d[path_var] = os.pathsep.join([
+                                            path_value, base_env_d[path_var]])
                 elif mode == 'post':
-                    os.environ[path_var] = os.pathsep.join([
-                                            os.environ[path_var], path_value])
+                    base_env_d[path_var] = os.pathsep.join([
+                                            base_env_d[path_var], path_value])
                 elif mode == 'overwrite':
-                    os.environ[path_var] = path_value
+                    base_env_d[path_var] = path_value
 
                 elif mode == 'remove':
                     # NOTE: this is a Site spec list feature only!
                     filtered_list = []
 
-                    current_list = os.environ[path_var].split(os.pathsep)
+                    current_list = base_env_d[path_var].split(os.pathsep)
                     remove_list = path_value.split(os.pathsep)
 
                     for curr_path in current_list:
@@ -335,7 +781,7 @@ class EnvRunnerEnv(object):
                             continue
                         filtered_list.append(curr_path)
 
-                    os.environ[path_var] = os.pathsep.join(filtered_list)
+                    base_env_d[path_var] = os.pathsep.join(filtered_list)
                 else:
                     raise Exception(
                             'Unknown path mode, "%s", in Site spec list, '
@@ -361,6 +807,9 @@ class EnvRunnerEnv(object):
     def _flatten_spec_list(self, env_spec_list):
 
         # remove comments (str entries) and flatten groups
+        start_t = time.perf_counter()
+        group_count = 0
+        groups_skipped = 0
         result_spec_list = []
         for spec in env_spec_list:
             if type(spec) is not dict:
@@ -372,8 +821,10 @@ class EnvRunnerEnv(object):
                 # value is truthy (e.g. True, 1, etc.)
                 continue
             if 'group' in spec:
+                group_count += 1
                 required_set = set(spec.get('requires'))
                 if not required_set.issubset(self.active_sw_set):
+                    groups_skipped += 1
                     continue
                 group_spec_list = spec.get('spec_list')
                 for group_spec in group_spec_list:
@@ -391,6 +842,15 @@ class EnvRunnerEnv(object):
             else:
                 result_spec_list.append(spec)
 
+        if has_event_callbacks(SPEC_FLATTENED):
+            emit_event(SPEC_FLATTENED, {
+                'spec_count_in': len(env_spec_list),
+                'spec_count_out': len(result_spec_list),
+                'group_count': group_count,
+                'groups_skipped': groups_skipped,
+                'secs': time.perf_counter() - start_t,
+            })
+
         return result_spec_list
 
     def _get_path_value_from_path_spec(self, path_value_d, path_var):
@@ -415,7 +875,7 @@ class EnvRunnerEnv(object):
 
         return path_value
 
-    def _process_spec_list(self):
+    def _process_spec_list(self, prev_env=None):
 
         self.env_var_names = []
         self.info_by_env_var = {}
@@ -427,8 +887,9 @@ class EnvRunnerEnv(object):
                 continue
 
             if 'site' in spec:
-                # These have already been applied to os.environ
-                # in a site bootstrapping phase, so skip
+                # These have already been applied to os.environ (or the
+                # private base env of a pure env) in a site bootstrapping
+                # phase, so skip
                 continue
 
             if 'var' in spec or 'single_path' in spec:
@@ -445,15 +906,14 @@ class EnvRunnerEnv(object):
                 elif type(env_value) in (int, float, bool):
                     env_value = str(env_value)
 
-                embedded_vars = get_all_embedded_vars(env_value)
+                if type(env_value) not in (str, unicode):
+                    raise Exception('Unsupported value type for env var '
+                                    '"%s" in spec entry: %s' % (env_var, spec))
+
                 self.info_by_env_var[env_var] = {
                     'value': env_value,
                     'type': 'single_path' if is_single_path else 'var',
                 }
-                if len(embedded_vars):
-                    self.has_embedded_by_env_var[env_var] = True
-                else:
-                    self.has_embedded_by_env_var.pop(env_var, None)
 
                 if env_var not in self.env_var_names:
                     self.env_var_names.append(env_var)
@@ -483,40 +943,101 @@ class EnvRunnerEnv(object):
                 raise Exception('Unsupported spec entry: %s' % spec)
 
         # Now evaluate embedded env vars in values in var or single_path
-        # type spec entries ...
-        count = 1
-        while len(self.has_embedded_by_env_var) and count < 6:
-            for var_name in self.env_var_names:
-                info_d = self.info_by_env_var[var_name]
-
-                if info_d['type'] in ('var', 'single_path'):
-                    resulting_value, still_has_embedded = \
-                        self._expand_vars(info_d['value'])
-                    info_d['value'] = resulting_value
-
-                    if still_has_embedded:
-                        self.has_embedded_by_env_var[var_name] = True
-                    else:
-                        self.has_embedded_by_env_var.pop(var_name, None)
-            count += 1
+        # type spec entries, in dependency order, in a single pass ...
+        start_t = time.perf_counter()
+        value_by_var = {}
+        path_var_names = []
+        for var_name in self.env_var_names:
+            info_d = self.info_by_env_var[var_name]
+            if info_d['type'] == 'path':
+                path_var_names.append(var_name)
+            else:
+                value_by_var[var_name] = info_d['value']
+
+        # values reached by a change are all that is expanded again in a
+        # derived env (see _derive)
+        prev_expander = prev_env._expander if prev_env is not None else None
+
+        expander = EnvVarExpander(value_by_var,
+                                  lookup_fn=self.get_base_env_value,
+                                  unexpandable_var_names=path_var_names)
+        expanded_by_var = expander.expand_all(prev_expander)
+
+        self.has_embedded_by_env_var = {}
+        for var_name in value_by_var:
+            self.info_by_env_var[var_name]['value'] = expanded_by_var[var_name]
+            if var_name not in expander.complete_var_set:
+                self.has_embedded_by_env_var[var_name] = True
 
         # Now expand embedded vars in path values
-        for var_name in self.env_var_names:
+        self._raw_path_spec_list_by_var = {}
+        for var_name in path_var_names:
             info_d = self.info_by_env_var[var_name]
-            if info_d['type'] != 'path':
+            raw_spec_list = [[spec['value'], spec['mode']]
+                                for spec in info_d['spec_list']]
+            self._raw_path_spec_list_by_var[var_name] = raw_spec_list
+
+            if prev_expander is not None and \
+                    self._is_path_value_reusable(prev_env, var_name,
+                                                 raw_spec_list, expander):
+                info_d['spec_list'] = [
+                        dict(spec) for spec in
+                            prev_env.info_by_env_var[var_name]['spec_list']]
+                if var_name in prev_expander.unresolved_refs_by_var:
+                    expander.unresolved_refs_by_var[var_name] = list(
+                            prev_expander.unresolved_refs_by_var[var_name])
                 continue
+
             for spec in info_d['spec_list']:
-                new_value, still_has_embedded = self._expand_vars(
+                new_value, unresolved_refs = expander.expand_str(
                                                         spec['value'])
                 spec['value'] = new_value
-
-        # Now evaluate environment
+                if unresolved_refs:
+                    expander.unresolved_refs_by_var.setdefault(
+                                var_name, []).extend(unresolved_refs)
+
+        self._expander = expander
+        self.expansion_report = expander.get_report()
+        if has_event_callbacks(VARS_EXPANDED):
+            emit_event(VARS_EXPANDED, {
+                'var_count': len(value_by_var),
+                'path_var_count': len(path_var_names),
+                'incomplete_var_count': len(self.has_embedded_by_env_var),
+                'cycle_count': len(self.expansion_report['cycles']),
+                'secs': time.perf_counter() - start_t,
+            })
+        self._report_expansion_problems()
+
+        self._evaluate_resulting_env()
+
+    def _is_path_value_reusable(self, prev_env, var_name, raw_spec_list,
+                                expander):
+
+        # same raw path values as in prev_env, and nothing they reference
+        # expands any differently
+        if prev_env._raw_path_spec_list_by_var is None or \
+                prev_env._raw_path_spec_list_by_var.get(var_name) != \
+                                                            raw_spec_list:
+            return False
+
+        for (value, mode) in raw_spec_list:
+            for ref_var in compile_template(value).refs:
+                if expander.is_ref_changed(ref_var):
+                    return False
+
+        return True
+
+    def _evaluate_resulting_env(self):
+
+        # Evaluates the final env from info_by_env_var, path type env vars
+        # are pre/post-pended to their current values in os.environ (or the
+        # private base env of a pure env)
         self.resulting_env_d = {}
 
         for var_name in self.env_var_names:
             info_d = self.info_by_env_var[var_name]
             if info_d['type'] == 'path':
-                path_str = os.getenv(var_name, '')
+                path_str = self.get_base_env_value(var_name, '')
                 for spec in info_d['spec_list']:
                     if spec['mode'] == 'pre':
                         path_str = (
@@ -545,30 +1066,24 @@ class EnvRunnerEnv(object):
             elif info_d['type'] == 'var':
                 self.resulting_env_d[var_name] = info_d['value']
 
-    def _expand_vars(self, value_str):
+    def _report_expansion_problems(self):
 
-        still_has_embedded = False
-        embedded_vars = get_all_embedded_vars(value_str)
-        for embed_var in embedded_vars:
-            if embed_var in self.env_var_names:
-                if self.has_embedded_by_env_var.get(embed_var, False):
-                    still_has_embedded = True
-                    continue
+        for cycle_var_list in self.expansion_report['cycles']:
+            envr_warning('EnvRunnerEnv: env vars reference each other in a '
+                         'cycle and cannot be expanded: %s' %
+                         ' -> '.join(cycle_var_list + cycle_var_list[:1]))
 
-                embed_value = self.info_by_env_var[embed_var].get('value')
-                if type(embed_value) in (str, unicode):
-                    value_str = value_str.replace('${%s}' % embed_var,
-                                                  embed_value)
-                else:
-                    still_has_embedded = True
-            else:
-                # then look for the var in current environment
-                os_env_value = os.getenv(embed_var)
-                if os_env_value:
-                    value_str = value_str.replace('${%s}' % embed_var,
-                                                  os_env_value)
+        unresolved_refs_by_var = \
+                            self.expansion_report['unresolved_refs_by_var']
+        for var_name in sorted(unresolved_refs_by_var.keys()):
+            envr_warning('EnvRunnerEnv: env var "%s" has unresolved '
+                         'references left in its value: %s' % (
+                            var_name, ', '.join(sorted(set(
+                                    unresolved_refs_by_var[var_name])))))
 
-        return (value_str, still_has_embedded)
+    def get_expansion_report(self):
+
+        return self.expansion_report
 
     def get_env_spec_list(self):
 
@@ -578,25 +1093,66 @@ class EnvRunnerEnv(object):
 
         return self.resulting_env_d
 
-    def apply_to_os_env(self):
+    def build_child_env_d(self, base_env_d=None):
+
+        # Builds the complete environment for a child process as a new dict,
+        # the resolved env on top of base_env_d (defaults to a copy of the
+        # current os.environ, or the private base env of a pure env) ...
+        # os.environ itself is never modified, so this is safe to use from
+        # multiple threads at once
+        self._write_pending_session_spec()
+
+        return self._build_child_env_d(base_env_d)
+
+    def _build_child_env_d(self, base_env_d=None):
+
+        # same as build_child_env_d(), without writing a pending session spec
+        child_env_d = dict(self._base_env_d if base_env_d is None
+                                            else base_env_d)
 
         for env_var in self.resulting_env_d.keys():
-            os.environ[str(env_var)] = str(self.resulting_env_d[env_var])
+            child_env_d[conform_env_key(env_var)] = \
+                                        str(self.resulting_env_d[env_var])
 
         # always add access to envrunner package so envr module is available
         # for convenience functionality
-        os.environ['PYTHONPATH'] = (
+        child_env_d['PYTHONPATH'] = (
             '%s%s%s' % (_ENVRUNNER_PARENT_DIR, os.pathsep,
-                        os.getenv('PYTHONPATH'))
-                if 'PYTHONPATH' in os.environ else _ENVRUNNER_PARENT_DIR)
+                        child_env_d['PYTHONPATH'])
+                if 'PYTHONPATH' in child_env_d else _ENVRUNNER_PARENT_DIR)
 
         # be sure to also inject the session's raw active sw list
-        os.environ['ENVR_ACTIVE_SW_LIST'] = ';'.join(self.active_sw_list)
+        child_env_d['ENVR_ACTIVE_SW_LIST'] = ';'.join(self.active_sw_list)
 
         # inject the user current session root path into environment
-        os.environ['ENVR_USER_CURRENT_SESSION_ROOT'] = \
+        child_env_d['ENVR_USER_CURRENT_SESSION_ROOT'] = \
             self.user_current_session_root
 
+        return child_env_d
+
+    def _build_cmd_and_args(self, cmd, arg_list, child_env_d, shell=False):
+
+        # command and arguments are expanded against the child's env, not
+        # the current process env
+        cmd_and_args = [expand_env_vars(item, child_env_d)
+                            for item in ([cmd] + list(arg_list))]
+
+        if os_info.os == 'windows' and not shell:
+            # CreateProcess() looks up the executable on the PATH of the
+            # current process, not the PATH in the env passed to it
+            cmd_path = _which(cmd_and_args[0], child_env_d.get('PATH'))
+            if cmd_path:
+                cmd_and_args[0] = cmd_path
+
+        return cmd_and_args
+
+    def apply_to_os_env(self):
+
+        child_env_d = self.build_child_env_d()
+        for env_var in child_env_d.keys():
+            if os.environ.get(env_var) != child_env_d[env_var]:
+                os.environ[env_var] = child_env_d[env_var]
+
     def copy_of_current_os_env(self):
 
         return os.environ.copy()
@@ -607,23 +1163,31 @@ class EnvRunnerEnv(object):
 
     def launch_by_os_system_call(self, os_system_call_str):
 
-        orig_env_to_restore_d = self.copy_of_current_os_env()
-        self.apply_to_os_env()
-
-        os.system(os_system_call_str)
-
-        # restore the environment
-        self.restore_os_env(orig_env_to_restore_d)
+        with self.timings.phase('build_child_env'):
+            child_env_d = self.build_child_env_d()
+
+        # run through the shell, like os.system(), but with the child env
+        # ... same as subprocess.call(), with events for spawn and exit
+        with self.timings.phase('process_run', overhead=False):
+            start_t = time.perf_counter()
+            p = subprocess.Popen(os_system_call_str, shell=True,
+                                 env=child_env_d)
+            _emit_process_spawned(os_system_call_str, p, False, start_t)
+            try:
+                returncode = p.wait()
+            except:
+                p.kill()
+                p.wait()
+                raise
+            _emit_process_exited(os_system_call_str, p, start_t)
+            return returncode
 
     def _launch_subprocess(self, subproc_cmd, subproc_args, creation_flags=0,
                            shell=False, stdin=None, stdout=None, stderr=None,
                            cwd=None, detach=False):
 
-        orig_env_to_restore_d = self.copy_of_current_os_env()
-        self.apply_to_os_env()
-
-        cmd_and_args = [os.path.expandvars(item)
-                            for item in ([subproc_cmd] + subproc_args)]
+        with self.timings.phase('build_child_env'):
+            child_env_d = self.build_child_env_d()
 
         if detach:
             if os_info.os == 'windows':
@@ -635,12 +1199,16 @@ class EnvRunnerEnv(object):
                 shell = True
             else:
                 if sys.version_info.major >= 3:
-                    p = subprocess.Popen(cmd_and_args, shell=shell,
+                    cmd_and_args = self._build_cmd_and_args(
+                                subproc_cmd, subproc_args, child_env_d, shell)
+                    with self.timings.phase('popen'):
+                        start_t = time.perf_counter()
+                        p = subprocess.Popen(cmd_and_args, shell=shell,
                                          cwd=cwd, stdin=stdin, stdout=stdout,
                                          stderr=stderr, start_new_session=True,
-                                         creationflags=creation_flags)
-                    # restore the environment
-                    self.restore_os_env(orig_env_to_restore_d)
+                                         creationflags=creation_flags,
+                                         env=child_env_d)
+                        _emit_process_spawned(cmd_and_args, p, True, start_t)
                     return {'pid': p.pid}
                 else:
                     # Do nothing ... in Python 2.7 on linux, just don't call
@@ -648,12 +1216,15 @@ class EnvRunnerEnv(object):
                     # Popen object # for it to fork to another process?
                     pass
 
-        p = subprocess.Popen(cmd_and_args, shell=shell, cwd=cwd,
-                             stdin=stdin, stdout=stdout, stderr=stderr,
-                             creationflags=creation_flags)
+        cmd_and_args = self._build_cmd_and_args(subproc_cmd, subproc_args,
+                                                child_env_d, shell)
 
-        # restore the environment
-        self.restore_os_env(orig_env_to_restore_d)
+        with self.timings.phase('popen'):
+            start_t = time.perf_counter()
+            p = subprocess.Popen(cmd_and_args, shell=shell, cwd=cwd,
+                                 stdin=stdin, stdout=stdout, stderr=stderr,
+                                 creationflags=creation_flags, env=child_env_d)
+            _emit_process_spawned(cmd_and_args, p, detach, start_t)
 
         if detach:
             return {'pid': p.pid}
@@ -662,14 +1233,27 @@ class EnvRunnerEnv(object):
 
     def subprocess_check_call(self, cmd, arg_list):
 
-        orig_env_to_restore_d = self.copy_of_current_os_env()
-        self.apply_to_os_env()
-
-        cmd_and_args = [os.path.expandvars(item)
-                            for item in ([cmd] + arg_list)]
+        with self.timings.phase('build_child_env'):
+            child_env_d = self.build_child_env_d()
+        cmd_and_args = self._build_cmd_and_args(cmd, arg_list, child_env_d)
 
         try:
-            subprocess.check_call(cmd_and_args)
+            # same as subprocess.check_call(), split so spawning the process
+            # and waiting on it are timed separately
+            with self.timings.phase('popen'):
+                start_t = time.perf_counter()
+                p = subprocess.Popen(cmd_and_args, env=child_env_d)
+                _emit_process_spawned(cmd_and_args, p, False, start_t)
+            with self.timings.phase('process_wait', overhead=False):
+                try:
+                    returncode = p.wait()
+                except:
+                    p.kill()
+                    p.wait()
+                    raise
+            _emit_process_exited(cmd_and_args, p, start_t)
+            if returncode:
+                raise subprocess.CalledProcessError(returncode, cmd_and_args)
         except:
             print('>>>')
             print('>>>')
@@ -680,15 +1264,12 @@ class EnvRunnerEnv(object):
                 print('   %s' % item)
             print('>>>')
             print('>>> PATH is ...')
-            for p in os.getenv('PATH').split(os.pathsep):
+            for p in child_env_d.get('PATH', '').split(os.pathsep):
                 print('   %s' % p)
             print('>>>')
             print('>>>')
             raise
 
-        # restore the environment
-        self.restore_os_env(orig_env_to_restore_d)
-
     def launch_subprocess(self, subproc_cmd, subproc_args, creation_flags=0,
                            shell=False, stdin=None, stdout=None, stderr=None,
                            cwd=None, detach=False):
@@ -705,7 +1286,15 @@ class EnvRunnerEnv(object):
             print('          > command: %s' % subproc_cmd)
             print('          > args: %s' % subproc_args)
             print('          > PATH (env var) ...')
-            for p in os.getenv('PATH').split(os.pathsep):
+            # diagnostics only ... never writes the pending session spec,
+            # and never hides the original exception
+            try:
+                child_path = self._build_child_env_d().get('PATH', '')
+            except Exception as e:
+                child_path = ''
+                print('                  (unable to build child env: %s)' %
+                      e)
+            for p in child_path.split(os.pathsep):
                 if p.strip():
                     print('                  %s' % p)
             print('------------------------------------------------------')
@@ -714,6 +1303,149 @@ class EnvRunnerEnv(object):
 
         return p_info
 
+    def launch_many(self, commands, max_workers=4, fail_fast=False,
+                    cwd=None):
+
+        # Runs many commands under this one resolved environment, at most
+        # max_workers at a time, capturing their output. Each entry in
+        # commands is either a list of [cmd, arg1, arg2, ...] or a dict in
+        # runner config style, {"command": cmd, "args": [arg1, ...]}
+        #
+        # With fail_fast, the first command to fail (non-zero exit or unable
+        # to start) stops any commands that have not started yet and
+        # terminates the ones still running.
+        #
+        # Returns a list of result dicts, in the same order as commands.
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        child_env_d = self.build_child_env_d()
+
+        stop_event = threading.Event()
+        running_lock = threading.Lock()
+        running_procs = set()
+        terminated_pids = set()  # of processes terminated by fail_fast
+
+        def _run_command(cmd, arg_list):
+
+            result_d = {
+                'command': cmd,
+                'args': arg_list,
+                'returncode': None,
+                'duration': 0.0,
+                'stdout': '',
+                'stderr': '',
+                'status': 'skipped',
+                'error': None,
+            }
+            if stop_event.is_set():
+                return result_d
+
+            start_t = time.time()
+            p = None
+            try:
+                cmd_and_args = self._build_cmd_and_args(cmd, arg_list,
+                                                        child_env_d)
+                with running_lock:
+                    if stop_event.is_set():
+                        return result_d
+                    spawn_t = time.perf_counter()
+                    p = subprocess.Popen(cmd_and_args, cwd=cwd,
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE,
+                                         env=child_env_d)
+                    running_procs.add(p)
+                _emit_process_spawned(cmd_and_args, p, False, spawn_t)
+                try:
+                    out, err = p.communicate()
+                finally:
+                    with running_lock:
+                        running_procs.discard(p)
+                _emit_process_exited(cmd_and_args, p, spawn_t)
+            except Exception as err:
+                # anything from a bad command to a failed start, recorded so
+                # the other commands' results are not lost
+                if p is not None and p.poll() is None:
+                    p.kill()
+                    p.wait()
+                result_d.update({
+                    'duration': time.time() - start_t,
+                    'status': 'error',
+                    'error': str(err),
+                })
+            else:
+                result_d.update({
+                    'returncode': p.returncode,
+                    'duration': time.time() - start_t,
+                    'stdout': out.decode('utf-8', 'replace'),
+                    'stderr': err.decode('utf-8', 'replace'),
+                    'status': 'ok' if p.returncode == 0 else 'failed',
+                })
+                with running_lock:
+                    if p.returncode != 0 and p.pid in terminated_pids:
+                        result_d['status'] = 'terminated'
+
+            if fail_fast and result_d['status'] in ('failed', 'error'):
+                with running_lock:
+                    if not stop_event.is_set():
+                        stop_event.set()
+                        for running_p in running_procs:
+                            running_p.terminate()
+                            terminated_pids.add(running_p.pid)
+
+            return result_d
+
+        cmd_arg_list = []
+        for command in commands:
+            if type(command) is dict:
+                cmd_arg_list.append((command['command'],
+                                     list(command.get('args', []))))
+            else:
+                cmd_arg_list.append((command[0], list(command[1:])))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            future_list = [executor.submit(_run_command, cmd, arg_list)
+                                for (cmd, arg_list) in cmd_arg_list]
+            return [future.result() for future in future_list]
+
+    # --- asyncio counterparts of the launch methods (Python 3 only) ---
+    #
+    #   These return coroutines, to be awaited from an event loop, see
+    #   env_async.py for the returned process handle.
+
+    def async_launch_subprocess(self, subproc_cmd, subproc_args, stdin=None,
+                                stdout=-1, stderr=-1, cwd=None):
+
+        # stdout/stderr default to asyncio.subprocess.PIPE (-1), so output
+        # can be streamed via the handle's stdout_lines()/stderr_lines()
+        from . import env_async
+
+        child_env_d = self.build_child_env_d()
+        cmd_and_args = self._build_cmd_and_args(subproc_cmd, subproc_args,
+                                                child_env_d)
+        return env_async.create_subprocess(cmd_and_args, child_env_d,
+                                           stdin=stdin, stdout=stdout,
+                                           stderr=stderr, cwd=cwd)
+
+    def async_run(self, cmd, arg_list, timeout=None, cwd=None):
+
+        from . import env_async
+
+        child_env_d = self.build_child_env_d()
+        cmd_and_args = self._build_cmd_and_args(cmd, arg_list, child_env_d)
+        return env_async.run(cmd_and_args, child_env_d, timeout=timeout,
+                             cwd=cwd)
+
+    def async_subprocess_check_call(self, cmd, arg_list, timeout=None,
+                                    cwd=None):
+
+        from . import env_async
+
+        child_env_d = self.build_child_env_d()
+        cmd_and_args = self._build_cmd_and_args(cmd, arg_list, child_env_d)
+        return env_async.check_call(cmd_and_args, child_env_d,
+                                    timeout=timeout, cwd=cwd)
+
     def print_env_spec_list(self):
 
         print('')
@@ -722,26 +1454,22 @@ class EnvRunnerEnv(object):
 
     def print_applied_env(self):
 
-        orig_env_to_restore_d = self.copy_of_current_os_env()
-        self.apply_to_os_env()
+        child_env_d = self._build_child_env_d()
 
-        for evar in sorted(os.environ.keys()):
+        for evar in sorted(child_env_d.keys()):
             if 'PATH' in evar:
                 print('')
                 print(':: %s ...' % evar)
                 print('')
-                for path in os.getenv(evar).split(os.pathsep):
+                for path in child_env_d[evar].split(os.pathsep):
                     if path.strip():
                         print('    %s' % path.strip())
             else:
                 print('')
-                print(':: %s = %s' % (evar, os.getenv(evar)))
+                print(':: %s = %s' % (evar, child_env_d[evar]))
 
         print('')
 
-        # restore the environment
-        self.restore_os_env(orig_env_to_restore_d)
-
     # ------------------------------------------------------------------------
     #
     #  Provide API to internal ActiveSoftwareSnapshot object
@@ -767,6 +1495,10 @@ class EnvRunnerEnv(object):
 
         return self.active_sw_snapshot.get_sw_version_info(sw_name)
 
+    def get_sw_parsed_version(self, sw_name):
+
+        return self.active_sw_snapshot.get_sw_parsed_version(sw_name)
+
     def is_sw_dev_installed(self, sw_name):
 
         return self.active_sw_snapshot.is_sw_dev_installed(sw_name)
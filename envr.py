@@ -1,23 +1,32 @@
 # this will be the utility module for convenience functionality
 
-import os
-import sys
-import math
-import time
-import shutil
-import getpass
-import socket
-import datetime
-import subprocess
+# NOTE: this module is imported by child processes that often only want a
+#       getter like get_sw_install() or get_sw_version(), so it only imports
+#       "os" at load time. Anything heavier (including os_util, which works
+#       out os info when imported) is imported by the functions using it.
+#       test/test_envr_import_time.py keeps it that way.
 
-from .os_util import os_info, conform_slash
+import os
 
 
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__)).replace('\\', '/')
-_USER = getpass.getuser()
-_MACHINE_NAME = socket.gethostname()
-if '.' in _MACHINE_NAME:
-    _MACHINE_NAME = _MACHINE_NAME.split('.')[0]
+_USER = None
+_MACHINE_NAME = None
+
+
+def __getattr__(name):
+
+    # os_info used to be imported into this module
+    if name == 'os_info':
+        from .os_util import os_info
+        return os_info
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
+
+def conform_slash(path_str, force_slash=None):
+
+    from .os_util import conform_slash as _conform_slash
+    return _conform_slash(path_str, force_slash=force_slash)
 
 
 def get_env_key(env_descriptor, wrap=False):
@@ -97,26 +106,39 @@ def get_user_data_path(subpath):
 
 def get_os():
 
+    from .os_util import os_info
     return os_info.os
 
 
 def get_os_distro():
 
+    from .os_util import os_info
     return os_info.distro
 
 
 def get_os_version():
 
+    from .os_util import os_info
     return os_info.version
 
 
 def get_user():
 
+    global _USER
+
+    if _USER is None:
+        import getpass
+        _USER = getpass.getuser()
     return _USER
 
 
 def get_machine_name():
 
+    global _MACHINE_NAME
+
+    if _MACHINE_NAME is None:
+        import socket
+        _MACHINE_NAME = socket.gethostname().split('.')[0]
     return _MACHINE_NAME
 
 
@@ -159,6 +181,7 @@ def print_env(compact=False, exclude_env_keys=None):
 
 def escape_str_for_html(input_str):
 
+    import sys
     if sys.version_info.major < 3:
         import cgi
         return cgi.escape(input_str).encode('ascii', 'xmlcharrefreplace')
@@ -169,6 +192,10 @@ def escape_str_for_html(input_str):
 
 def get_now_timestamp(display_nice=False):
 
+    import math
+    import time
+    import datetime
+
     dt = datetime.datetime.now()
     dt_str = (dt.strftime('%Y-%m-%d %H:%M:%S')
                     if display_nice else dt.strftime('%Y-%m-%d_%H%M%S'))
@@ -181,6 +208,10 @@ def get_now_timestamp(display_nice=False):
 
 def open_html_capture_of_env():
 
+    import shutil
+    import subprocess
+    from .os_util import os_info
+
     user_current_session_root = os.getenv('ENVR_USER_CURRENT_SESSION_ROOT')
     active_sw_list = os.getenv('ENVR_ACTIVE_SW_LIST').split(';')
 
@@ -240,7 +271,7 @@ def open_html_capture_of_env():
 
     output_html_filepath = os.path.join(user_current_session_root,
                                         '%s_session_inspect_%s.html' % (
-                                                getpass.getuser(),
+                                                get_user(),
                                                 get_now_timestamp()))
 
     with open(output_html_filepath, 'w') as out_fp:
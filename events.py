@@ -0,0 +1,184 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import time
+import threading
+
+from .envr_logging import envr_warning
+
+
+# --- Event callbacks --------------------------------------------------------
+#
+#   Lets site code see what envrunner is doing, e.g. to feed resolution
+#   latency into its own telemetry, without patching envrunner:
+#
+#       from envrunner import events
+#
+#       def on_event(event_name, event_d):
+#           send_to_telemetry(event_name, event_d['secs'], event_d)
+#
+#       events.add_event_callback(events.ALL_EVENTS, on_event)
+#
+#   Every event_d has "time" (epoch seconds at emit) and, for events that
+#   time something, "secs". The other keys, mostly sizes, are listed with
+#   each event name below.
+#
+#   With no callbacks registered, emitting code only does a dict lookup
+#   (has_event_callbacks()) and builds nothing. A callback that raises is
+#   reported as a warning and never breaks a resolve or launch. Callbacks
+#   are called on the emitting thread, so should return quickly.
+#
+# ----------------------------------------------------------------------------
+
+# path, source ("memory", "disk" or "file"), size (bytes), secs
+CONFIG_LOADED = 'config_loaded'
+
+# active_sw_count, probe_count, secs
+SNAPSHOT_BUILT = 'snapshot_built'
+
+# spec_count_in, spec_count_out, group_count, groups_skipped, secs
+SPEC_FLATTENED = 'spec_flattened'
+
+# var_count, path_var_count, incomplete_var_count, cycle_count, secs ...
+# one event per expansion pass over all env vars, not one per env var
+VARS_EXPANDED = 'vars_expanded'
+
+# path, size (bytes), secs
+SESSION_SPEC_WRITTEN = 'session_spec_written'
+
+# pid, cmd, arg_count, detach, secs (time taken by Popen)
+PROCESS_SPAWNED = 'process_spawned'
+
+# pid, cmd, returncode, secs (time from spawn to exit)
+PROCESS_EXITED = 'process_exited'
+
+# submitter, job_count, failed_count, secs
+DEADLINE_JOBS_SUBMITTED = 'deadline_jobs_submitted'
+
+EVENT_NAMES = (
+    CONFIG_LOADED,
+    SNAPSHOT_BUILT,
+    SPEC_FLATTENED,
+    VARS_EXPANDED,
+    SESSION_SPEC_WRITTEN,
+    PROCESS_SPAWNED,
+    PROCESS_EXITED,
+    DEADLINE_JOBS_SUBMITTED,
+)
+
+# register for this to get every event
+ALL_EVENTS = '*'
+
+
+# event name -> tuple of callbacks, replaced (never changed in place) on
+# every add or remove so emitting needs no lock
+_CALLBACKS_BY_EVENT = {}
+_ALL_EVENTS_CALLBACKS = ()
+
+_REGISTRY_LOCK = threading.Lock()
+
+# callbacks registered per event name, before ALL_EVENTS ones are merged in
+_OWN_CALLBACKS_BY_EVENT = {}
+
+
+def _rebuild_callbacks_by_event():
+
+    global _CALLBACKS_BY_EVENT
+
+    callbacks_by_event = {}
+    for event_name in set(EVENT_NAMES).union(_OWN_CALLBACKS_BY_EVENT.keys()):
+        callbacks = (_OWN_CALLBACKS_BY_EVENT.get(event_name, ()) +
+                     _ALL_EVENTS_CALLBACKS)
+        if callbacks:
+            callbacks_by_event[event_name] = callbacks
+
+    _CALLBACKS_BY_EVENT = callbacks_by_event
+
+
+def add_event_callback(event_name, callback):
+
+    # callback(event_name, event_d) is called for every event_name event,
+    # or for every event with ALL_EVENTS
+    global _ALL_EVENTS_CALLBACKS
+
+    with _REGISTRY_LOCK:
+        if event_name == ALL_EVENTS:
+            _ALL_EVENTS_CALLBACKS += (callback,)
+        else:
+            _OWN_CALLBACKS_BY_EVENT[event_name] = \
+                    _OWN_CALLBACKS_BY_EVENT.get(event_name, ()) + (callback,)
+        _rebuild_callbacks_by_event()
+
+    return callback
+
+
+def remove_event_callback(event_name, callback):
+
+    global _ALL_EVENTS_CALLBACKS
+
+    with _REGISTRY_LOCK:
+        if event_name == ALL_EVENTS:
+            _ALL_EVENTS_CALLBACKS = tuple(
+                    [cb for cb in _ALL_EVENTS_CALLBACKS if cb is not callback])
+        else:
+            callbacks = tuple([
+                    cb for cb in _OWN_CALLBACKS_BY_EVENT.get(event_name, ())
+                        if cb is not callback])
+            if callbacks:
+                _OWN_CALLBACKS_BY_EVENT[event_name] = callbacks
+            else:
+                _OWN_CALLBACKS_BY_EVENT.pop(event_name, None)
+        _rebuild_callbacks_by_event()
+
+
+def clear_event_callbacks():
+
+    global _ALL_EVENTS_CALLBACKS
+
+    with _REGISTRY_LOCK:
+        _ALL_EVENTS_CALLBACKS = ()
+        _OWN_CALLBACKS_BY_EVENT.clear()
+        _rebuild_callbacks_by_event()
+
+
+def has_event_callbacks(event_name):
+
+    # emitting code checks this first, so nothing is built for an event
+    # nobody listens to
+    return event_name in _CALLBACKS_BY_EVENT
+
+
+def emit_event(event_name, event_d):
+
+    callbacks = _CALLBACKS_BY_EVENT.get(event_name)
+    if not callbacks:
+        return
+
+    event_d['time'] = time.time()
+    for callback in callbacks:
+        try:
+            callback(event_name, event_d)
+        except Exception as err:
+            envr_warning('envrunner event callback %r failed on "%s" '
+                         'event: %s' % (callback, event_name, err))
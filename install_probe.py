@@ -0,0 +1,272 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import stat
+import json
+import time
+import threading
+
+from .os_util import get_local_cache_root
+from .envr_logging import envr_warning
+
+
+# --- Install location probing -----------------------------------------------
+#
+#   When a sw definition's "install_location" is a list of candidates, each
+#   candidate is checked for existence. On a stale NFS/SMB mount a single
+#   stat() can block for a very long time, so candidates are probed:
+#
+#       - concurrently, each on its own (daemon) thread, and given up on
+#         after a timeout ... a probe that times out counts as "not there"
+#
+#       - through a host-local cache of results, positive and negative
+#         results each with their own TTL
+#
+#   Every probe's latency is recorded so slow mounts show up in diagnostics
+#   (see bin/check_environment.py).
+#
+#   Environment variables (all in seconds):
+#
+#       ENVR_INSTALL_PROBE_TIMEOUT ... per probe timeout (default 5)
+#       ENVR_INSTALL_PROBE_TTL ... TTL of positive results (default 600)
+#       ENVR_INSTALL_PROBE_NEG_TTL ... TTL of negative and timed out
+#                                      results (default 60)
+#
+#   Set ENVR_INSTALL_PROBE_TTL=0 to disable caching, of both positive and
+#   negative results (ENVR_INSTALL_PROBE_NEG_TTL=0 on its own only stops
+#   negative results from being cached).
+#
+# ----------------------------------------------------------------------------
+
+_DEFAULT_TIMEOUT = 5.0
+_DEFAULT_POSITIVE_TTL = 600.0
+_DEFAULT_NEGATIVE_TTL = 60.0
+
+_SLOW_PROBE_SECS = 1.0
+
+
+def _probe_isdir(path, result_d, done_event):
+
+    start_t = time.time()
+    try:
+        result_d['isdir'] = stat.S_ISDIR(os.stat(path).st_mode)
+    except (IOError, OSError):
+        result_d['isdir'] = False
+    result_d['latency'] = time.time() - start_t
+    done_event.set()
+
+
+class InstallProbe(object):
+
+    def __init__(self, timeout=_DEFAULT_TIMEOUT,
+                 positive_ttl=_DEFAULT_POSITIVE_TTL,
+                 negative_ttl=_DEFAULT_NEGATIVE_TTL, cache_filepath=None):
+
+        self.timeout = timeout
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.cache_filepath = cache_filepath
+
+        self._lock = threading.Lock()
+        self._entry_by_path = None
+
+        # latest probe record by path, for diagnostics
+        self.probe_record_by_path = {}
+
+        self.stats = {
+            'probes': 0,
+            'cache_hits': 0,
+            'timeouts': 0,
+            'slow_probes': 0,
+        }
+
+    def _load_cache(self):
+
+        if self._entry_by_path is not None:
+            return
+
+        self._entry_by_path = {}
+        if not self.cache_filepath:
+            return
+
+        try:
+            with open(self.cache_filepath, 'r') as in_fp:
+                self._entry_by_path = json.load(in_fp)
+        except (IOError, OSError, ValueError):
+            pass
+
+    def _save_cache(self):
+
+        if not self.cache_filepath:
+            return
+
+        tmp_filepath = '%s.%s.tmp' % (self.cache_filepath, os.getpid())
+
+        # drop expired entries so the file does not grow forever
+        now = time.time()
+        self._entry_by_path = {
+            path: entry for (path, entry) in self._entry_by_path.items()
+                if self._get_cached(path, now) is not None}
+
+        # failure to write the local cache must never break a launch
+        try:
+            cache_dir = os.path.dirname(self.cache_filepath)
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            with open(tmp_filepath, 'w') as out_fp:
+                json.dump(self._entry_by_path, out_fp)
+            os.replace(tmp_filepath, self.cache_filepath)
+        except (IOError, OSError):
+            pass
+
+    def _get_cached(self, path, now):
+
+        entry = self._entry_by_path.get(path)
+        if entry is None:
+            return None
+
+        ttl = self.positive_ttl if entry['isdir'] else self.negative_ttl
+        if ttl <= 0 or now - entry['time'] > ttl:
+            return None
+
+        return entry
+
+    def probe_dirs(self, path_list):
+
+        # Returns a list of booleans, whether each path in path_list is an
+        # existing directory
+        now = time.time()
+        probe_by_path = {}
+        isdir_by_path = {}
+
+        with self._lock:
+            self._load_cache()
+            for path in path_list:
+                if path in isdir_by_path or path in probe_by_path:
+                    continue
+                entry = self._get_cached(path, now)
+                if entry is not None:
+                    self.stats['cache_hits'] += 1
+                    self.probe_record_by_path[path] = entry
+                    isdir_by_path[path] = entry['isdir']
+                    continue
+                probe_by_path[path] = ({}, threading.Event())
+
+        for (path, (result_d, done_event)) in probe_by_path.items():
+            # daemon threads, so a stat() hung on a dead mount never keeps
+            # the process from exiting
+            probe_thread = threading.Thread(
+                                target=_probe_isdir,
+                                args=(path, result_d, done_event))
+            probe_thread.daemon = True
+            probe_thread.start()
+
+        deadline = now + self.timeout
+        for (path, (result_d, done_event)) in probe_by_path.items():
+            timed_out = not done_event.wait(max(0.0, deadline - time.time()))
+            if timed_out:
+                record_d = {'isdir': False, 'latency': self.timeout,
+                            'timed_out': True, 'time': now}
+                envr_warning('Install location probe of "%s" timed out after '
+                             '%s seconds, treating it as not available' %
+                             (path, self.timeout))
+            else:
+                record_d = {'isdir': result_d['isdir'],
+                            'latency': result_d['latency'],
+                            'timed_out': False, 'time': now}
+                if record_d['latency'] >= _SLOW_PROBE_SECS:
+                    envr_warning('Install location probe of "%s" took %.2f '
+                                 'seconds' % (path, record_d['latency']))
+            isdir_by_path[path] = record_d['isdir']
+
+            with self._lock:
+                self.stats['probes'] += 1
+                if timed_out:
+                    self.stats['timeouts'] += 1
+                elif record_d['latency'] >= _SLOW_PROBE_SECS:
+                    self.stats['slow_probes'] += 1
+                self.probe_record_by_path[path] = record_d
+                self._entry_by_path[path] = record_d
+
+        if probe_by_path and self.positive_ttl > 0:
+            with self._lock:
+                self._save_cache()
+
+        return [isdir_by_path[path] for path in path_list]
+
+    def find_first_dir(self, path_list):
+
+        # first path in path_list that is an existing directory, or None
+        for (path, isdir) in zip(path_list, self.probe_dirs(path_list)):
+            if isdir:
+                return path
+        return None
+
+    def clear(self):
+
+        with self._lock:
+            self._entry_by_path = {}
+            self._save_cache()
+
+    def get_stats(self):
+
+        with self._lock:
+            stats_d = self.stats.copy()
+            stats_d['probe_records'] = {
+                path: dict(record_d) for (path, record_d) in
+                                        self.probe_record_by_path.items()}
+        return stats_d
+
+
+_INSTALL_PROBE = None
+
+
+def get_install_probe():
+
+    global _INSTALL_PROBE
+
+    if _INSTALL_PROBE is None:
+        positive_ttl = float(os.getenv('ENVR_INSTALL_PROBE_TTL',
+                                       _DEFAULT_POSITIVE_TTL))
+        negative_ttl = 0.0
+        cache_filepath = None
+        if positive_ttl > 0:
+            negative_ttl = float(os.getenv('ENVR_INSTALL_PROBE_NEG_TTL',
+                                           _DEFAULT_NEGATIVE_TTL))
+            cache_filepath = '%s/dir_probes.json' % get_local_cache_root(
+                                                            'install_probe')
+        _INSTALL_PROBE = InstallProbe(
+                timeout=float(os.getenv('ENVR_INSTALL_PROBE_TIMEOUT',
+                                        _DEFAULT_TIMEOUT)),
+                positive_ttl=positive_ttl,
+                negative_ttl=negative_ttl,
+                cache_filepath=cache_filepath)
+
+    return _INSTALL_PROBE
+
+
+def get_install_probe_stats():
+
+    return get_install_probe().get_stats()
@@ -1,12 +1,155 @@
 
 import os
+import re
 import sys
 import json
+import time
 
 from Deadline.Plugins import *
 from Deadline.Scripting import *
 
 
+# --- Throttled task reporting ------------------------------------------------
+#
+#   Chatty renderers can print thousands of progress and warning lines per
+#   task, and each one reported to Deadline is a write to the task log (and
+#   for progress, the repository). So:
+#
+#       progress is reported at most every "ProgressUpdateIntervalMs", or
+#       sooner when it has moved by "ProgressUpdateMinChange" percent (and
+#       always on reaching 100%), the latest value is flushed at task end
+#
+#       repeats of a warning (compared with numbers masked out) are only
+#       counted, and at most "WarningsPerMinute" distinct warnings get
+#       logged per minute ... a summary of what was held back is logged
+#       at task end
+#
+#   (see the plugin configuration, ENVRTaskRunner.param)
+#
+# ----------------------------------------------------------------------------
+
+_WARNING_KEY_REGEX = re.compile(r'[0-9]+')
+
+_MAX_SUMMARY_WARNINGS = 10
+
+
+class ProgressThrottle(object):
+
+    def __init__(self, set_progress_fn, interval_secs=1.0, min_change=1.0,
+                 clock=time.time):
+
+        self.set_progress_fn = set_progress_fn
+        self.interval_secs = interval_secs
+        self.min_change = min_change
+        self.clock = clock
+
+        self.reset()
+
+    def reset(self):
+
+        self.last_progress = None
+        self.last_report_t = None
+        self.pending_progress = None
+        self.update_count = 0
+        self.report_count = 0
+
+    def _report(self, progress_f, now):
+
+        self.set_progress_fn(progress_f)
+        self.last_progress = progress_f
+        self.last_report_t = now
+        self.pending_progress = None
+        self.report_count += 1
+
+    def update(self, progress_f):
+
+        self.update_count += 1
+        if progress_f == self.last_progress:
+            return
+
+        now = self.clock()
+        if (self.last_progress is None or progress_f >= 100.0 or
+                abs(progress_f - self.last_progress) >= self.min_change or
+                now - self.last_report_t >= self.interval_secs):
+            self._report(progress_f, now)
+        else:
+            self.pending_progress = progress_f
+
+    def flush(self):
+
+        if self.pending_progress is not None:
+            self._report(self.pending_progress, self.clock())
+
+
+class WarningReporter(object):
+
+    def __init__(self, log_warning_fn, log_info_fn, max_per_minute=60,
+                 clock=time.time):
+
+        self.log_warning_fn = log_warning_fn
+        self.log_info_fn = log_info_fn
+        self.max_per_minute = max_per_minute
+        self.clock = clock
+
+        self.reset()
+
+    def reset(self):
+
+        self.count_by_key = {}
+        self.text_by_key = {}
+        self.repeat_count = 0
+        self.rate_limited_count = 0
+        self.window_start_t = None
+        self.window_count = 0
+
+    def report(self, text):
+
+        text = text.rstrip()
+        key = _WARNING_KEY_REGEX.sub('#', text)
+
+        count = self.count_by_key.get(key, 0)
+        self.count_by_key[key] = count + 1
+        if count:
+            self.repeat_count += 1
+            return
+        self.text_by_key[key] = text
+
+        now = self.clock()
+        if self.window_start_t is None or now - self.window_start_t >= 60.0:
+            self.window_start_t = now
+            self.window_count = 0
+
+        if self.window_count >= self.max_per_minute:
+            self.rate_limited_count += 1
+            return
+
+        self.window_count += 1
+        self.log_warning_fn(text)
+
+    def finish(self):
+
+        # logs a summary of held back warnings, then starts over
+        if self.repeat_count or self.rate_limited_count:
+            self.log_warning_fn(
+                'ENVRTaskRunner: %s warning line(s) not logged individually '
+                '(%s repeats of %s distinct warning(s), %s over the limit of '
+                '%s per minute)' % (
+                    self.repeat_count + self.rate_limited_count,
+                    self.repeat_count, len(self.count_by_key),
+                    self.rate_limited_count, self.max_per_minute))
+
+            repeated_key_list = sorted(
+                    [key for key in self.count_by_key
+                        if self.count_by_key[key] > 1],
+                    key=lambda k: -self.count_by_key[k])
+            for key in repeated_key_list[:_MAX_SUMMARY_WARNINGS]:
+                self.log_info_fn('ENVRTaskRunner:   %s x %s' % (
+                                    self.count_by_key[key],
+                                    self.text_by_key[key]))
+
+        self.reset()
+
+
 def GetDeadlinePlugin():
 
     return ENVRTaskRunnerJobPlugin()
@@ -23,6 +166,7 @@ class ENVRTaskRunnerJobPlugin(DeadlinePlugin):
 
         self.InitializeProcessCallback += self.InitializeProcess
         self.PreRenderTasksCallback += self.PreRenderTasks
+        self.PostRenderTasksCallback += self.PostRenderTasks
         self.RenderExecutableCallback += self.RenderExecutable
         self.RenderArgumentCallback += self.RenderArgument
 
@@ -33,6 +177,7 @@ class ENVRTaskRunnerJobPlugin(DeadlinePlugin):
 
         del self.InitializeProcessCallback
         del self.PreRenderTasksCallback
+        del self.PostRenderTasksCallback
         del self.RenderExecutableCallback
         del self.RenderArgumentCallback
 
@@ -49,10 +194,34 @@ class ENVRTaskRunnerJobPlugin(DeadlinePlugin):
         self.SetEnvironmentVariable("ENVR_DEADLINE_JOBINFO_EXTRAINFOKEYVALUES",
                                     json.dumps(d, sort_keys=True) )
 
+        self.ProgressReporter = ProgressThrottle(
+            self.SetProgress,
+            interval_secs=float(self.GetConfigEntryWithDefault(
+                                "ProgressUpdateIntervalMs", "1000")) / 1000.0,
+            min_change=float(self.GetConfigEntryWithDefault(
+                                "ProgressUpdateMinChange", "1.0")))
+        self.WarningReporter = WarningReporter(
+            self.LogWarning, self.LogInfo,
+            max_per_minute=int(self.GetConfigEntryWithDefault(
+                                "WarningsPerMinute", "60")))
+
         stdout_handlers_d = {}
+        json_filepath = None
 
         if 'StdoutHandlersJsonFile' in d:
             json_filepath = os.path.expandvars(d['StdoutHandlersJsonFile'])
+
+        # With envrunner's stdout classifier, one stdout handler only passes
+        # candidate lines (by a literal prefilter of all patterns) to
+        # HandleStdoutLine, instead of every line running every pattern
+        self.StdoutClassifier = self.LoadStdoutClassifier(job, json_filepath)
+        if self.StdoutClassifier is not None:
+            self.AddStdoutHandlerCallback(
+                self.StdoutClassifier.candidate_line_pattern).HandleCallback \
+                    += self.HandleStdoutLine
+            return
+
+        if json_filepath:
             with open(json_filepath, 'r') as in_fp:
                 stdout_handlers_d = json.load(in_fp)
 
@@ -94,6 +263,38 @@ class ENVRTaskRunnerJobPlugin(DeadlinePlugin):
             percent_progress_pattern).HandleCallback += \
                 self.HandleProgressPercent
 
+    def LoadStdoutClassifier(self, job, json_filepath):
+
+        # Returns envrunner's StdoutClassifier for the job, or None if the
+        # envrunner package can not be found from the job's environment, in
+        # which case a stdout handler is registered per pattern instead
+        try:
+            pkg_parent_root = (
+                    job.GetJobEnvironmentKeyValue('ENVR_PKG_PARENT_ROOT') or
+                    os.getenv('ENVR_PKG_PARENT_ROOT'))
+            if not pkg_parent_root:
+                versions_root = (
+                    job.GetJobEnvironmentKeyValue('ENVR_INSTALL_VERSIONS_ROOT')
+                        or os.getenv('ENVR_INSTALL_VERSIONS_ROOT'))
+                if not versions_root:
+                    return None
+                with open('%s/ACTIVE_VERSION' % versions_root, 'r') as in_fp:
+                    pkg_parent_root = os.path.join(versions_root,
+                                                   in_fp.read().strip())
+
+            if pkg_parent_root not in sys.path:
+                sys.path.append(pkg_parent_root)
+
+            from envrunner.renderfarm.stdout_classifier import \
+                    load_stdout_classifier
+
+            return load_stdout_classifier(json_filepath)
+        except Exception as e:
+            self.LogInfo('ENVRTaskRunner: envrunner stdout classifier not '
+                         'available (%s), using per pattern stdout '
+                         'handlers' % e)
+            return None
+
     ## Called by Deadline for each task the Slave renders.
     def PreRenderTasks(self):
 
@@ -130,6 +331,13 @@ class ENVRTaskRunnerJobPlugin(DeadlinePlugin):
         self.SetEnvironmentVariable("ENVR_DEADLINE_GPUAFFINITY",
                                     '%s' % gpu_affinity_str)
 
+    ## Called by Deadline after each task the Slave renders.
+    def PostRenderTasks(self):
+
+        self.ProgressReporter.flush()
+        self.ProgressReporter.reset()
+        self.WarningReporter.finish()
+
     def RenderExecutable(self):
 
         version = self.GetPluginInfoEntry("Version")
@@ -158,9 +366,23 @@ class ENVRTaskRunnerJobPlugin(DeadlinePlugin):
 
         return "\"" + scriptFile + "\" " + arguments
 
+    ## Callback for candidate lines of stdout, when using the envrunner
+    ## stdout classifier.
+    def HandleStdoutLine(self):
+        for stdout_match in self.StdoutClassifier.classify(
+                                                    self.GetRegexMatch(0)):
+            if stdout_match.category == 'error':
+                self.LogStdout('>> ENVRTaskRunner ERROR >> %s' %
+                               stdout_match.text)
+                self.FailRender("Detected an error: " + stdout_match.text)
+            elif stdout_match.category == 'warning':
+                self.WarningReporter.report(stdout_match.text)
+            elif stdout_match.category == 'progress':
+                self.ProgressReporter.update(stdout_match.progress)
+
     ## Callback for when a line of stdout contains a WARNING message.
     def HandleStdoutWarning(self):
-        self.LogWarning(self.GetRegexMatch(0))
+        self.WarningReporter.report(self.GetRegexMatch(0))
 
     ## Callback for when a line of stdout contains an ERROR message.
     def HandleStdoutError(self):
@@ -168,25 +390,19 @@ class ENVRTaskRunnerJobPlugin(DeadlinePlugin):
         self.FailRender("Detected an error: " + self.GetRegexMatch(0))
 
     def HandleProgressAofB(self):
-        line = self.GetRegexMatch(0)
-        self.LogWarning(line)
-
-        tmp_str = line.replace('(', '###').replace(')', '###')
-        self.LogWarning(tmp_str)
-
-        tmp2_str = tmp_str.split('###')[-2]
-        self.LogWarning(tmp2_str)
-
-        (a, b) = [int(s) for s in tmp2_str.split(' of ')]
+        (a, b) = [int(s) for s in (self.GetRegexMatch(1),
+                                   self.GetRegexMatch(2))]
+        if not b:
+            return
         progress_f = (float(a) / float(b)) * 100.0
 
-        self.SetProgress(progress_f)
+        self.ProgressReporter.update(progress_f)
 
     def HandleProgressPercent(self):
         line = self.GetRegexMatch(0)
 
-        tmp_str = line.replace('(', '###').replace(')', '###').split('###')[-1]
+        tmp_str = line.replace('(', '###').replace(')', '###').split('###')[-2]
         progress_f = float(tmp_str.replace('%', ''))
 
-        self.SetProgress(progress_f)
+        self.ProgressReporter.update(progress_f)
 
@@ -0,0 +1,441 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import array
+import socket
+
+
+# --- Launcher daemon --------------------------------------------------------
+#
+#   An opt-in, long running per-user process that keeps envrunner imported,
+#   os info probed, config files parsed and resolved environments hot in
+#   memory (via the config and resolve caches), and launches runner configs
+#   on request over a local Unix socket.
+#
+#   The client sends one JSON line request along with its stdin, stdout and
+#   stderr file descriptors (SCM_RIGHTS), so the launched child writes
+#   straight to the client's terminal. The daemon replies with JSON lines:
+#
+#       {"status": "started", "pid": ...}
+#       {"status": "exited", "returncode": ...}     (when not detaching)
+#
+#   or {"status": "rejected", ...}/{"status": "error", ...}
+#
+#   Resolution runs against the client's environment, not the daemon's.
+#   Requests made with different ENVR_CFG_* roots than the daemon was
+#   started with are rejected, and the client falls back to launching
+#   in-process, as it does whenever the daemon is not running.
+#
+#   The client side of this module only needs the standard library, so
+#   using it does not import the rest of envrunner.
+#
+#   Socket path defaults to "envr_launch_daemon.sock" in the host-local
+#   cache root, set ENVR_LAUNCH_DAEMON_SOCKET to override it.
+#
+# ----------------------------------------------------------------------------
+
+LAUNCH_DAEMON_PROTOCOL_VERSION = 1
+
+_MAX_MSG_FDS = 3
+_RECV_CHUNK_SIZE = 65536
+
+_CFG_ROOT_ENV_VARS = [
+    'ENVR_CFG_ROOT',
+    'ENVR_CFG_SITE_ROOT',
+    'ENVR_CFG_PROJECTS_ROOT',
+    'ENVR_CFG_SW_ENVS_ROOT',
+]
+
+
+def get_default_socket_path():
+
+    socket_path = os.getenv('ENVR_LAUNCH_DAEMON_SOCKET')
+    if socket_path:
+        return socket_path
+
+    # a per user folder under the system temp location, as given by
+    # tempfile and getpass ... os_util.get_local_cache_root() is not used
+    # here so the client does not pay for importing os_util, and as it
+    # looks these up itself, the two can differ in unusual set ups
+    local_cache_root = os.getenv('ENVR_LOCAL_CACHE_ROOT')
+    if not local_cache_root:
+        import getpass
+        import tempfile
+        local_cache_root = '%s/__ENVRUNNER_LOCAL_CACHE/%s' % (
+                                tempfile.gettempdir().replace('\\', '/'),
+                                getpass.getuser())
+
+    return '%s/envr_launch_daemon.sock' % local_cache_root
+
+
+def _send_msg(conn, msg_d, fd_list=None):
+
+    data = (json.dumps(msg_d) + '\n').encode('utf-8')
+    if fd_list:
+        fds = array.array('i', fd_list)
+        sent = conn.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS,
+                                      fds.tobytes())])
+        data = data[sent:]
+    if data:
+        conn.sendall(data)
+
+
+class _MsgReader(object):
+
+    # Reads JSON line messages from a stream socket, collecting any file
+    # descriptors sent along with them
+    def __init__(self, conn):
+
+        self.conn = conn
+        self.buffer = b''
+        self.fd_list = []
+
+    def read_msg(self):
+
+        while b'\n' not in self.buffer:
+            fds = array.array('i')
+            chunk, anc_data, _flags, _addr = self.conn.recvmsg(
+                                    _RECV_CHUNK_SIZE,
+                                    socket.CMSG_SPACE(_MAX_MSG_FDS *
+                                                      fds.itemsize))
+            for (level, msg_type, fd_data) in anc_data:
+                if level == socket.SOL_SOCKET and \
+                        msg_type == socket.SCM_RIGHTS:
+                    fds.frombytes(fd_data[:len(fd_data) -
+                                          (len(fd_data) % fds.itemsize)])
+            self.fd_list.extend(fds)
+            if not chunk:
+                return None
+            self.buffer += chunk
+
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return json.loads(line.decode('utf-8'))
+
+
+def _connect(socket_path):
+
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+    except (IOError, OSError):
+        conn.close()
+        return None
+
+    return conn
+
+
+def send_daemon_request(request_d, socket_path=None):
+
+    # For the simple ops ("ping", "stats", "shutdown"), returns the reply
+    # dict or None if the daemon is not running
+    conn = _connect(socket_path or get_default_socket_path())
+    if conn is None:
+        return None
+
+    try:
+        _send_msg(conn, dict(request_d,
+                             version=LAUNCH_DAEMON_PROTOCOL_VERSION))
+        return _MsgReader(conn).read_msg()
+    except (IOError, OSError, ValueError):
+        return None
+    finally:
+        conn.close()
+
+
+def launch_via_daemon(prj_code, launch_cfg_filepath, detach_subprocess=False,
+                      socket_path=None):
+
+    # Returns None if the daemon is not running or could not handle the
+    # request, in which case the caller should launch in-process. Otherwise
+    # returns a dict with "pid" and, when not detaching, "returncode".
+    conn = _connect(socket_path or get_default_socket_path())
+    if conn is None:
+        return None
+
+    request_d = {
+        'version': LAUNCH_DAEMON_PROTOCOL_VERSION,
+        'op': 'launch',
+        'prj_code': prj_code,
+        'launch_cfg_filepath': os.path.abspath(launch_cfg_filepath),
+        'detach': detach_subprocess,
+        'cwd': os.getcwd(),
+        'env': dict(os.environ),
+    }
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    result_d = None
+    try:
+        _send_msg(conn, request_d, [sys.stdin.fileno(), sys.stdout.fileno(),
+                                    sys.stderr.fileno()])
+        reader = _MsgReader(conn)
+
+        reply_d = reader.read_msg()
+        if reply_d is None or reply_d.get('status') == 'rejected':
+            return None
+        if reply_d.get('status') == 'error':
+            raise Exception('Launch daemon was unable to launch "%s": %s' %
+                            (launch_cfg_filepath, reply_d.get('error')))
+
+        result_d = {'pid': reply_d['pid']}
+        if detach_subprocess:
+            return result_d
+
+        # if interrupted here, closing the connection has the daemon stop
+        # the child
+        reply_d = reader.read_msg()
+        if reply_d is None:
+            raise Exception('Lost connection to launch daemon while waiting '
+                            'on process %s' % result_d['pid'])
+
+        result_d['returncode'] = reply_d.get('returncode')
+        return result_d
+    except (IOError, OSError, ValueError):
+        if result_d is not None:
+            # already launched, so must not be launched again in-process
+            raise
+        return None
+    finally:
+        conn.close()
+
+
+# --- daemon side ------------------------------------------------------------
+
+class LaunchDaemon(object):
+
+    def __init__(self, socket_path=None):
+
+        self.socket_path = socket_path or get_default_socket_path()
+        self.server = None
+        self.stats = {'launches': 0, 'rejected': 0, 'errors': 0}
+
+        import threading
+        from . import os_util
+
+        self._os_util = os_util
+        self._resolve_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat_name):
+
+        with self._stats_lock:
+            self.stats[stat_name] += 1
+
+    def _get_cfg_root_mismatch(self, client_env_d):
+
+        # mirror how os_util works out the cfg roots from the environment
+        os_util = self._os_util
+        cfg_root = (client_env_d.get('ENVR_CFG_ROOT')
+                        or '%s/envrunner_cfg' % os_util._THIS_DIR)
+        client_root_by_var = {
+            'ENVR_CFG_ROOT': cfg_root,
+            'ENVR_CFG_SITE_ROOT': (client_env_d.get('ENVR_CFG_SITE_ROOT')
+                                    or '%s/site' % cfg_root),
+            'ENVR_CFG_PROJECTS_ROOT': (
+                                client_env_d.get('ENVR_CFG_PROJECTS_ROOT')
+                                    or '%s/projects' % cfg_root),
+            'ENVR_CFG_SW_ENVS_ROOT': (client_env_d.get('ENVR_CFG_SW_ENVS_ROOT')
+                                        or '%s/sw_envs' % cfg_root),
+        }
+        for env_var in _CFG_ROOT_ENV_VARS:
+            if client_root_by_var[env_var] != getattr(os_util, env_var):
+                return env_var
+        return None
+
+    def prepare_launch(self, prj_code, launch_cfg_filepath, client_env_d):
+
+        # Resolves the runner config against the client's environment and
+        # returns (child_env_d, cmd_and_args, shell). The resolve is pure,
+        # with client_env_d as its private base env, so the daemon's own
+        # os.environ is never touched. Requests are still resolved one at
+        # a time, so concurrent clients don't race to fill the same caches.
+        from . import env_mechanism
+
+        with self._resolve_lock:
+            envr_env, launch_cfg_d = env_mechanism.create_from_launch_config(
+                                            prj_code, launch_cfg_filepath,
+                                            pure=True,
+                                            base_env_d=client_env_d)
+            # writes the session spec of the pure env, as it is launched
+            child_env_d = envr_env.build_child_env_d()
+
+        if 'os_system_call' in launch_cfg_d:
+            return (child_env_d, launch_cfg_d['os_system_call'], True)
+
+        cmd_and_args = envr_env._build_cmd_and_args(
+                                    launch_cfg_d.get('command'),
+                                    launch_cfg_d.get('args', []),
+                                    child_env_d)
+        return (child_env_d, cmd_and_args, False)
+
+    def warm(self, prj_code, launch_cfg_filepath):
+
+        # pre-resolve a runner config so the first request for it is hot
+        self.prepare_launch(prj_code, os.path.abspath(launch_cfg_filepath),
+                            dict(os.environ))
+
+    def handle_connection(self, conn):
+
+        import threading
+        import subprocess
+
+        reader = _MsgReader(conn)
+        try:
+            request_d = reader.read_msg()
+            if request_d is None:
+                return
+
+            if request_d.get('version') != LAUNCH_DAEMON_PROTOCOL_VERSION:
+                self._count('rejected')
+                _send_msg(conn, {'status': 'rejected',
+                                 'reason': 'protocol version mismatch'})
+                return
+
+            op = request_d.get('op')
+            if op == 'ping':
+                _send_msg(conn, {'status': 'ok', 'pid': os.getpid()})
+                return
+            elif op == 'stats':
+                from .config_cache import get_config_cache_stats
+                from .resolve_cache import get_resolve_cache_stats
+                with self._stats_lock:
+                    stats_d = dict(self.stats)
+                _send_msg(conn, {'status': 'ok', 'daemon': stats_d,
+                                 'config_cache': get_config_cache_stats(),
+                                 'resolve_cache': get_resolve_cache_stats()})
+                return
+            elif op == 'shutdown':
+                _send_msg(conn, {'status': 'ok'})
+                threading.Thread(target=self.server.shutdown).start()
+                return
+            elif op != 'launch':
+                _send_msg(conn, {'status': 'error',
+                                 'error': 'Unknown op "%s"' % op})
+                return
+
+            client_env_d = request_d.get('env') or {}
+            mismatched_var = self._get_cfg_root_mismatch(client_env_d)
+            if mismatched_var:
+                self._count('rejected')
+                _send_msg(conn, {'status': 'rejected',
+                                 'reason': '%s differs from daemon' %
+                                                mismatched_var})
+                return
+
+            try:
+                child_env_d, cmd_and_args, shell = self.prepare_launch(
+                                            request_d['prj_code'],
+                                            request_d['launch_cfg_filepath'],
+                                            client_env_d)
+                stdio_fds = (reader.fd_list + [None] * 3)[:3]
+                p = subprocess.Popen(cmd_and_args, shell=shell,
+                                     cwd=request_d.get('cwd'),
+                                     stdin=stdio_fds[0], stdout=stdio_fds[1],
+                                     stderr=stdio_fds[2], env=child_env_d,
+                                     start_new_session=bool(
+                                                    request_d.get('detach')))
+            except Exception as err:
+                self._count('errors')
+                _send_msg(conn, {'status': 'error', 'error': str(err)})
+                return
+            finally:
+                # the child has its own copies of the client's stdio now
+                for fd in reader.fd_list:
+                    os.close(fd)
+                reader.fd_list = []
+
+            self._count('launches')
+            _send_msg(conn, {'status': 'started', 'pid': p.pid})
+
+            if request_d.get('detach'):
+                conn.close()
+                p.wait()  # only to reap the child
+                return
+
+            # wait on the child, stopping it if the client goes away first
+            def _watch_client():
+                try:
+                    conn.recv(1)
+                except (IOError, OSError):
+                    pass
+                if p.poll() is None:
+                    p.terminate()
+
+            watcher = threading.Thread(target=_watch_client)
+            watcher.daemon = True
+            watcher.start()
+
+            p.wait()
+            _send_msg(conn, {'status': 'exited', 'returncode': p.returncode})
+        except (IOError, OSError, ValueError):
+            pass
+        finally:
+            for fd in reader.fd_list:
+                os.close(fd)
+            conn.close()
+
+    def serve_forever(self):
+
+        import socketserver
+
+        daemon = self
+
+        class _Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                daemon.handle_connection(self.request)
+
+        class _Server(socketserver.ThreadingMixIn,
+                      socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        socket_dir = os.path.dirname(self.socket_path)
+        if socket_dir and not os.path.isdir(socket_dir):
+            os.makedirs(socket_dir)
+
+        if os.path.exists(self.socket_path):
+            if send_daemon_request({'op': 'ping'}, self.socket_path):
+                raise Exception('A launch daemon is already running on '
+                                '"%s"' % self.socket_path)
+            os.remove(self.socket_path)  # stale socket file
+
+        # socket is only usable by the user running the daemon
+        old_umask = os.umask(0o077)
+        try:
+            self.server = _Server(self.socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
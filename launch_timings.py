@@ -0,0 +1,207 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import time
+
+
+# --- Per-phase launch timings -----------------------------------------------
+#
+#   A LaunchTimings object is handed to create_from_launch_config(),
+#   EnvRunnerEnv and run_launch_config() (the "timings" argument), which
+#   time each phase of a launch with:
+#
+#       with timings.phase('session_spec_write'):
+#           ...
+#
+#   Phases can be nested, e.g. "active_sw_snapshot" inside "resolve". The
+#   default is NULL_LAUNCH_TIMINGS, whose phase() does nothing, so launches
+#   that are not being timed pay next to nothing for the instrumentation.
+#
+#   Phases started with overhead=False (waiting on the launched process)
+#   are reported but not counted in the launch overhead total.
+#
+#   bin/launch_runner.py and bin/check_environment.py have a --timings flag
+#   that prints the report and writes it as JSON into the user's current
+#   session folder.
+#
+# ----------------------------------------------------------------------------
+
+LAUNCH_TIMINGS_FORMAT_VERSION = 1
+
+
+class _Phase(object):
+
+    __slots__ = ('timings', 'record_d')
+
+    def __init__(self, timings, record_d):
+
+        self.timings = timings
+        self.record_d = record_d
+
+    def __enter__(self):
+
+        self.timings._depth += 1
+        self.record_d['start'] = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+
+        self.record_d['secs'] = time.perf_counter() - self.record_d['start']
+        self.timings._depth -= 1
+        if exc_type is not None:
+            self.record_d['failed'] = True
+        return False
+
+
+class LaunchTimings(object):
+
+    def __init__(self, start_time=None):
+
+        # start_time (a time.perf_counter() value) lets the report include
+        # time spent before the timings object was created, e.g. imports
+        self.start_time = (start_time if start_time is not None
+                                      else time.perf_counter())
+        self.phase_list = []
+        self.info_d = {}
+
+        self._depth = 0
+
+    def phase(self, name, overhead=True):
+
+        record_d = {'name': name, 'depth': self._depth, 'start': None,
+                    'secs': None, 'overhead': overhead}
+        self.phase_list.append(record_d)
+        return _Phase(self, record_d)
+
+    def add_phase(self, name, start, end, overhead=True):
+
+        # a phase timed by the caller, start and end are time.perf_counter()
+        # values
+        self.phase_list.append({'name': name, 'depth': self._depth,
+                                'start': start, 'secs': end - start,
+                                'overhead': overhead})
+
+    def add_info(self, **info_kwargs):
+
+        # extra details for the report, e.g. whether the resolve cache hit
+        self.info_d.update(info_kwargs)
+
+    def get_overhead_secs(self):
+
+        # top level phases only, nested ones are already included in those
+        return sum([record_d['secs'] for record_d in self.phase_list
+                        if record_d['depth'] == 0 and record_d['overhead']
+                            and record_d['secs'] is not None])
+
+    def to_dict(self):
+
+        phase_list = []
+        for record_d in self.phase_list:
+            phase_d = {
+                'name': record_d['name'],
+                'depth': record_d['depth'],
+                'offset_ms': (record_d['start'] - self.start_time) * 1000.0,
+                'ms': (record_d['secs'] * 1000.0
+                        if record_d['secs'] is not None else None),
+                'overhead': record_d['overhead'],
+            }
+            if record_d.get('failed'):
+                phase_d['failed'] = True
+            phase_list.append(phase_d)
+
+        return {
+            '__type__': 'launch_timings',
+            '__version__': LAUNCH_TIMINGS_FORMAT_VERSION,
+            'pid': os.getpid(),
+            'time': time.time(),
+            'overhead_ms': self.get_overhead_secs() * 1000.0,
+            'info': self.info_d,
+            'phases': phase_list,
+        }
+
+    def format_report(self):
+
+        line_list = ['   %10s  %10s  phase' % ('ms', 'at ms')]
+        for phase_d in self.to_dict()['phases']:
+            line_list.append('   %10s  %10.2f  %s%s%s' % (
+                    ('%.2f' % phase_d['ms']) if phase_d['ms'] is not None
+                                             else '-',
+                    phase_d['offset_ms'], '  ' * phase_d['depth'],
+                    phase_d['name'],
+                    '' if phase_d['overhead'] else ' (not overhead)'))
+        line_list.append('')
+        line_list.append('   %10.2f  launch overhead total' % (
+                                        self.get_overhead_secs() * 1000.0))
+        for info_key in sorted(self.info_d.keys()):
+            line_list.append('   :: %s = %s' % (info_key,
+                                                self.info_d[info_key]))
+        return '\n'.join(line_list)
+
+    def write_json(self, session_root, file_prefix):
+
+        # Writes the report into session_root as
+        # "<file_prefix>_launch_timings.json", returns the file path or None
+        # if it could not be written (never breaks a launch)
+        filepath = os.path.join(session_root,
+                                '%s_launch_timings.json' % file_prefix)
+        try:
+            if not os.path.isdir(session_root):
+                os.makedirs(session_root)
+            with open(filepath, 'w') as out_fp:
+                out_fp.write('%s\n' % json.dumps(self.to_dict(), indent=4,
+                                                 sort_keys=True))
+        except (IOError, OSError):
+            return None
+
+        return filepath
+
+
+class _NullPhase(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullLaunchTimings(object):
+
+    # stand-in when a launch is not being timed
+
+    def phase(self, name, overhead=True):
+        return _NULL_PHASE
+
+    def add_info(self, **info_kwargs):
+        pass
+
+
+NULL_LAUNCH_TIMINGS = NullLaunchTimings()
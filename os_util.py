@@ -23,7 +23,8 @@
 # -----------------------------------------------------------------------------
 
 import os
-import platform
+import re
+import json
 
 
 OPPOSITE_PATH_SLASH_D = {'\\': '/', '/': '\\'}
@@ -52,6 +53,76 @@ def conform_slash(path_str, force_slash=None):
     return conform_path_slash(path_str, force_slash=force_slash)
 
 
+_ENV_VAR_EXPAND_REGEX = re.compile(
+            r'\$(?:\{([A-Za-z0-9_]+)\}|([A-Za-z0-9_]+))|%([A-Za-z0-9_]+)%')
+
+
+def expand_env_vars(input_str, env_d):
+
+    # Same as os.path.expandvars() but expands against env_d instead of the
+    # current process environment. Handles "$VAR", "${VAR}" and, on
+    # Windows, "%VAR%" ... references to vars not in env_d are left as-is.
+    if '$' not in input_str and '%' not in input_str:
+        return input_str
+
+    use_win_style = os.name == 'nt'
+
+    def _replace_ref(match):
+        env_var = match.group(1) or match.group(2)
+        if not env_var:
+            if not use_win_style:
+                return match.group(0)
+            env_var = match.group(3)
+        value = env_d.get(env_var)
+        if value is None and use_win_style:
+            value = env_d.get(env_var.upper())
+        return match.group(0) if value is None else value
+
+    return _ENV_VAR_EXPAND_REGEX.sub(_replace_ref, input_str)
+
+
+def _get_temp_dir():
+
+    # same result as tempfile.gettempdir() (in all but unusual set ups),
+    # without paying for importing tempfile
+    for env_var in ('TMPDIR', 'TEMP', 'TMP'):
+        temp_dir = os.getenv(env_var)
+        if temp_dir:
+            return os.path.abspath(temp_dir)
+    if os.name != 'nt' and os.access('/tmp', os.W_OK):
+        return '/tmp'
+
+    import tempfile
+    return tempfile.gettempdir()
+
+
+def _get_user():
+
+    # same lookup order as getpass.getuser()
+    for env_var in ('LOGNAME', 'USER', 'LNAME', 'USERNAME'):
+        user = os.getenv(env_var)
+        if user:
+            return user
+
+    import getpass
+    return getpass.getuser()
+
+
+def get_local_cache_root(subdir=None):
+
+    # Host-local (never network) location for envrunner caches. Can be
+    # redirected with ENVR_LOCAL_CACHE_ROOT, otherwise falls back to a per
+    # user folder under the system temp location.
+    local_cache_root = os.getenv('ENVR_LOCAL_CACHE_ROOT')
+    if not local_cache_root:
+        local_cache_root = '%s/__ENVRUNNER_LOCAL_CACHE/%s' % (
+                                fslash(_get_temp_dir()), _get_user())
+    if subdir:
+        local_cache_root = '%s/%s' % (local_cache_root, subdir)
+
+    return fslash(local_cache_root)
+
+
 class InfoObj:
     def __init__(self, d):
         self.__dict__.update(d)
@@ -73,6 +144,8 @@ def _get_linux_os_release_obj():
 
 def _build_os_info():
 
+    import platform
+
     platform_bits = platform.platform().split('-')
     _os = platform_bits[0].lower()
     _os_info = {'os': _os}
@@ -98,20 +171,130 @@ def _build_os_info():
     else:
         raise Exception('"%s" is not a supported operating system.' % _os)
 
-    _os_info.update({
-        'specificity_list': [
-            '%s/%s/%s' % (
-                    _os_info['os'], _os_info['distro'], _os_info['version']),
-            '%s/%s' % (_os_info['os'], _os_info['distro']),
-            _os_info['os'],
-        ]
-    })
+    _os_info['specificity_list'] = _build_specificity_list(_os_info)
 
     return InfoObj(_os_info)
 
 
-# generate and store OS information
-os_info = _build_os_info()
+def _build_specificity_list(os_info_d):
+
+    return [
+        '%s/%s/%s' % (os_info_d['os'], os_info_d['distro'],
+                      os_info_d['version']),
+        '%s/%s' % (os_info_d['os'], os_info_d['distro']),
+        os_info_d['os'],
+    ]
+
+
+# --- Persisted OS information -----------------------------------------------
+#
+#   Detecting the OS (platform.platform(), /etc/os-release) costs every
+#   process importing envrunner ~10-20ms, so the result, specificity_list
+#   included, is kept in a host-local cache file. It is re-detected when
+#   any of these cheap to get facts change:
+#
+#       host name, kernel name and release, and the mtime of /etc/os-release
+#       (or SystemVersion.plist on macOS) ... on Windows, the host name and
+#       Windows version
+#
+#   Containerized workers (where the host name changes with every
+#   container) can skip detection entirely by setting:
+#
+#       ENVR_OS_INFO_OVERRIDE="<os>/<distro>/<version>"  (e.g. linux/rocky/9.2)
+#
+# ----------------------------------------------------------------------------
+
+OS_INFO_CACHE_FORMAT_VERSION = 1
+
+# keys every os info has, cached os info without any of them is ignored
+_OS_INFO_CACHE_KEYS = ('os', 'distro', 'version', 'specificity_list')
+
+_SUPPORTED_OS_LIST = ['linux', 'windows', 'macos']
+
+
+def _get_os_info_stamp():
+
+    if os.name == 'nt':
+        import sys
+        return ['nt', os.getenv('COMPUTERNAME'),
+                list(sys.getwindowsversion()[:4])]
+
+    uname = os.uname()
+    release_filepath = ('/etc/os-release' if uname.sysname == 'Linux' else
+                        '/System/Library/CoreServices/SystemVersion.plist')
+    try:
+        release_mtime = os.stat(release_filepath).st_mtime
+    except (IOError, OSError):
+        release_mtime = None
+
+    return [uname.sysname, uname.nodename, uname.release, release_mtime]
+
+
+def _get_os_info_override(override_str):
+
+    bits = override_str.strip().split('/')
+    if len(bits) != 3 or bits[0] not in _SUPPORTED_OS_LIST or not all(bits):
+        raise Exception('ENVR_OS_INFO_OVERRIDE must be "<os>/<distro>/'
+                        '<version>", with <os> one of %s ... got "%s"' % (
+                            _SUPPORTED_OS_LIST, override_str))
+
+    os_info_d = {'os': bits[0], 'distro': bits[1], 'version': bits[2]}
+    os_info_d['specificity_list'] = _build_specificity_list(os_info_d)
+    return InfoObj(os_info_d)
+
+
+def _load_os_info():
+
+    override_str = os.getenv('ENVR_OS_INFO_OVERRIDE')
+    if override_str:
+        return _get_os_info_override(override_str)
+
+    stamp = _get_os_info_stamp()
+    cache_filepath = '%s/os_info.json' % get_local_cache_root('os_info')
+
+    try:
+        with open(cache_filepath, 'r') as in_fp:
+            cache_d = json.load(in_fp)
+        if cache_d.get('__version__') == OS_INFO_CACHE_FORMAT_VERSION and \
+                cache_d.get('stamp') == stamp:
+            cached_os_info_d = cache_d['os_info']
+            if all([cached_os_info_d[k] for k in _OS_INFO_CACHE_KEYS]):
+                return InfoObj(cached_os_info_d)
+    except (IOError, OSError, ValueError, TypeError, KeyError,
+            AttributeError):
+        # a corrupt local cache must never break anything either, the os
+        # info is detected again
+        pass
+
+    detected_os_info = _build_os_info()
+
+    # failure to write the local cache must never break anything
+    tmp_filepath = '%s.%s.tmp' % (cache_filepath, os.getpid())
+    try:
+        cache_dir = os.path.dirname(cache_filepath)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        with open(tmp_filepath, 'w') as out_fp:
+            json.dump({'__version__': OS_INFO_CACHE_FORMAT_VERSION,
+                       'stamp': stamp,
+                       'os_info': detected_os_info.__dict__}, out_fp)
+        os.replace(tmp_filepath, cache_filepath)
+    except (IOError, OSError):
+        pass
+
+    return detected_os_info
+
+
+# generate (or load) and store OS information
+os_info = _load_os_info()
+
+
+def conform_env_key(env_var):
+
+    # env var names are case insensitive on Windows, where os.environ keeps
+    # them all upper case
+    env_var = str(env_var)
+    return env_var.upper() if os_info.os == 'windows' else env_var
 
 
 # bootstrap the base env vars
@@ -127,16 +310,23 @@ ENVR_CFG_SW_ENVS_ROOT = (os.getenv('ENVR_CFG_SW_ENVS_ROOT')
                             or '%s/sw_envs' % ENVR_CFG_ROOT)
 
 
-def reset_bootstrap_env():
+def get_bootstrap_env_d():
+
+    return {
+        'ENVR_OS': os_info.os,
+        'ENVR_OS_DISTRO': os_info.distro,
+        'ENVR_OS_VER': os_info.version,
 
-    os.environ['ENVR_OS'] = os_info.os
-    os.environ['ENVR_OS_DISTRO'] = os_info.distro
-    os.environ['ENVR_OS_VER'] = os_info.version
+        'ENVR_CFG_ROOT': ENVR_CFG_ROOT,
+        'ENVR_CFG_SITE_ROOT': ENVR_CFG_SITE_ROOT,
+        'ENVR_CFG_PROJECTS_ROOT': ENVR_CFG_PROJECTS_ROOT,
+        'ENVR_CFG_SW_ENVS_ROOT': ENVR_CFG_SW_ENVS_ROOT,
+    }
+
+
+def reset_bootstrap_env():
 
-    os.environ['ENVR_CFG_ROOT'] = ENVR_CFG_ROOT
-    os.environ['ENVR_CFG_SITE_ROOT'] = ENVR_CFG_SITE_ROOT
-    os.environ['ENVR_CFG_PROJECTS_ROOT'] = ENVR_CFG_PROJECTS_ROOT
-    os.environ['ENVR_CFG_SW_ENVS_ROOT'] = ENVR_CFG_SW_ENVS_ROOT
+    os.environ.update(get_bootstrap_env_d())
 
 
 reset_bootstrap_env()
@@ -0,0 +1,395 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import json
+import base64
+import socket
+import threading
+import subprocess
+
+try:
+    import http.client as http_client
+    from urllib.parse import urlsplit
+except ImportError:
+    import httplib as http_client
+    from urlparse import urlsplit
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+# --- Deadline submitter backends --------------------------------------------
+#
+#   A submitter takes a list of job dicts, as written out by
+#   ENVRJobDeadlineSubmit:
+#
+#       {
+#           "job_info": {...},          # Deadline job info key/values
+#           "plugin_info": {...},       # Deadline plugin info key/values
+#           "job_info_file": "...",     # .ini files of the above
+#           "plugin_info_file": "...",
+#           "aux_files": ["..."],       # files uploaded with the job
+#       }
+#
+#   and returns the Deadline job IDs in the same order, None for any job
+#   that failed to submit. Backends:
+#
+#       DeadlineCommandSubmitter ... "deadlinecommand -SubmitMultipleJobs",
+#                                    one call per chunk of jobs
+#
+#       DeadlineWebServiceSubmitter ... POSTs to the Deadline Web Service
+#                                       REST API over a pool of keep-alive
+#                                       HTTP connections, with no process
+#                                       spawned per job
+#
+#       DryRunSubmitter ... only prints what would be submitted
+#
+#   get_submitter_from_env() picks one by ENVR_DEADLINE_SUBMITTER ("command"
+#   (default), "webservice" or "dry_run"), the web service one connecting to
+#   ENVR_DEADLINE_WEBSERVICE_URL (e.g. "http://deadline-ws:8081").
+#
+# ----------------------------------------------------------------------------
+
+# A batch of jobs is submitted with one deadlinecommand call per chunk of at
+# most this many jobs, also keeping each command line well under the Windows
+# limit of 32767 characters
+#
+_MAX_JOBS_PER_SUBMIT_CALL = 100
+_MAX_SUBMIT_CMD_CHARS = 24000
+
+_DEFAULT_WEBSERVICE_TIMEOUT = 30.0
+_DEFAULT_WEBSERVICE_CONNECTIONS = 4
+
+
+def parse_submit_output(output_str, job_count):
+
+    # Returns the job IDs in the output of a "deadlinecommand
+    # -SubmitMultipleJobs" call, one per job in order of submission ... None
+    # for a job that failed to submit. Each job's part of the output starts
+    # with a "Result=" line, followed by a "JobID=" line if it succeeded
+    job_id_list = []
+    for line in output_str.splitlines():
+        line = line.strip()
+        if line.startswith('Result='):
+            job_id_list.append(None)
+        elif line.startswith('JobID=') and job_id_list:
+            job_id_list[-1] = line[len('JobID='):].strip() or None
+
+    job_id_list = job_id_list[:job_count]
+    return job_id_list + [None] * (job_count - len(job_id_list))
+
+
+def _chunk_job_args(job_args_list, max_jobs_per_call, max_cmd_chars):
+
+    chunk_list = []
+    chunk = []
+    chunk_chars = 0
+    for job_args in job_args_list:
+        job_chars = sum([len(arg) + 1 for arg in job_args])
+        if chunk and (len(chunk) >= max_jobs_per_call or
+                      chunk_chars + job_chars > max_cmd_chars):
+            chunk_list.append(chunk)
+            chunk = []
+            chunk_chars = 0
+        chunk.append(job_args)
+        chunk_chars += job_chars
+    if chunk:
+        chunk_list.append(chunk)
+
+    return chunk_list
+
+
+class DeadlineSubmitter(object):
+
+    name = None
+
+    def submit_jobs(self, job_d_list):
+
+        raise NotImplementedError
+
+    def close(self):
+
+        pass
+
+
+class DeadlineCommandSubmitter(DeadlineSubmitter):
+
+    name = 'command'
+
+    def __init__(self, deadline_cmd, max_jobs_per_call=_MAX_JOBS_PER_SUBMIT_CALL,
+                 max_cmd_chars=_MAX_SUBMIT_CMD_CHARS):
+
+        self.deadline_cmd = deadline_cmd
+        self.max_jobs_per_call = max_jobs_per_call
+        self.max_cmd_chars = max_cmd_chars
+
+    def submit_jobs(self, job_d_list):
+
+        job_args_list = [
+            ['-job', job_d['job_info_file'], job_d['plugin_info_file']] +
+                                                    list(job_d['aux_files'])
+                for job_d in job_d_list]
+
+        job_id_list = []
+        for job_args_chunk in _chunk_job_args(job_args_list,
+                                              self.max_jobs_per_call,
+                                              self.max_cmd_chars):
+            job_id_list += self._run_deadline_command(job_args_chunk)
+
+        return job_id_list
+
+    def _run_deadline_command(self, job_args_chunk):
+
+        cmd_and_args = [self.deadline_cmd, '-SubmitMultipleJobs']
+        for job_args in job_args_chunk:
+            cmd_and_args += job_args
+
+        p = subprocess.Popen(cmd_and_args,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        out, err = p.communicate()
+
+        if out:
+            print('')
+            print(out.decode('utf-8'))
+
+        if err:
+            print('')
+            print(err.decode('utf-8'))
+
+        print('')
+        print(':: Deadline submission executed for %s job(s)' %
+              len(job_args_chunk))
+        print('')
+
+        return parse_submit_output(out.decode('utf-8', 'replace'),
+                                   len(job_args_chunk))
+
+
+class DryRunSubmitter(DeadlineSubmitter):
+
+    name = 'dry_run'
+
+    def submit_jobs(self, job_d_list):
+
+        for job_d in job_d_list:
+            print('')
+            print(':: Dry run ... would be submitting: %s' % (
+                        [job_d['job_info_file'], job_d['plugin_info_file']] +
+                        list(job_d['aux_files'])))
+        print('')
+
+        return [None] * len(job_d_list)
+
+
+class _HTTPConnectionPool(object):
+
+    def __init__(self, host, port, use_https=False,
+                 timeout=_DEFAULT_WEBSERVICE_TIMEOUT,
+                 max_connections=_DEFAULT_WEBSERVICE_CONNECTIONS,
+                 keep_alive=True):
+
+        self.host = host
+        self.port = port
+        self.use_https = use_https
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+
+        self._idle_connections = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+        self.stats = {'connections_opened': 0, 'requests': 0, 'retries': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat_name):
+
+        with self._stats_lock:
+            self.stats[stat_name] += 1
+
+    def _new_connection(self):
+
+        connection_class = (http_client.HTTPSConnection if self.use_https
+                                else http_client.HTTPConnection)
+        self._count('connections_opened')
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+
+        # Returns (status, response body bytes)
+        headers = dict(headers or {})
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+
+        with self._slots:
+            try:
+                connection = self._idle_connections.get_nowait()
+                is_reused = True
+            except queue.Empty:
+                connection = self._new_connection()
+                is_reused = False
+
+            try:
+                self._count('requests')
+                try:
+                    connection.request(method, path, body, headers)
+                except socket.timeout:
+                    raise
+                except socket.error:
+                    # the server may close an idle keep-alive connection at
+                    # any time, so a request that could not be sent on a
+                    # reused connection is sent again on a new one. Once it
+                    # has been sent the server may have acted on it (e.g.
+                    # created the job), so failing to read the response is
+                    # never retried, it is an error
+                    connection.close()
+                    if not is_reused:
+                        raise
+                    self._count('retries')
+                    connection = self._new_connection()
+                    connection.request(method, path, body, headers)
+
+                response = connection.getresponse()
+                response_data = response.read()
+            except Exception:
+                connection.close()
+                raise
+
+            if self.keep_alive and not response.will_close:
+                self._idle_connections.put(connection)
+            else:
+                connection.close()
+
+        return (response.status, response_data)
+
+    def close(self):
+
+        while True:
+            try:
+                self._idle_connections.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class DeadlineWebServiceSubmitter(DeadlineSubmitter):
+
+    name = 'webservice'
+
+    def __init__(self, url, timeout=_DEFAULT_WEBSERVICE_TIMEOUT,
+                 max_connections=_DEFAULT_WEBSERVICE_CONNECTIONS,
+                 user=None, password=None, keep_alive=True):
+
+        url_parts = urlsplit(url)
+        if url_parts.scheme not in ('http', 'https') or not url_parts.hostname:
+            raise Exception('Invalid Deadline Web Service URL: "%s"' % url)
+
+        self.url = url
+        self.base_path = url_parts.path.rstrip('/')
+        self.max_connections = max_connections
+
+        self.pool = _HTTPConnectionPool(
+                        url_parts.hostname,
+                        url_parts.port or (443 if url_parts.scheme == 'https'
+                                           else 8081),
+                        use_https=(url_parts.scheme == 'https'),
+                        timeout=timeout, max_connections=max_connections,
+                        keep_alive=keep_alive)
+
+        self.headers = {'Content-Type': 'application/json'}
+        if user:
+            auth_str = '%s:%s' % (user, password or '')
+            self.headers['Authorization'] = 'Basic %s' % base64.b64encode(
+                                    auth_str.encode('utf-8')).decode('ascii')
+
+    def submit_job(self, job_d):
+
+        # Returns the job ID, raises if the job was not submitted
+        body = json.dumps({
+            'JobInfo': job_d['job_info'],
+            'PluginInfo': job_d['plugin_info'],
+            'AuxFiles': list(job_d['aux_files']),
+            'IdOnly': True,
+        })
+        (status, response_data) = self.pool.request(
+                    'POST', '%s/api/jobs' % self.base_path,
+                    body.encode('utf-8'), self.headers)
+
+        response_str = response_data.decode('utf-8', 'replace')
+        if status != 200:
+            raise Exception('Deadline Web Service job submission failed '
+                            '(HTTP %s): %s' % (status, response_str.strip()))
+
+        try:
+            return json.loads(response_str)['_id']
+        except (ValueError, KeyError, TypeError):
+            raise Exception('Unexpected Deadline Web Service response to job '
+                            'submission: %s' % response_str.strip())
+
+    def _submit_job_or_none(self, job_d):
+
+        try:
+            return self.submit_job(job_d)
+        except Exception as e:
+            print(':: Job submission of "%s" failed: %s' % (
+                        job_d['job_info'].get('Name'), e))
+            return None
+
+    def submit_jobs(self, job_d_list):
+
+        if len(job_d_list) < 2 or self.max_connections < 2:
+            return [self._submit_job_or_none(job_d) for job_d in job_d_list]
+
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            return list(executor.map(self._submit_job_or_none, job_d_list))
+
+    def close(self):
+
+        self.pool.close()
+
+
+def get_submitter_from_env(deadline_cmd=None):
+
+    submitter_name = os.getenv('ENVR_DEADLINE_SUBMITTER', 'command')
+
+    if submitter_name == 'command':
+        return DeadlineCommandSubmitter(deadline_cmd)
+    elif submitter_name == 'webservice':
+        url = os.getenv('ENVR_DEADLINE_WEBSERVICE_URL')
+        if not url:
+            raise Exception('ENVR_DEADLINE_WEBSERVICE_URL must be set to use '
+                            'the "webservice" Deadline submitter')
+        return DeadlineWebServiceSubmitter(
+                url, max_connections=int(os.getenv(
+                            'ENVR_DEADLINE_WEBSERVICE_CONNECTIONS',
+                            _DEFAULT_WEBSERVICE_CONNECTIONS)))
+    elif submitter_name == 'dry_run':
+        return DryRunSubmitter()
+
+    raise Exception('Unknown Deadline submitter "%s" (expected "command", '
+                    '"webservice" or "dry_run")' % submitter_name)
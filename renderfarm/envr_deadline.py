@@ -26,12 +26,20 @@ import os
 import json
 import time
 import shutil
+import uuid
 import getpass
 import datetime
-import subprocess
 
 from envrunner import envr
 from envrunner.os_util import conform_slash
+from envrunner.env_bundle import ENV_BUNDLE_FILENAME, write_env_bundle
+from envrunner.env_mechanism import create_from_launch_config
+from envrunner.events import (
+    DEADLINE_JOBS_SUBMITTED,
+    emit_event,
+    has_event_callbacks,
+)
+from envrunner.renderfarm.deadline_submitters import get_submitter_from_env
 
 
 _THIS_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -75,6 +83,11 @@ _UNNAMED_JOB_NAME = ('[ENVRUNNER Python Job (UNNAMED) by %s]' %
 #
 #                              ${YOUR_CENTRAL_NETWORK_PATH}/envrunner/
 #
+#   Optionally, ENVR_DEADLINE_SUBMITTER selects how jobs are submitted
+#   ("command" for deadlinecommand (default), "webservice" for the Deadline
+#   Web Service at ENVR_DEADLINE_WEBSERVICE_URL, or "dry_run"), see
+#   deadline_submitters.
+#
 # ----------------------------------------------------------------------------
 
 _ENVR_ALL_USERS_DATA_ROOT = os.getenv('ENVR_ALL_USERS_DATA_ROOT')
@@ -139,7 +152,8 @@ class ENVRJobDeadlineSubmit(object):
                  command_to_execute, command_args_list,
                  job_params_d=None, plugin_params_d=None,
                  job_extra_env_vars_d=None, stdout_handling_json_filepath=None,
-                 job_output_root=None, specific_submission_root=None):
+                 job_output_root=None, specific_submission_root=None,
+                 use_env_bundle=False):
 
         # NOTE: if runner_json_d is provided then runner_filepath is ignored
 
@@ -164,29 +178,48 @@ class ENVRJobDeadlineSubmit(object):
         self.stdout_handling_json_filepath = stdout_handling_json_filepath
         self.job_output_root = job_output_root
 
+        # resolve the env once at submit time and write it out as a resolved
+        # env bundle (see env_bundle) for the farm workers to load, instead
+        # of every task resolving the session spec again
+        self.use_env_bundle = use_env_bundle
+
         if specific_submission_root:
             self.submission_root = os.path.expandvars(specific_submission_root)
         else:
             self.submission_root = _ENVR_SUBMISSION_ROOT
 
-    def submit_to_deadline(self):
+    def _write_env_bundle(self, runner_filepath, submit_folder_path):
 
-        submit_dt_str = ('%s-%s' % (
-                datetime.datetime.now().strftime('%Y%m%d-%H%M%S'),
-                _get_milliseconds_str()))
+        # Resolved exactly the way a farm worker will resolve the runner file
+        # so the bundle fingerprint matches there (on the same platform), but
+        # without leaving a user session behind on the submitting host
+        (envr_env, launch_cfg_d) = create_from_launch_config(
+                                            self.project_code, runner_filepath,
+                                            pure=True)
 
-        # build submission folder path
-        submit_folder_path = '%s/%s/%s_submit_%s' % (
-                             self.submission_root, _USER, _USER, submit_dt_str)
+        bundle_filepath = '%s/%s' % (submit_folder_path, ENV_BUNDLE_FILENAME)
+        if not write_env_bundle(envr_env, bundle_filepath):
+            print(':: Resolved env is session specific, no env bundle written')
+            return
 
-        os.makedirs(submit_folder_path)
+        runner_d = dict(self.session_spec_d, env_bundle=ENV_BUNDLE_FILENAME)
+        with open(runner_filepath, 'w') as out_fp:
+            out_fp.write(json.dumps(runner_d, indent=4, sort_keys=True))
+
+    def _write_submission_files(self, submit_folder_path):
+
+        # Writes everything a job needs into its (existing) submission folder,
+        # returns the job dict to give to a submitter (see deadline_submitters)
 
         # Write out envrunner format runner .json file
         runner_filepath = '%s/envrunner_task_runner.json' % submit_folder_path
         with open(runner_filepath, 'w') as out_fp:
             out_fp.write(json.dumps(self.session_spec_d,
                                     indent=4, sort_keys=True))
-        
+
+        if self.use_env_bundle:
+            self._write_env_bundle(runner_filepath, submit_folder_path)
+
         # Add in any job env vars to job info
         job_params_d = self.job_params_d.copy()
 
@@ -242,39 +275,88 @@ class ENVRJobDeadlineSubmit(object):
         farm_worker_execution_script = conform_slash(
             '%s/../bin/deadline/envr_deadline_task_execute.py' % _THIS_DIR)
 
-        cmd_and_args = [
-            _DEADLINE_CMD, '-SubmitMultipleJobs', '-job',
-            job_params_filepath,
-            plugin_params_filepath,
-            farm_worker_execution_script,  # this gets uploaded to deadline
-        ]
-
-        TEST_ONLY = False
-
-        if TEST_ONLY:
-            print('')
-            print(':: submit folder path: %s' % submit_folder_path)
-            print('')
-            print(':: Test only ... would be executing: %s' % cmd_and_args)
-            print('')
-        else:
-            p = subprocess.Popen(cmd_and_args,
-                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        return {
+            'job_info': job_params_d,
+            'plugin_info': self.plugin_params_d.copy(),
+            'job_info_file': job_params_filepath,
+            'plugin_info_file': plugin_params_filepath,
+            'aux_files': [
+                farm_worker_execution_script,  # this gets uploaded to deadline
+            ],
+        }
+
+    def submit_to_deadline(self, submitter=None):
 
-            out, err = p.communicate()
+        # Returns the Deadline job ID, or None if submission failed
+        return submit_jobs_to_deadline([self], submitter=submitter)[0]
 
-            if out:
-                print('')
-                print(out.decode('utf-8'))
 
-            if err:
-                print('')
-                print(err.decode('utf-8'))
+def get_deadline_submitter():
+
+    # submitter backend chosen by ENVR_DEADLINE_SUBMITTER, see
+    # deadline_submitters
+    return get_submitter_from_env(deadline_cmd=_DEADLINE_CMD)
+
+
+def _build_submit_id():
+
+    # sortable by submit time, and unique across processes and hosts
+    # submitting in the same millisecond
+    return '%s-%s_%s' % (datetime.datetime.now().strftime('%Y%m%d-%H%M%S'),
+                         _get_milliseconds_str(), uuid.uuid4().hex[:8])
+
+
+def submit_jobs_to_deadline(job_submit_list, submitter=None):
+
+    # Submits a batch of ENVRJobDeadlineSubmit jobs through submitter (by
+    # default get_deadline_submitter()), the deadlinecommand submitter
+    # doing so with as few deadlinecommand calls as possible. Returns the
+    # Deadline job IDs in order of job_submit_list, None for any job that
+    # failed to submit.
+    #
+    submit_id = _build_submit_id()
+
+    if len(job_submit_list) == 1:
+        submit_folder_path_list = ['%s/%s/%s_submit_%s' % (
+                            job_submit_list[0].submission_root, _USER, _USER,
+                            submit_id)]
+    else:
+        submit_folder_path_list = [
+            '%s/%s/%s_batch_%s/job_%s' % (job_submit.submission_root, _USER,
+                                          _USER, submit_id,
+                                          str(job_idx).zfill(4))
+                for (job_idx, job_submit) in enumerate(job_submit_list)]
+
+    job_d_list = []
+    for (job_submit, submit_folder_path) in zip(job_submit_list,
+                                                submit_folder_path_list):
+        os.makedirs(submit_folder_path)
+        job_d_list.append(
+                job_submit._write_submission_files(submit_folder_path))
+
+    start_t = time.perf_counter()
+    if submitter is None:
+        submitter = get_deadline_submitter()
+        try:
+            job_id_list = submitter.submit_jobs(job_d_list)
+        finally:
+            submitter.close()
+    else:
+        job_id_list = submitter.submit_jobs(job_d_list)
+
+    if has_event_callbacks(DEADLINE_JOBS_SUBMITTED):
+        emit_event(DEADLINE_JOBS_SUBMITTED, {
+            'submitter': type(submitter).__name__,
+            'job_count': len(job_id_list),
+            'failed_count': len([job_id for job_id in job_id_list
+                                    if job_id is None]),
+            'secs': time.perf_counter() - start_t,
+        })
 
-            print('')
-            print(':: Deadline submission executed. cmd_and_args: %s' %
-                        cmd_and_args)
-            print('')
-            print(':: submit folder path: %s' % submit_folder_path)
-            print('')
+    for (submit_folder_path, job_id) in zip(submit_folder_path_list,
+                                            job_id_list):
+        print(':: submit folder path: %s (job ID: %s)' % (submit_folder_path,
+                                                          job_id))
+    print('')
 
+    return job_id_list
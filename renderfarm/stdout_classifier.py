@@ -0,0 +1,323 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import re
+import json
+import threading
+
+from collections import namedtuple
+
+try:
+    import re._parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+# --- Job stdout classification ----------------------------------------------
+#
+#   Classifies lines of a farm job's stdout as "error", "warning" or
+#   "progress" lines, using the built-in patterns of the ENVRTaskRunner
+#   Deadline plugin plus the "WarningRegexList" and "ErrorRegexList" entries
+#   of a job's stdout handling JSON file.
+#
+#   Instead of running every pattern on every line:
+#
+#       - a literal prefilter ... each pattern's required literal text (e.g.
+#         "Exception: ", or one of "WARNING" / "Warning") is pulled out of
+#         its parsed form, and one search for any of those literals rules
+#         out most lines in a single pass. Only when a pattern has no
+#         required literal is the prefilter turned off
+#
+#       - one combined regex per category for lines that get through the
+#         prefilter
+#
+#   The prefilter is also available as a single regex a Deadline stdout
+#   handler can use (candidate_line_pattern), so only candidate lines get
+#   handed to Python at all.
+#
+#   Compiled classifiers are cached per stdout handling JSON file, checked
+#   against the file's mtime and size (see load_stdout_classifier()).
+#
+# ----------------------------------------------------------------------------
+
+ERROR = 'error'
+WARNING = 'warning'
+PROGRESS = 'progress'
+
+DEFAULT_WARNING_PATTERNS = [
+    # same lines as "^((.*)(WARNING|Warning)(.*))$", without backtracking
+    # through the whole line
+    r'WARNING|Warning',
+]
+
+DEFAULT_ERROR_PATTERNS = [
+    r'Exception: (.*)',
+    r'SyntaxError: (.*)',
+]
+
+PROGRESS_A_OF_B_PATTERN = r'Progress: .* \(([0-9]+) of ([0-9]+)\)'
+PROGRESS_PERCENT_PATTERN = r'Progress: .* \(([0-9]{1,3}(?:\.[0-9]+)?)%\)'
+
+# text is what the pattern matched (for warnings, the whole line), progress
+# is a percentage for progress lines and otherwise None
+StdoutMatch = namedtuple('StdoutMatch', ['category', 'text', 'progress'])
+
+_NO_MATCHES = ()
+
+
+def _get_required_literals(parsed_items):
+
+    # Returns a set of literal strings, one of which must be in any text
+    # the parsed (sub-)pattern matches, or None if there is no such set.
+    # Of all candidate sets, the one with the longest shortest literal
+    # is picked, as the most selective.
+    best_literal_set = None
+    candidate_list = []
+    literal_run = []
+
+    for (op, av) in parsed_items:
+        if op is sre_parse.LITERAL:
+            literal_run.append(chr(av))
+            continue
+
+        if literal_run:
+            candidate_list.append(set([''.join(literal_run)]))
+            literal_run = []
+
+        if op is sre_parse.SUBPATTERN:
+            # a scoped "(?i:...)" group matches its literals in any case, so
+            # they can't be required as-is (av is (group, add_flags,
+            # del_flags, pattern))
+            if len(av) == 4 and av[1] & re.IGNORECASE:
+                continue
+            candidate_list.append(_get_required_literals(av[-1]))
+        elif op is sre_parse.BRANCH:
+            branch_set_list = [_get_required_literals(branch)
+                                for branch in av[1]]
+            if None not in branch_set_list:
+                candidate_list.append(set().union(*branch_set_list))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            candidate_list.append(_get_required_literals(av[2]))
+
+    if literal_run:
+        candidate_list.append(set([''.join(literal_run)]))
+
+    for literal_set in candidate_list:
+        if not literal_set or '' in literal_set:
+            continue
+        if best_literal_set is None or (min([len(s) for s in literal_set]) >
+                                min([len(s) for s in best_literal_set])):
+            best_literal_set = literal_set
+
+    return best_literal_set
+
+
+def get_pattern_literals(pattern):
+
+    # required literal set of pattern (see _get_required_literals), None if
+    # it can not be prefiltered
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    return _get_required_literals(list(parsed))
+
+
+_GROUP_REF_REGEX = re.compile(r'\\[1-9]|\(\?P=|\(\?\([0-9]')
+_GLOBAL_FLAGS_REGEX = re.compile(r'^\(\?[aiLmsux]+\)')
+
+
+def _is_combinable(pattern):
+
+    # patterns with back references (e.g. "\1") can't be combined with
+    # others, as group numbers shift, and global flags (e.g. "(?i)") are
+    # only allowed at the start of a whole regex
+    return _GROUP_REF_REGEX.search(pattern) is None and \
+                _GLOBAL_FLAGS_REGEX.match(pattern) is None
+
+
+class _CategoryMatcher(object):
+
+    def __init__(self, pattern_list):
+
+        combinable_list = [p for p in pattern_list if _is_combinable(p)]
+        self.regex_list = []
+        if combinable_list:
+            self.regex_list.append(re.compile(
+                        '|'.join(['(?:%s)' % p for p in combinable_list])))
+        self.regex_list += [re.compile(p) for p in pattern_list
+                                            if p not in combinable_list]
+
+    def search(self, line):
+
+        for regex in self.regex_list:
+            regex_match = regex.search(line)
+            if regex_match is not None:
+                return regex_match
+        return None
+
+
+class StdoutClassifier(object):
+
+    def __init__(self, warning_regex_list=None, error_regex_list=None,
+                 use_default_patterns=True):
+
+        self.warning_patterns = list(warning_regex_list or [])
+        self.error_patterns = list(error_regex_list or [])
+        if use_default_patterns:
+            self.warning_patterns = (DEFAULT_WARNING_PATTERNS +
+                                     self.warning_patterns)
+            self.error_patterns = DEFAULT_ERROR_PATTERNS + self.error_patterns
+        self.progress_patterns = [PROGRESS_A_OF_B_PATTERN,
+                                  PROGRESS_PERCENT_PATTERN]
+
+        all_pattern_list = (self.error_patterns + self.warning_patterns +
+                            self.progress_patterns)
+        for pattern in all_pattern_list:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise Exception('Invalid stdout handling regex "%s": %s' %
+                                (pattern, e))
+
+        self._error_matcher = _CategoryMatcher(self.error_patterns)
+        self._warning_matcher = _CategoryMatcher(self.warning_patterns)
+        self._a_of_b_regex = re.compile(PROGRESS_A_OF_B_PATTERN)
+        self._percent_regex = re.compile(PROGRESS_PERCENT_PATTERN)
+
+        # None when any pattern has no required literal text
+        self.literals = set()
+        for pattern in all_pattern_list:
+            literal_set = get_pattern_literals(pattern)
+            if literal_set is None:
+                self.literals = None
+                break
+            self.literals.update(literal_set)
+
+        self._prefilter_regex = None
+        if self.literals is not None:
+            self._prefilter_regex = re.compile(self._get_literals_pattern())
+
+    def _get_literals_pattern(self):
+
+        # longest first, so a literal is never shadowed by its own prefix
+        return '|'.join([re.escape(literal) for literal in
+                            sorted(self.literals, key=lambda s: (-len(s), s))])
+
+    @property
+    def candidate_line_pattern(self):
+
+        # A regex matching (the whole of) every line classify() might find
+        # anything in, for use as a single Deadline stdout handler
+        if self.literals is None:
+            return '^.+$'
+        return '^(?=.*?(?:%s)).*$' % self._get_literals_pattern()
+
+    def is_candidate(self, line):
+
+        return self._prefilter_regex is None or \
+                    self._prefilter_regex.search(line) is not None
+
+    def classify(self, line):
+
+        # Returns a tuple of StdoutMatch, in order error, warning, progress,
+        # one for each category line matches ... an empty tuple for most
+        # lines
+        if self._prefilter_regex is not None and \
+                self._prefilter_regex.search(line) is None:
+            return _NO_MATCHES
+
+        match_list = []
+
+        regex_match = self._error_matcher.search(line)
+        if regex_match is not None:
+            match_list.append(StdoutMatch(ERROR, regex_match.group(0), None))
+
+        if self._warning_matcher.search(line) is not None:
+            match_list.append(StdoutMatch(WARNING, line.rstrip('\r\n'), None))
+
+        regex_match = self._a_of_b_regex.search(line)
+        if regex_match is not None:
+            (a, b) = [int(s) for s in regex_match.groups()]
+            if b:
+                match_list.append(StdoutMatch(PROGRESS, regex_match.group(0),
+                                              (float(a) / float(b)) * 100.0))
+        else:
+            regex_match = self._percent_regex.search(line)
+            if regex_match is not None:
+                match_list.append(StdoutMatch(PROGRESS, regex_match.group(0),
+                                              float(regex_match.group(1))))
+
+        return tuple(match_list)
+
+
+def _get_file_stamp(filepath):
+
+    try:
+        st = os.stat(filepath)
+    except (IOError, OSError):
+        return None
+    return (st.st_mtime, st.st_size)
+
+
+_CLASSIFIER_ENTRY_BY_PATH = {}
+_CLASSIFIER_LOCK = threading.Lock()
+
+
+def load_stdout_classifier(stdout_handling_json_filepath=None):
+
+    # StdoutClassifier for a stdout handling JSON file (or only the default
+    # patterns, with no file), compiled once per process and file version
+    if not stdout_handling_json_filepath:
+        stdout_handling_json_filepath = None
+        stamp = None
+    else:
+        stdout_handling_json_filepath = os.path.abspath(
+                                            stdout_handling_json_filepath)
+        stamp = _get_file_stamp(stdout_handling_json_filepath)
+        if stamp is None:
+            raise Exception('Stdout handling JSON file not found: %s' %
+                            stdout_handling_json_filepath)
+
+    with _CLASSIFIER_LOCK:
+        entry = _CLASSIFIER_ENTRY_BY_PATH.get(stdout_handling_json_filepath)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+    stdout_handlers_d = {}
+    if stdout_handling_json_filepath:
+        with open(stdout_handling_json_filepath, 'r') as in_fp:
+            stdout_handlers_d = json.load(in_fp)
+
+    classifier = StdoutClassifier(
+                    warning_regex_list=stdout_handlers_d.get(
+                                                    'WarningRegexList'),
+                    error_regex_list=stdout_handlers_d.get('ErrorRegexList'))
+
+    with _CLASSIFIER_LOCK:
+        _CLASSIFIER_ENTRY_BY_PATH[stdout_handling_json_filepath] = (stamp,
+                                                                    classifier)
+
+    return classifier
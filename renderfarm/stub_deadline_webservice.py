@@ -0,0 +1,171 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import json
+import time
+import socket
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+
+# --- Stand-in Deadline Web Service ------------------------------------------
+#
+#   A local HTTP server answering job submissions (POST /api/jobs) the way
+#   the Deadline Web Service does, to test and benchmark
+#   DeadlineWebServiceSubmitter without a Deadline repository. Submitted
+#   jobs are only recorded, and every new connection is counted so
+#   keep-alive re-use can be checked.
+#
+#   response_delay ... seconds to wait before answering each submission,
+#                      to stand in for the latency of a real repository
+#
+# ----------------------------------------------------------------------------
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def setup(self):
+
+        BaseHTTPRequestHandler.setup(self)
+        # headers and body are written separately, without this a
+        # keep-alive client waits on the delayed ACK of each response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.stub.count('connections')
+
+    def log_message(self, format, *args):
+
+        pass
+
+    def _send_json(self, status, data):
+
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+
+        stub = self.server.stub
+        stub.count('requests')
+
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        if self.path.split('?')[0].rstrip('/') != '/api/jobs':
+            self._send_json(404, {'error': 'Not found: %s' % self.path})
+            return
+
+        try:
+            submit_d = json.loads(body.decode('utf-8'))
+            job_info_d = submit_d['JobInfo']
+            plugin_info_d = submit_d['PluginInfo']
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': 'Expected JobInfo and PluginInfo'})
+            return
+
+        if not job_info_d.get('Plugin'):
+            self._send_json(400, {'error': 'No Plugin specified in JobInfo'})
+            return
+
+        if stub.response_delay:
+            time.sleep(stub.response_delay)
+
+        job_id = stub.add_job(job_info_d, plugin_info_d,
+                              submit_d.get('AuxFiles', []))
+        if submit_d.get('IdOnly'):
+            self._send_json(200, {'_id': job_id})
+        else:
+            self._send_json(200, {'_id': job_id, 'Props': job_info_d})
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+
+class StubDeadlineWebService(object):
+
+    def __init__(self, host='127.0.0.1', port=0, response_delay=0.0):
+
+        self.response_delay = response_delay
+
+        self.jobs = []
+        self.stats = {'connections': 0, 'requests': 0}
+        self._lock = threading.Lock()
+
+        self._server = _ThreadingHTTPServer((host, port), _StubRequestHandler)
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+
+        (host, port) = self._server.server_address[:2]
+        return 'http://%s:%s' % (host, port)
+
+    def count(self, stat_name):
+
+        with self._lock:
+            self.stats[stat_name] += 1
+
+    def add_job(self, job_info_d, plugin_info_d, aux_file_list):
+
+        with self._lock:
+            # Deadline job IDs are 24 hex digits
+            job_id = '%024x' % (len(self.jobs) + 1)
+            self.jobs.append({'_id': job_id, 'JobInfo': job_info_d,
+                              'PluginInfo': plugin_info_d,
+                              'AuxFiles': aux_file_list})
+        return job_id
+
+    def start(self):
+
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+
+        self.stop()
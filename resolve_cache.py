@@ -0,0 +1,301 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import re
+import sys
+import json
+import stat
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+from .os_util import os_info, get_local_cache_root, conform_env_key
+from .config_cache import copy_json_data
+from .install_probe import get_install_probe
+
+
+if sys.version_info.major >= 3:
+    unicode = str
+
+
+# --- Resolved environment cache ---------------------------------------------
+#
+#   Caches the result of resolving an EnvRunnerEnv, keyed by a canonical
+#   hash of everything that goes into resolution:
+#
+#       project code, active sw list, site/project/sw definition config
+#       payloads, extra env spec list, os_info and path slash
+#
+#   Each cache entry also records what resolution read from outside of
+#   those inputs, and an entry is only used when all of these still match:
+#
+#       env_deps ... values of base environment variables referenced via
+#                    ${...} (or $VAR) in any spec, plus the base values of
+#                    path type env vars that get pre/post-pended to
+#
+#       fs_deps ... state of sw env spec files and INCLUDES files that
+#                   were looked at
+#
+#       probe_deps ... existence of install location candidates, checked
+#                      through the install probe (see install_probe)
+#
+#   The in-memory LRU tier is always available. The on-disk tier is
+#   optional, enable it with ENVR_RESOLVE_DISK_CACHE=1.
+#
+# ----------------------------------------------------------------------------
+
+RESOLVE_CACHE_FORMAT_VERSION = 3
+
+_DEFAULT_MAX_ENTRIES = 32
+
+ENV_VAR_REF_REGEX = re.compile(
+                        r'\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?|%([A-Za-z0-9_]+)%')
+
+
+def collect_env_var_refs(data, ref_set=None):
+
+    if ref_set is None:
+        ref_set = set()
+
+    data_type = type(data)
+    if data_type is dict:
+        for (k, v) in data.items():
+            collect_env_var_refs(k, ref_set)
+            collect_env_var_refs(v, ref_set)
+    elif data_type is list:
+        for v in data:
+            collect_env_var_refs(v, ref_set)
+    elif data_type in (str, unicode) and ('$' in data or '%' in data):
+        for (name, win_name) in ENV_VAR_REF_REGEX.findall(data):
+            ref_set.add(name or win_name)
+
+    return ref_set
+
+
+def get_fs_dep_state(path):
+
+    # "file" deps are compared on mtime and size, directories only on their
+    # existence (a dir's mtime changes every time anything is added to it)
+    try:
+        st = os.stat(path)
+    except (IOError, OSError):
+        return None
+
+    if stat.S_ISDIR(st.st_mode):
+        return 'dir'
+    return [st.st_mtime, st.st_size]
+
+
+def build_resolve_key(prj_code, active_sw_list, sw_defs_d, site_env_spec_list,
+                      prj_sw_versions_d, prj_env_spec_list,
+                      extra_env_spec_list, path_slash):
+
+    key_data = [
+        RESOLVE_CACHE_FORMAT_VERSION,
+        prj_code,
+        active_sw_list,
+        sw_defs_d,
+        site_env_spec_list,
+        prj_sw_versions_d,
+        prj_env_spec_list,
+        extra_env_spec_list or [],
+        os_info.__dict__,
+        path_slash,
+        os.pathsep,
+    ]
+    key_str = json.dumps(key_data, sort_keys=True)
+
+    return hashlib.sha1(key_str.encode('utf-8')).hexdigest()
+
+
+class ResolveCache(object):
+
+    def __init__(self, max_entries=_DEFAULT_MAX_ENTRIES, disk_cache_dir=None):
+
+        self.max_entries = max_entries
+        self.disk_cache_dir = disk_cache_dir
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+        }
+
+    def lookup(self, resolve_key, env_d=None):
+
+        # Returns a copy of the cached entry for resolve_key, or None if
+        # there is no valid entry. env_d defaults to the current os.environ
+        if env_d is None:
+            env_d = os.environ
+
+        with self._lock:
+            entry = self._entries.pop(resolve_key, None)
+            if entry is not None:
+                self._entries[resolve_key] = entry  # most recently used
+
+        from_disk = False
+        if entry is None:
+            entry = self._read_disk_cache(resolve_key)
+            from_disk = entry is not None
+
+        if entry is None:
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+
+        if not self._is_entry_valid(entry, env_d):
+            with self._lock:
+                self.stats['invalidations'] += 1
+                self.stats['misses'] += 1
+                self._entries.pop(resolve_key, None)
+            return None
+
+        with self._lock:
+            if from_disk:
+                self.stats['disk_hits'] += 1
+                self._store_in_memory(resolve_key, entry)
+            else:
+                self.stats['memory_hits'] += 1
+
+        return copy_json_data(entry)
+
+    def store(self, resolve_key, entry, persist=True):
+
+        # with persist False the entry is only kept in memory
+        entry = copy_json_data(entry)
+
+        with self._lock:
+            self._store_in_memory(resolve_key, entry)
+
+        if persist:
+            self._write_disk_cache(resolve_key, entry)
+
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+
+        with self._lock:
+            stats_d = self.stats.copy()
+        stats_d['entries'] = len(self._entries)
+        return stats_d
+
+    def _store_in_memory(self, resolve_key, entry):
+
+        self._entries.pop(resolve_key, None)
+        self._entries[resolve_key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _is_entry_valid(self, entry, env_d):
+
+        # values were stored by EnvRunnerEnv.get_base_env_value(), so are
+        # looked up the same way (env_d may be a plain dict)
+        for (env_var, value) in entry['env_deps'].items():
+            if env_d.get(conform_env_key(env_var)) != value:
+                return False
+
+        for (path, state) in entry['fs_deps'].items():
+            if get_fs_dep_state(path) != state:
+                return False
+
+        probe_deps = entry.get('probe_deps')
+        if probe_deps:
+            path_list = list(probe_deps.keys())
+            isdir_list = get_install_probe().probe_dirs(path_list)
+            for (path, isdir) in zip(path_list, isdir_list):
+                if probe_deps[path] != isdir:
+                    return False
+
+        return True
+
+    def _get_disk_cache_filepath(self, resolve_key):
+
+        return '%s/%s.json' % (self.disk_cache_dir, resolve_key)
+
+    def _read_disk_cache(self, resolve_key):
+
+        if not self.disk_cache_dir:
+            return None
+
+        try:
+            with open(self._get_disk_cache_filepath(resolve_key),
+                      'r') as in_fp:
+                entry = json.load(in_fp)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if entry.get('__version__') != RESOLVE_CACHE_FORMAT_VERSION:
+            return None
+
+        return entry
+
+    def _write_disk_cache(self, resolve_key, entry):
+
+        if not self.disk_cache_dir:
+            return
+
+        cache_filepath = self._get_disk_cache_filepath(resolve_key)
+        tmp_filepath = '%s.%s.tmp' % (cache_filepath, os.getpid())
+
+        entry = dict(entry, __version__=RESOLVE_CACHE_FORMAT_VERSION)
+
+        # failure to write the local cache must never break a launch
+        try:
+            if not os.path.isdir(self.disk_cache_dir):
+                os.makedirs(self.disk_cache_dir)
+            with open(tmp_filepath, 'w') as out_fp:
+                json.dump(entry, out_fp)
+            os.replace(tmp_filepath, cache_filepath)
+        except (IOError, OSError):
+            pass
+
+
+_RESOLVE_CACHE = None
+
+
+def get_resolve_cache():
+
+    global _RESOLVE_CACHE
+
+    if _RESOLVE_CACHE is None:
+        disk_cache_dir = None
+        if os.getenv('ENVR_RESOLVE_DISK_CACHE', '0') == '1':
+            disk_cache_dir = get_local_cache_root('resolve_cache')
+        _RESOLVE_CACHE = ResolveCache(disk_cache_dir=disk_cache_dir)
+
+    return _RESOLVE_CACHE
+
+
+def get_resolve_cache_stats():
+
+    return get_resolve_cache().get_stats()
@@ -23,19 +23,35 @@
 # -----------------------------------------------------------------------------
 
 import json
+import subprocess
 
 from . import env_mechanism
 
 
-def run_launch_config(prj_code, launch_cfg_filepath, detach_subprocess=False):
+def run_launch_config(prj_code, launch_cfg_filepath, detach_subprocess=False,
+                      timings=None):
 
+    # timings, if given, is a launch_timings.LaunchTimings that gets the
+    # time of each launch phase, up to and including the process spawn
     envr_env, launch_cfg_d = env_mechanism.create_from_launch_config(
-                                                prj_code, launch_cfg_filepath)
+                                                prj_code, launch_cfg_filepath,
+                                                timings=timings)
+    if timings is not None:
+        timings.add_info(prj_code=prj_code,
+                         launch_cfg_filepath=launch_cfg_filepath,
+                         user_current_session_root=
+                                        envr_env.user_current_session_root,
+                         session_ts_str=
+                                envr_env.user_session_info['session_ts_str'])
     p_info = None
 
     if 'os_system_call' in launch_cfg_d:
-        envr_env.launch_by_os_system_call(
+        # a failure is raised the same way as from subprocess_check_call()
+        returncode = envr_env.launch_by_os_system_call(
                             launch_cfg_d['os_system_call'])
+        if returncode:
+            raise subprocess.CalledProcessError(
+                            returncode, launch_cfg_d['os_system_call'])
     elif detach_subprocess:
         p_info = envr_env.launch_subprocess(
                             launch_cfg_d.get('command'),
@@ -0,0 +1,171 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import threading
+
+from types import MappingProxyType
+
+from .os_util import fslash
+
+
+# --- Env spec INCLUDES resolution -------------------------------------------
+#
+#   A sw env spec list can contain entries like:
+#
+#       {"INCLUDES": ["./inc_common.json", "/shared/ocio_env.json"]}
+#
+#   which are replaced by the spec lists in those files. Included files
+#   can themselves have INCLUDES entries, relative paths ("./", "../") are
+#   relative to the folder of the file that has the INCLUDES entry. An
+#   include cycle raises an exception naming the chain of files.
+#
+#   Each parsed spec file is cached for the life of the process, keyed by
+#   its path and checked against its mtime and size. Cached data is kept
+#   frozen (read-only mappings and tuples) and every resolve returns a
+#   fresh, mutable copy, so callers rewriting specs in place (e.g. "${@"
+#   expansion) can never corrupt what other packages get.
+#
+# ----------------------------------------------------------------------------
+
+def freeze_json_data(data):
+
+    data_type = type(data)
+    if data_type is dict:
+        return MappingProxyType({k: freeze_json_data(v)
+                                    for (k, v) in data.items()})
+    elif data_type is list:
+        return tuple([freeze_json_data(v) for v in data])
+    return data
+
+
+def thaw_json_data(data):
+
+    data_type = type(data)
+    if data_type is MappingProxyType:
+        return {k: thaw_json_data(v) for (k, v) in data.items()}
+    elif data_type is tuple:
+        return [thaw_json_data(v) for v in data]
+    return data
+
+
+def _norm_path(path):
+
+    return fslash(os.path.normpath(os.path.abspath(path)))
+
+
+class SpecIncludeResolver(object):
+
+    def __init__(self):
+
+        self._entry_by_path = {}
+        self._lock = threading.Lock()
+
+        self.stats = {'hits': 0, 'loads': 0}
+
+    def load_spec_file(self, filepath, stamp):
+
+        # Returns the frozen spec list of filepath. stamp is the current
+        # state of the file (see resolve_cache.get_fs_dep_state) that the
+        # cached data is checked against
+        filepath = _norm_path(filepath)
+
+        with self._lock:
+            entry = self._entry_by_path.get(filepath)
+            if entry is not None and entry[0] == stamp:
+                self.stats['hits'] += 1
+                return entry[1]
+
+        with open(filepath, 'r') as in_fp:
+            frozen_spec_list = freeze_json_data(json.load(in_fp))
+
+        with self._lock:
+            self._entry_by_path[filepath] = (stamp, frozen_spec_list)
+            self.stats['loads'] += 1
+
+        return frozen_spec_list
+
+    def resolve(self, env_spec_filepath, env_spec_list, stat_fn):
+
+        # Returns a new (mutable) spec list with all INCLUDES entries of
+        # env_spec_list (loaded from env_spec_filepath), recursively,
+        # replaced by the specs they include. stat_fn(path) must return the
+        # state of path, as given by resolve_cache.get_fs_dep_state()
+        env_spec_filepath = _norm_path(env_spec_filepath)
+
+        new_env_spec_list = []
+        self._resolve(os.path.dirname(env_spec_filepath), env_spec_list,
+                      stat_fn, [env_spec_filepath], new_env_spec_list)
+        return new_env_spec_list
+
+    def _resolve(self, env_spec_dirpath, env_spec_list, stat_fn,
+                 include_chain, new_env_spec_list):
+
+        for spec_entry in env_spec_list:
+            if not hasattr(spec_entry, 'get') or 'INCLUDES' not in spec_entry:
+                new_env_spec_list.append(thaw_json_data(spec_entry))
+                continue
+
+            for include_path in spec_entry['INCLUDES']:
+                if include_path[0] == '.':  # relative path "./" or "../"
+                    include_path = '%s/%s' % (env_spec_dirpath, include_path)
+                include_path = _norm_path(include_path)
+
+                if include_path in include_chain:
+                    raise Exception(
+                        'Cycle found in env spec INCLUDES: %s' % ' -> '.join(
+                            include_chain[include_chain.index(include_path):]
+                                + [include_path]))
+
+                stamp = stat_fn(include_path)
+                if type(stamp) is not list:
+                    raise Exception('Env spec INCLUDES file "%s" (included '
+                                    'from "%s") does not exist' % (
+                                        include_path, include_chain[-1]))
+
+                self._resolve(os.path.dirname(include_path),
+                              self.load_spec_file(include_path, stamp),
+                              stat_fn, include_chain + [include_path],
+                              new_env_spec_list)
+
+    def clear(self):
+
+        with self._lock:
+            self._entry_by_path.clear()
+
+    def get_stats(self):
+
+        with self._lock:
+            stats_d = self.stats.copy()
+            stats_d['entries'] = len(self._entry_by_path)
+        return stats_d
+
+
+_SPEC_INCLUDE_RESOLVER = SpecIncludeResolver()
+
+
+def get_spec_include_resolver():
+
+    return _SPEC_INCLUDE_RESOLVER
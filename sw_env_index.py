@@ -0,0 +1,300 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from .os_util import fslash, get_local_cache_root
+
+
+# --- Index of ENVR_CFG_SW_ENVS_ROOT -----------------------------------------
+#
+#   Answers "which env spec files exist for sw X" from memory, instead of
+#   an os.path.isfile() on the (network) sw_envs root for every candidate
+#   file name of every active sw package.
+#
+#   The index is built with a single os.scandir() walk of the root and its
+#   per-sw sub-folders, and holds the mtime of every folder it listed.
+#   Adding, removing or renaming a file changes the mtime of the folder it
+#   is in, so a folder is only re-listed when its mtime no longer matches.
+#   Folder mtimes are re-checked at most every ENVR_SW_ENVS_INDEX_CHECK_SECS
+#   seconds (default 30) per process.
+#
+#   The index is persisted in the host-local cache. When configs are
+#   published, bin/build_sw_envs_index.py can rebuild it, optionally also
+#   writing it into the sw_envs root itself as "envr_sw_envs_index.json"
+#   so every host can start from it without a walk of its own.
+#
+# ----------------------------------------------------------------------------
+
+SW_ENV_INDEX_FORMAT_VERSION = 1
+
+PUBLISHED_INDEX_FILENAME = 'envr_sw_envs_index.json'
+
+_DEFAULT_CHECK_SECS = 30.0
+
+
+def _get_dir_mtime(dirpath):
+
+    try:
+        return os.stat(dirpath).st_mtime
+    except (IOError, OSError):
+        return None
+
+
+def _list_dir(dirpath):
+
+    # returns (sub-folder name list, file name list) of dirpath
+    subdir_list = []
+    file_list = []
+    try:
+        for dir_entry in os.scandir(dirpath):
+            if dir_entry.is_dir():
+                subdir_list.append(dir_entry.name)
+            else:
+                file_list.append(dir_entry.name)
+    except (IOError, OSError):
+        pass
+
+    return (sorted(subdir_list), sorted(file_list))
+
+
+class SwEnvIndex(object):
+
+    def __init__(self, sw_envs_root, index_filepath=None,
+                 check_secs=_DEFAULT_CHECK_SECS):
+
+        self.sw_envs_root = fslash(sw_envs_root)
+        self.index_filepath = index_filepath
+        self.check_secs = check_secs
+
+        self.root_mtime = None
+        self.sw_name_list = []
+        self.sw_dir_info_by_sw = {}  # {"mtime": ..., "files": [...]}
+
+        self._checked_time_by_dir = {}
+        self._lock = threading.Lock()
+
+        self.stats = {'dirs_listed': 0, 'dirs_checked': 0}
+
+    def build(self):
+
+        # full walk of the sw_envs root
+        with self._lock:
+            self.root_mtime = _get_dir_mtime(self.sw_envs_root)
+            self.sw_name_list = _list_dir(self.sw_envs_root)[0]
+            self.sw_dir_info_by_sw = {}
+            for sw_name in self.sw_name_list:
+                self._list_sw_dir(sw_name)
+
+            now = time.time()
+            self._checked_time_by_dir = {
+                dirpath: now for dirpath in ([self.sw_envs_root] +
+                            [self._get_sw_dirpath(sw_name)
+                                for sw_name in self.sw_name_list])}
+            self.stats['dirs_listed'] += 1
+
+    def _get_sw_dirpath(self, sw_name):
+
+        return '%s/%s' % (self.sw_envs_root, sw_name)
+
+    def _list_sw_dir(self, sw_name):
+
+        sw_dirpath = self._get_sw_dirpath(sw_name)
+        mtime = _get_dir_mtime(sw_dirpath)
+        self.sw_dir_info_by_sw[sw_name] = {
+            'mtime': mtime,
+            'files': _list_dir(sw_dirpath)[1] if mtime is not None else [],
+        }
+        self.stats['dirs_listed'] += 1
+
+    def _is_check_due(self, dirpath, now):
+
+        checked_time = self._checked_time_by_dir.get(dirpath)
+        if checked_time is not None and now - checked_time < self.check_secs:
+            return False
+        self._checked_time_by_dir[dirpath] = now
+        self.stats['dirs_checked'] += 1
+        return True
+
+    def _refresh(self, sw_name):
+
+        # re-list the root and the folder of sw_name if they changed, returns
+        # True if anything was re-listed
+        now = time.time()
+        changed = False
+
+        if self._is_check_due(self.sw_envs_root, now):
+            root_mtime = _get_dir_mtime(self.sw_envs_root)
+            if root_mtime != self.root_mtime:
+                self.root_mtime = root_mtime
+                self.sw_name_list = _list_dir(self.sw_envs_root)[0]
+                for gone_sw_name in (set(self.sw_dir_info_by_sw.keys()) -
+                                     set(self.sw_name_list)):
+                    del self.sw_dir_info_by_sw[gone_sw_name]
+                self.stats['dirs_listed'] += 1
+                changed = True
+
+        if sw_name not in self.sw_name_list:
+            return changed
+
+        sw_dir_info = self.sw_dir_info_by_sw.get(sw_name)
+        if sw_dir_info is None:
+            self._list_sw_dir(sw_name)
+            return True
+
+        if self._is_check_due(self._get_sw_dirpath(sw_name), now):
+            if _get_dir_mtime(self._get_sw_dirpath(sw_name)) != \
+                                                    sw_dir_info['mtime']:
+                self._list_sw_dir(sw_name)
+                changed = True
+
+        return changed
+
+    def find_env_spec_file(self, sw_name, try_spec_filename_list):
+
+        # Returns the path of the first file name in try_spec_filename_list
+        # that exists in the sw_name folder of the sw_envs root, or None
+        with self._lock:
+            if self._refresh(sw_name):
+                self._save()
+
+            sw_dir_info = self.sw_dir_info_by_sw.get(sw_name)
+            if sw_dir_info is None:
+                return None
+
+            file_set = set(sw_dir_info['files'])
+            for try_spec_filename in try_spec_filename_list:
+                if try_spec_filename and try_spec_filename in file_set:
+                    return '%s/%s' % (self._get_sw_dirpath(sw_name),
+                                      try_spec_filename)
+
+        return None
+
+    def to_dict(self):
+
+        return {
+            '__version__': SW_ENV_INDEX_FORMAT_VERSION,
+            'sw_envs_root': self.sw_envs_root,
+            'root_mtime': self.root_mtime,
+            'sw_name_list': self.sw_name_list,
+            'sw_dir_info_by_sw': self.sw_dir_info_by_sw,
+        }
+
+    def load(self, index_filepath=None):
+
+        # Loads a persisted index, returns False if there isn't a usable one.
+        # What is loaded gets checked against folder mtimes on first use.
+        try:
+            with open(index_filepath or self.index_filepath, 'r') as in_fp:
+                index_d = json.load(in_fp)
+        except (IOError, OSError, ValueError, TypeError):
+            return False
+
+        if index_d.get('__version__') != SW_ENV_INDEX_FORMAT_VERSION or \
+                index_d.get('sw_envs_root') != self.sw_envs_root:
+            return False
+
+        with self._lock:
+            self.root_mtime = index_d['root_mtime']
+            self.sw_name_list = index_d['sw_name_list']
+            self.sw_dir_info_by_sw = index_d['sw_dir_info_by_sw']
+            self._checked_time_by_dir = {}
+
+        return True
+
+    def save(self, index_filepath=None):
+
+        with self._lock:
+            self._save(index_filepath)
+
+    def _save(self, index_filepath=None):
+
+        index_filepath = index_filepath or self.index_filepath
+        if not index_filepath:
+            return
+
+        tmp_filepath = '%s.%s.tmp' % (index_filepath, os.getpid())
+
+        # failure to write the index must never break a launch
+        try:
+            index_dir = os.path.dirname(index_filepath)
+            if index_dir and not os.path.isdir(index_dir):
+                os.makedirs(index_dir)
+            with open(tmp_filepath, 'w') as out_fp:
+                json.dump(self.to_dict(), out_fp, indent=4, sort_keys=True)
+            os.replace(tmp_filepath, index_filepath)
+        except (IOError, OSError):
+            pass
+
+
+def get_local_index_filepath(sw_envs_root):
+
+    root_hash = hashlib.sha1(fslash(sw_envs_root).encode('utf-8')).hexdigest()
+    return '%s/%s.json' % (get_local_cache_root('sw_envs_index'), root_hash)
+
+
+def build_sw_env_index(sw_envs_root, publish=False):
+
+    # Full rebuild, saved to the host-local cache and, with publish, into
+    # the sw_envs root as well
+    sw_env_index = SwEnvIndex(sw_envs_root,
+                              get_local_index_filepath(sw_envs_root))
+    sw_env_index.build()
+    sw_env_index.save()
+    if publish:
+        sw_env_index.save('%s/%s' % (sw_env_index.sw_envs_root,
+                                     PUBLISHED_INDEX_FILENAME))
+
+    _SW_ENV_INDEX_BY_ROOT[sw_env_index.sw_envs_root] = sw_env_index
+    return sw_env_index
+
+
+_SW_ENV_INDEX_BY_ROOT = {}
+
+
+def get_sw_env_index(sw_envs_root):
+
+    sw_envs_root = fslash(sw_envs_root)
+    sw_env_index = _SW_ENV_INDEX_BY_ROOT.get(sw_envs_root)
+
+    if sw_env_index is None:
+        sw_env_index = SwEnvIndex(
+                sw_envs_root, get_local_index_filepath(sw_envs_root),
+                check_secs=float(os.getenv('ENVR_SW_ENVS_INDEX_CHECK_SECS',
+                                           _DEFAULT_CHECK_SECS)))
+        # host-local copy first, then a published one, then a fresh walk
+        if not sw_env_index.load():
+            if sw_env_index.load('%s/%s' % (sw_envs_root,
+                                             PUBLISHED_INDEX_FILENAME)):
+                sw_env_index.save()
+            else:
+                sw_env_index.build()
+                sw_env_index.save()
+        _SW_ENV_INDEX_BY_ROOT[sw_envs_root] = sw_env_index
+
+    return sw_env_index
@@ -0,0 +1,168 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import re
+import threading
+
+from functools import total_ordering
+
+
+# --- sw version formats and parsed versions ---------------------------------
+#
+#   A sw definition's "version_format" (e.g. "{MAJOR}.{MINOR}.{BUILD}") is
+#   compiled into a regex once per process and shared by every snapshot
+#   (VersionFormat.get()), and each version string is matched against it
+#   once (VersionFormat.parse()), giving a SwVersion that compares part by
+#   part ... numeric parts numerically, so "2.10" > "2.9".
+#
+# ----------------------------------------------------------------------------
+
+_MAX_CACHED_VERSIONS = 10000
+
+_VER_PART_REPLACE_D = {
+    '.': '\\.',
+    '{MAJOR}': '(?P<MAJOR>[a-zA-Z0-9\\-_]+)',
+    '{MINOR}': '(?P<MINOR>[a-zA-Z0-9\\-_]+)',
+    '{BUILD}': '(?P<BUILD>[a-zA-Z0-9\\-_]+)',
+    '{REVISION}': '(?P<REVISION>[a-zA-Z0-9\\-_]+)',
+}
+
+
+def _get_part_sort_key(part_value):
+
+    # numbers sort before non-numbers, and numerically among themselves
+    if part_value is None:
+        return (0, 0, '')
+    if part_value.isdigit():
+        return (1, int(part_value), '')
+    return (2, 0, part_value)
+
+
+@total_ordering
+class SwVersion(object):
+
+    __slots__ = ('version_str', 'parts', 'part_names', 'sort_key')
+
+    def __init__(self, version_str, parts, part_names):
+
+        self.version_str = version_str
+        self.parts = parts  # dict of part name to value, e.g. {"MAJOR": "3"}
+        self.part_names = part_names  # in order of the version format
+
+        self.sort_key = tuple([_get_part_sort_key(parts.get(part_name))
+                                for part_name in part_names])
+
+    def __getitem__(self, part_name):
+        return self.parts[part_name]
+
+    def get(self, part_name, default=None):
+        return self.parts.get(part_name, default)
+
+    @property
+    def info(self):
+        # same form as a snapshot's "version_info" dict
+        info_d = {'VER': self.version_str}
+        info_d.update(self.parts)
+        return info_d
+
+    def __eq__(self, other):
+        if not isinstance(other, SwVersion):
+            return NotImplemented
+        return self.sort_key == other.sort_key
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __lt__(self, other):
+        if not isinstance(other, SwVersion):
+            return NotImplemented
+        return self.sort_key < other.sort_key
+
+    def __hash__(self):
+        return hash(self.sort_key)
+
+    def __str__(self):
+        return self.version_str
+
+    def __repr__(self):
+        return 'SwVersion(%r)' % self.version_str
+
+
+class VersionFormat(object):
+
+    _format_by_str = {}
+    _format_lock = threading.Lock()
+
+    def __init__(self, format_str):
+
+        self.format_str = format_str
+
+        self.pattern = '^%s$' % format_str
+        for replace_key in _VER_PART_REPLACE_D.keys():
+            self.pattern = self.pattern.replace(
+                                replace_key, _VER_PART_REPLACE_D[replace_key])
+        self.regex = re.compile(self.pattern)
+
+        # part names in the order they appear in the format
+        self.part_names = tuple(sorted(
+                                self.regex.groupindex.keys(),
+                                key=lambda name: self.regex.groupindex[name]))
+
+        self._version_by_str = {}
+
+    @classmethod
+    def get(cls, format_str):
+
+        # shared, compiled VersionFormat for format_str
+        version_format = cls._format_by_str.get(format_str)
+        if version_format is None:
+            with cls._format_lock:
+                version_format = cls._format_by_str.get(format_str)
+                if version_format is None:
+                    version_format = cls(format_str)
+                    cls._format_by_str[format_str] = version_format
+
+        return version_format
+
+    def parse(self, version_str):
+
+        # SwVersion for version_str, or None if it does not match the format
+        sw_version = self._version_by_str.get(version_str)
+        if sw_version is None:
+            regex_result = self.regex.match(version_str)
+            if not regex_result:
+                return None
+            sw_version = SwVersion(version_str, regex_result.groupdict(),
+                                   self.part_names)
+            if len(self._version_by_str) >= _MAX_CACHED_VERSIONS:
+                self._version_by_str.clear()
+            self._version_by_str[version_str] = sw_version
+
+        return sw_version
+
+
+def parse_sw_version(version_str, format_str):
+
+    return VersionFormat.get(format_str).parse(version_str)
@@ -0,0 +1,85 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.config_cache import ConfigCache
+
+
+if __name__ == '__main__':
+
+    tmp_root = tempfile.mkdtemp(prefix='envr_config_cache_test_')
+    cfg_filepath = os.path.join(tmp_root, 'site_env.json')
+    disk_cache_dir = os.path.join(tmp_root, 'disk_cache')
+
+    try:
+        with open(cfg_filepath, 'w') as out_fp:
+            json.dump([{'var': 'A', 'value': '1'}], out_fp)
+
+        cache = ConfigCache(disk_cache_dir=disk_cache_dir)
+
+        data = cache.load_json(cfg_filepath)
+        assert data == [{'var': 'A', 'value': '1'}]
+        assert cache.get_stats()['misses'] == 1
+
+        # callers may mutate what they get back without corrupting the cache
+        data[0]['site'] = True
+        data = cache.load_json(cfg_filepath)
+        assert 'site' not in data[0]
+        assert cache.get_stats()['memory_hits'] == 1
+
+        # a fresh process (new cache object) is served from the disk tier
+        cache = ConfigCache(disk_cache_dir=disk_cache_dir)
+        data = cache.load_json(cfg_filepath)
+        assert data == [{'var': 'A', 'value': '1'}]
+        assert cache.get_stats()['disk_hits'] == 1
+
+        # changing the source file invalidates both tiers
+        with open(cfg_filepath, 'w') as out_fp:
+            json.dump([{'var': 'A', 'value': '22'}], out_fp)
+        st = os.stat(cfg_filepath)
+        os.utime(cfg_filepath, (st.st_atime, st.st_mtime + 10))
+
+        data = cache.load_json(cfg_filepath)
+        assert data == [{'var': 'A', 'value': '22'}]
+
+        stats_d = cache.get_stats()
+        assert stats_d['misses'] == 1
+        assert stats_d['invalidations'] == 2
+
+        print('')
+        print(':: Config cache stats: %s' % stats_d)
+        print(':: All config cache checks passed.')
+        print('')
+    finally:
+        shutil.rmtree(tmp_root)
@@ -0,0 +1,91 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.renderfarm.deadline_submitters import (
+    DeadlineWebServiceSubmitter, parse_submit_output
+)
+from envrunner.renderfarm.stub_deadline_webservice import (
+    StubDeadlineWebService
+)
+
+
+def build_job_d(job_idx, plugin='ENVRTaskRunner'):
+
+    return {
+        'job_info': {'Name': 'test job %s' % job_idx, 'Plugin': plugin,
+                     'Frames': '1001'},
+        'plugin_info': {'Version': 3.7},
+        'job_info_file': 'deadline_job_info.ini',
+        'plugin_info_file': 'deadline_plugin_info.ini',
+        'aux_files': ['envr_deadline_task_execute.py'],
+    }
+
+
+if __name__ == '__main__':
+
+    # deadlinecommand output, one "Result=" block per job
+    assert parse_submit_output(
+                'Result=Success\nJobID=aaa\n\nResult=Failed\nError: x\n'
+                'Result=Success\nJobID=ccc\n', 3) == ['aaa', None, 'ccc']
+    assert parse_submit_output('', 2) == [None, None]
+
+    with StubDeadlineWebService() as stub:
+
+        submitter = DeadlineWebServiceSubmitter(stub.url, max_connections=2)
+        try:
+            job_id_list = submitter.submit_jobs(
+                                [build_job_d(i) for i in range(20)])
+
+            assert None not in job_id_list
+            assert len(set(job_id_list)) == 20
+            assert len(stub.jobs) == 20
+
+            # submissions are re-using (at most) two keep-alive connections
+            assert stub.stats['requests'] == 20
+            assert stub.stats['connections'] <= 2
+
+            # a rejected job comes back as None, without affecting the rest
+            job_id_list = submitter.submit_jobs(
+                        [build_job_d(20), build_job_d(21, plugin=''),
+                         build_job_d(22)])
+            assert job_id_list[0] and job_id_list[2]
+            assert job_id_list[1] is None
+
+            print('')
+            print(':: Stub web service stats: %s' % stub.stats)
+            print(':: Submitter pool stats: %s' % submitter.pool.stats)
+        finally:
+            submitter.close()
+
+    print(':: All Deadline submitter checks passed.')
+    print('')
@@ -0,0 +1,115 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+# config roots are read when envrunner is imported
+_TMP_ROOT = tempfile.mkdtemp(prefix='envr_derive_env_test_')
+os.environ['ENVR_CFG_ROOT'] = os.path.abspath(
+                                        '%s/envrunner_cfg' % ENVRUNNER_ROOT)
+os.environ['ENVR_ALL_USERS_DATA_ROOT'] = '%s/data' % _TMP_ROOT
+os.environ['ENVR_LOCAL_CACHE_ROOT'] = '%s/local_cache' % _TMP_ROOT
+for _env_var in ('ENVR_CFG_SITE_ROOT', 'ENVR_CFG_PROJECTS_ROOT',
+                 'ENVR_CFG_SW_ENVS_ROOT'):
+    os.environ.pop(_env_var, None)
+
+
+from envrunner.env_mechanism import (
+    EnvRunnerEnv,
+    ENVR_CFG_SITE_ROOT,
+    ENVR_CFG_PROJECTS_ROOT,
+    diff_env_d,
+)
+
+
+def _load_json(filepath):
+
+    with open(filepath, 'r') as in_fp:
+        return json.load(in_fp)
+
+
+def _assert_same_env(derived_env, full_env):
+
+    # envs in different sessions only differ by their session spec file
+    diff_d = diff_env_d(derived_env.resulting_env_d, full_env.resulting_env_d)
+    diff_d['changed'].pop('ENVR_SESSION_SPEC_FILE', None)
+    assert diff_d == {'added': {}, 'removed': {}, 'changed': {}}, diff_d
+
+
+if __name__ == '__main__':
+
+    prj_code = 'prj1'
+    sw_defs_d = _load_json('%s/sw_definitions.json' % ENVR_CFG_SITE_ROOT)
+    site_env_spec_list = []  # site_env.json only has windows PYTHONPATH
+    prj_env_spec_list = _load_json('%s/%s/%s_env.json' % (
+                                ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code))
+    prj_sw_versions_d = _load_json('%s/%s/%s_sw_versions.json' % (
+                                ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code))
+
+    def _full_env(active_sw_list):
+        return EnvRunnerEnv(active_sw_list, sw_defs_d, site_env_spec_list,
+                            prj_code, prj_sw_versions_d, prj_env_spec_list,
+                            use_resolve_cache=False)
+
+    try:
+        base_env = _full_env(['blender'])
+
+        (added_env, diff_d) = base_env.with_sw('fakepypkg')
+        _assert_same_env(added_env, _full_env(['blender', 'fakepypkg']))
+        assert diff_d['added'] and not diff_d['removed']
+
+        (override_env, diff_d) = added_env.with_override('blender', '3.6.2')
+        _assert_same_env(override_env,
+                         _full_env(['blender@v|3.6.2', 'fakepypkg']))
+        assert diff_d['changed']['ENVR_SW_BLENDER__VER'] == ['3.4.1', '3.6.2']
+
+        (removed_env, diff_d) = override_env.without_sw('fakepypkg')
+        _assert_same_env(removed_env, _full_env(['blender@v|3.6.2']))
+        assert diff_d['removed'] and not diff_d['added']
+
+        # a derived env's session spec is only written once it is launched
+        assert not os.path.isfile(removed_env.session_spec_file)
+        removed_env.build_child_env_d()
+        assert os.path.isfile(removed_env.session_spec_file)
+
+        try:
+            base_env.without_sw('fakepypkg')
+            assert False, 'removing an inactive sw must raise'
+        except Exception as err:
+            assert 'is not active' in str(err)
+
+        print('')
+        print(':: All derived env checks passed.')
+        print('')
+    finally:
+        shutil.rmtree(_TMP_ROOT)
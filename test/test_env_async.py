@@ -0,0 +1,178 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import subprocess
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.env_mechanism import EnvRunnerEnv
+
+
+SLEEP_CODE = 'import time; time.sleep(60)'
+
+
+def _is_pid_running(pid):
+
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+async def _check_run(envr_env):
+
+    result_d = await envr_env.async_run(
+                    sys.executable, ['-c', 'import os, sys; '
+                                     'print(os.environ["TEST_ASYNC_VAR"]); '
+                                     'sys.exit(3)'])
+    assert result_d['status'] == 'failed', result_d
+    assert result_d['returncode'] == 3
+    assert result_d['stdout'].strip() == 'async value'
+    assert result_d['error'] is None
+
+    result_d = await envr_env.async_run(sys.executable, ['-c', 'pass'])
+    assert result_d['status'] == 'ok', result_d
+    assert result_d['returncode'] == 0
+
+
+async def _check_timeout(envr_env):
+
+    start_t = time.time()
+    result_d = await envr_env.async_run(sys.executable, ['-c', SLEEP_CODE],
+                                        timeout=0.5)
+    assert result_d['status'] == 'timeout', result_d
+    # killed (terminated), not left running
+    assert result_d['returncode'] is not None and \
+                                    result_d['returncode'] != 0, result_d
+    assert time.time() - start_t < 30.0
+
+    try:
+        await envr_env.async_subprocess_check_call(
+                                    sys.executable, ['-c', SLEEP_CODE],
+                                    timeout=0.5)
+    except asyncio.TimeoutError:
+        pass
+    else:
+        raise Exception('async check_call did not time out')
+
+
+async def _check_cancel(envr_env):
+
+    env_proc = await envr_env.async_launch_subprocess(
+                                    sys.executable, ['-c', SLEEP_CODE])
+    wait_task = asyncio.ensure_future(env_proc.wait())
+    await asyncio.sleep(0.2)
+    assert env_proc.returncode is None
+
+    wait_task.cancel()
+    try:
+        await wait_task
+    except asyncio.CancelledError:
+        pass
+    else:
+        raise Exception('wait() was not cancelled')
+
+    # the child was stopped and reaped before CancelledError was raised
+    assert env_proc.returncode is not None
+    assert env_proc.end_time is not None
+    assert not _is_pid_running(env_proc.pid)
+
+
+async def _check_streaming(envr_env):
+
+    env_proc = await envr_env.async_launch_subprocess(
+                    sys.executable, ['-u', '-c', 'import sys; '
+                                     'print("out 1"); '
+                                     'sys.stderr.write("err 1\\n"); '
+                                     'print("out 2")'])
+    line_list = [item async for item in env_proc.output_lines()]
+    assert sorted(line_list) == [('stderr', 'err 1'), ('stdout', 'out 1'),
+                                 ('stdout', 'out 2')], line_list
+    assert [line for (stream_name, line) in line_list
+                if stream_name == 'stdout'] == ['out 1', 'out 2']
+    assert await env_proc.wait() == 0
+
+
+async def _check_check_call(envr_env):
+
+    assert await envr_env.async_subprocess_check_call(
+                                    sys.executable, ['-c', 'pass']) == 0
+    try:
+        await envr_env.async_subprocess_check_call(
+                        sys.executable, ['-c', 'import sys; sys.exit(4)'])
+    except subprocess.CalledProcessError as e:
+        assert e.returncode == 4
+    else:
+        raise Exception('async check_call did not raise on failure')
+
+
+async def _check_missing_executable(envr_env):
+
+    missing_cmd = 'envr_test_no_such_executable'
+
+    result_d = await envr_env.async_run(missing_cmd, [])
+    assert result_d['status'] == 'error', result_d
+    assert result_d['returncode'] is None
+    assert result_d['error']
+
+    try:
+        await envr_env.async_subprocess_check_call(missing_cmd, [])
+    except OSError:
+        pass
+    else:
+        raise Exception('async check_call started a missing executable')
+
+
+if __name__ == '__main__':
+
+    tmp_root = tempfile.mkdtemp(prefix='envr_async_test_')
+    os.environ['ENVR_ALL_USERS_DATA_ROOT'] = tmp_root
+
+    try:
+        envr_env = EnvRunnerEnv([], {}, [], 'test', {}, [
+                                    {'var': 'TEST_ASYNC_VAR',
+                                     'value': 'async value'},
+                                ], use_resolve_cache=False)
+
+        for check_fn in (_check_run, _check_timeout, _check_cancel,
+                         _check_streaming, _check_check_call,
+                         _check_missing_executable):
+            asyncio.run(check_fn(envr_env))
+
+        print('')
+        print(':: All env async checks passed.')
+        print('')
+    finally:
+        shutil.rmtree(tmp_root)
@@ -0,0 +1,164 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+# config roots are read when envrunner is imported, and install location
+# probes are not cached, so a new install folder is seen right away
+_TMP_ROOT = tempfile.mkdtemp(prefix='envr_env_bundle_test_')
+_CFG_ROOT = '%s/cfg' % _TMP_ROOT
+shutil.copytree('%s/envrunner_cfg' % ENVRUNNER_ROOT, _CFG_ROOT)
+os.environ['ENVR_CFG_ROOT'] = _CFG_ROOT
+os.environ['ENVR_ALL_USERS_DATA_ROOT'] = '%s/data' % _TMP_ROOT
+os.environ['ENVR_LOCAL_CACHE_ROOT'] = '%s/local_cache' % _TMP_ROOT
+os.environ['ENVR_INSTALL_PROBE_TTL'] = '0'
+for _env_var in ('ENVR_CFG_SITE_ROOT', 'ENVR_CFG_PROJECTS_ROOT',
+                 'ENVR_CFG_SW_ENVS_ROOT', 'ENVR_ALL_USERS_SESSIONS_ROOT'):
+    os.environ.pop(_env_var, None)
+
+
+from envrunner.env_mechanism import EnvRunnerEnv
+from envrunner.env_bundle import (
+    ENV_BUNDLE_FORMAT_VERSION,
+    load_env_bundle,
+    write_env_bundle,
+)
+
+
+def _load_json(filepath):
+
+    with open(filepath, 'r') as in_fp:
+        return json.load(in_fp)
+
+
+def _get_comparable_env_d(envr_env):
+
+    # the session spec file is specific to each env
+    env_d = envr_env.get_env_d().copy()
+    env_d.pop('ENVR_SESSION_SPEC_FILE', None)
+    return env_d
+
+
+if __name__ == '__main__':
+
+    prj_code = 'prj1'
+    sw_defs_d = _load_json('%s/site/sw_definitions.json' % _CFG_ROOT)
+    prj_sw_versions_d = _load_json('%s/projects/prj1/prj1_sw_versions.json' %
+                                   _CFG_ROOT)
+
+    # the first install location candidate does not exist (yet)
+    new_install_root = '%s/new_fake_sw/fakepypkg/0.0.1' % _CFG_ROOT
+    sw_defs_d['fakepypkg']['install_location'] = {'_all': [
+        '${ENVR_CFG_ROOT}/new_fake_sw/fakepypkg/{VER}',
+        '${ENVR_CFG_ROOT}/fake_sw/fakepypkg/{VER}',
+    ]}
+
+    extra_env_spec_list = [
+        {'var': 'TEST_BUNDLE_VALUE', 'value': '${TEST_BUNDLE_BASE}/value'},
+    ]
+    os.environ['TEST_BUNDLE_BASE'] = '/first'
+
+    bundle_filepath = '%s/envrunner_env_bundle.json' % _TMP_ROOT
+
+    def _create_env(env_bundle_d=None, extra_spec_list=extra_env_spec_list):
+        return EnvRunnerEnv(['fakepypkg'], sw_defs_d, [], prj_code,
+                            prj_sw_versions_d, [],
+                            extra_env_spec_list=extra_spec_list,
+                            use_resolve_cache=False,
+                            env_bundle_d=env_bundle_d)
+
+    def _assert_resolved_normally(env_bundle_d, **kwargs):
+        envr_env = _create_env(env_bundle_d=env_bundle_d, **kwargs)
+        assert not envr_env.resolved_from_bundle
+        assert _get_comparable_env_d(envr_env) == \
+                            _get_comparable_env_d(_create_env(**kwargs))
+        return envr_env
+
+    try:
+        assert write_env_bundle(_create_env(), bundle_filepath)
+        bundle_d = load_env_bundle(bundle_filepath)
+        assert bundle_d is not None
+
+        # a matching bundle is used as-is
+        envr_env = _create_env(env_bundle_d=bundle_d)
+        assert envr_env.resolved_from_bundle
+        assert _get_comparable_env_d(envr_env) == \
+                                    _get_comparable_env_d(_create_env())
+
+        # --- key mismatch ---
+
+        # different resolve inputs
+        envr_env = _assert_resolved_normally(
+                bundle_d, extra_spec_list=extra_env_spec_list + [
+                            {'var': 'TEST_BUNDLE_EXTRA', 'value': 'extra'}])
+        assert envr_env.get_env_d()['TEST_BUNDLE_EXTRA'] == 'extra'
+
+        # a bundle made from other inputs
+        other_bundle_d = dict(bundle_d)
+        other_bundle_d['fingerprint'] = '0' * len(bundle_d['fingerprint'])
+        _assert_resolved_normally(other_bundle_d)
+
+        # a bundle made on another platform
+        other_bundle_d['platform'] = dict(bundle_d['platform'])
+        other_bundle_d['platform']['os'] = 'other_os'
+        _assert_resolved_normally(other_bundle_d)
+
+        # a bundle file of another format version is not loaded at all
+        other_bundle_d = dict(bundle_d)
+        other_bundle_d['__version__'] = ENV_BUNDLE_FORMAT_VERSION + 1
+        with open(bundle_filepath, 'w') as out_fp:
+            json.dump(other_bundle_d, out_fp)
+        assert load_env_bundle(bundle_filepath) is None
+
+        # --- stamp mismatch ---
+
+        # env var dependency
+        os.environ['TEST_BUNDLE_BASE'] = '/second'
+        envr_env = _assert_resolved_normally(bundle_d)
+        assert envr_env.get_env_d()['TEST_BUNDLE_VALUE'] == '/second/value'
+        os.environ['TEST_BUNDLE_BASE'] = '/first'
+        assert _create_env(env_bundle_d=bundle_d).resolved_from_bundle
+
+        # probe dependency (an install location candidate appears)
+        shutil.copytree('%s/fake_sw/fakepypkg/0.0.1' % _CFG_ROOT,
+                        new_install_root)
+        envr_env = _assert_resolved_normally(bundle_d)
+        assert envr_env.get_sw_install_path('fakepypkg').replace(
+                                    '\\', '/') == new_install_root, \
+                                    envr_env.get_sw_install_path('fakepypkg')
+
+        print('')
+        print(':: All env bundle checks passed.')
+        print('')
+    finally:
+        shutil.rmtree(_TMP_ROOT)
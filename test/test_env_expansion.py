@@ -0,0 +1,147 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.env_expansion import (
+    EnvVarExpander,
+    find_strongly_connected_vars,
+)
+
+
+def _lookup_base_env(env_var):
+
+    return {'BASE_ROOT': '/base'}.get(env_var)
+
+
+if __name__ == '__main__':
+
+    # --- find_strongly_connected_vars ---
+
+    group_list = find_strongly_connected_vars({
+        'SELF': ['SELF'],
+        'A': ['B'],
+        'B': ['C'],
+        'C': ['A'],
+        'D': ['A', 'E'],
+        'E': [],
+    })
+    assert sorted([sorted(g) for g in group_list]) == \
+                        [['A', 'B', 'C'], ['D'], ['E'], ['SELF']], group_list
+
+    # dependency order ... every group comes after the groups it references
+    group_idx_by_var = {}
+    for (group_idx, group) in enumerate(group_list):
+        for var_name in group:
+            group_idx_by_var[var_name] = group_idx
+    assert group_idx_by_var['D'] > group_idx_by_var['A']
+    assert group_idx_by_var['D'] > group_idx_by_var['E']
+
+    # --- EnvVarExpander cycle detection and reporting ---
+
+    value_by_var = {
+        'SELF_REF': '${SELF_REF}/bin',
+        'CYC_A': '${CYC_B}/a',
+        'CYC_B': '${CYC_C}/b',
+        'CYC_C': '${CYC_A}/c',
+        'USES_CYCLE': '${CYC_A}/lib',
+        'OK_ROOT': '${BASE_ROOT}/ok',
+        'OK_BIN': '${OK_ROOT}/bin',
+    }
+
+    expander = EnvVarExpander(value_by_var, lookup_fn=_lookup_base_env)
+    expanded_by_var = expander.expand_all()
+
+    assert sorted(expander.cycle_list) == \
+                    [['CYC_A', 'CYC_B', 'CYC_C'], ['SELF_REF']], \
+                    expander.cycle_list
+    assert expander.get_report()['cycles'] == expander.cycle_list
+
+    # cyclic vars (and anything referencing them) are never complete, and
+    # keep their references back into the cycle as-is
+    assert expanded_by_var['SELF_REF'] == '${SELF_REF}/bin'
+    assert expander.unresolved_refs_by_var['SELF_REF'] == ['SELF_REF']
+    for var_name in ('SELF_REF', 'CYC_A', 'CYC_B', 'CYC_C', 'USES_CYCLE'):
+        assert var_name not in expander.complete_var_set, var_name
+        assert var_name in expander.unresolved_refs_by_var, var_name
+
+    # ... while the rest expands as usual
+    assert expanded_by_var['OK_BIN'] == '/base/ok/bin'
+    assert 'OK_BIN' in expander.complete_var_set
+
+    # a two var cycle
+    expander = EnvVarExpander({'X': '${Y}', 'Y': '${X}'},
+                              lookup_fn=_lookup_base_env)
+    expander.expand_all()
+    assert expander.get_report()['cycles'] == [['X', 'Y']]
+
+    # no cycles
+    expander = EnvVarExpander({'OK_ROOT': '${BASE_ROOT}/ok'},
+                              lookup_fn=_lookup_base_env)
+    expander.expand_all()
+    assert expander.get_report()['cycles'] == []
+
+    # --- cycles carried over, found or broken by incremental expansion ---
+
+    prev_expander = EnvVarExpander(value_by_var, lookup_fn=_lookup_base_env)
+    prev_expander.expand_all()
+
+    # unchanged cycles are reused from the previous expansion
+    changed_value_by_var = dict(value_by_var)
+    changed_value_by_var['OK_BIN'] = '${OK_ROOT}/bin64'
+    expander = EnvVarExpander(changed_value_by_var,
+                              lookup_fn=_lookup_base_env)
+    expander.expand_all(prev_expander)
+    assert 'CYC_A' not in expander.expanded_var_set
+    assert sorted(expander.cycle_list) == sorted(prev_expander.cycle_list)
+
+    # breaking a cycle
+    changed_value_by_var = dict(value_by_var)
+    changed_value_by_var['CYC_C'] = '${BASE_ROOT}/c'
+    expander = EnvVarExpander(changed_value_by_var,
+                              lookup_fn=_lookup_base_env)
+    expanded_by_var = expander.expand_all(prev_expander)
+    assert expander.cycle_list == [['SELF_REF']], expander.cycle_list
+    assert expanded_by_var['USES_CYCLE'] == '/base/c/b/a/lib'
+
+    # creating a new cycle
+    changed_value_by_var = dict(value_by_var)
+    changed_value_by_var['OK_ROOT'] = '${OK_BIN}/..'
+    expander = EnvVarExpander(changed_value_by_var,
+                              lookup_fn=_lookup_base_env)
+    expander.expand_all(prev_expander)
+    assert sorted(expander.cycle_list) == [['CYC_A', 'CYC_B', 'CYC_C'],
+                                           ['OK_BIN', 'OK_ROOT'],
+                                           ['SELF_REF']], expander.cycle_list
+
+    print('')
+    print(':: All env expansion checks passed.')
+    print('')
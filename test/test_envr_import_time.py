@@ -0,0 +1,102 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import subprocess
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+
+# Importing envrunner.envr and calling its sw getters must not pull in any
+# of these (see the note at the top of envr.py)
+_HEAVY_MODULES = [
+    'datetime', 'subprocess', 'shutil', 'html', 'socket', 'getpass',
+    'platform', 'envrunner.os_util',
+]
+
+# generous, the point is to catch a heavy import creeping back in
+_DEFAULT_BUDGET_MS = 25.0
+
+_IMPORT_CODE = ('from envrunner import envr; '
+                'envr.get_sw_install("maya"); envr.get_sw_version("maya")')
+
+
+def get_import_times():
+
+    # Returns {module name: cumulative import time in microseconds}, as
+    # reported by "python -X importtime"
+    child_env_d = dict(os.environ)
+    child_env_d['PYTHONPATH'] = os.pathsep.join(
+                        [os.path.abspath('%s/..' % ENVRUNNER_ROOT)] +
+                        [p for p in [os.getenv('PYTHONPATH')] if p])
+    child_env_d.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    cmd_and_args = [sys.executable, '-X', 'importtime', '-c', _IMPORT_CODE]
+
+    # first run only writes the byte code caches
+    subprocess.check_call(cmd_and_args, env=child_env_d,
+                          stderr=open(os.devnull, 'w'))
+
+    p = subprocess.Popen(cmd_and_args, env=child_env_d,
+                         stderr=subprocess.PIPE)
+    (out, err) = p.communicate()
+    if p.returncode:
+        raise Exception('Importing envrunner.envr failed:\n%s' %
+                        err.decode('utf-8', 'replace'))
+
+    cumulative_by_module = {}
+    for line in err.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        bits = [b.strip() for b in line[len('import time:'):].split('|')]
+        if bits[1].isdigit():
+            cumulative_by_module[bits[2]] = int(bits[1])
+
+    return cumulative_by_module
+
+
+if __name__ == '__main__':
+
+    budget_ms = float(os.getenv('ENVR_IMPORT_TIME_BUDGET_MS',
+                                _DEFAULT_BUDGET_MS))
+
+    cumulative_by_module = get_import_times()
+
+    envr_ms = cumulative_by_module['envrunner.envr'] / 1000.0
+    heavy_module_list = [m for m in _HEAVY_MODULES
+                            if m in cumulative_by_module]
+
+    print('')
+    print(':: envrunner.envr import time: %.2f ms (budget %.2f ms)' % (
+                                                        envr_ms, budget_ms))
+
+    assert not heavy_module_list, (
+                'envrunner.envr now imports: %s' % heavy_module_list)
+    assert envr_ms <= budget_ms, (
+                'envrunner.envr import took %.2f ms' % envr_ms)
+
+    print(':: All envr import time checks passed.')
+    print('')
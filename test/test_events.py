@@ -0,0 +1,135 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner import events
+from envrunner.config_cache import ConfigCache
+from envrunner.env_mechanism import EnvRunnerEnv
+
+
+if __name__ == '__main__':
+
+    tmp_root = tempfile.mkdtemp(prefix='envr_events_test_')
+    os.environ['ENVR_ALL_USERS_DATA_ROOT'] = tmp_root
+    cfg_filepath = os.path.join(tmp_root, 'prj_env.json')
+
+    event_list = []
+
+    def _on_event(event_name, event_d):
+        event_list.append((event_name, event_d))
+
+    def _failing_callback(event_name, event_d):
+        raise Exception('callback failure must not break a launch')
+
+    try:
+        with open(cfg_filepath, 'w') as out_fp:
+            json.dump([
+                {'var': 'TEST_ROOT', 'value': '/test/root'},
+                {'var': 'TEST_SUB', 'value': '${TEST_ROOT}/sub'},
+                {'group': 'NEEDS_MAYA', 'requires': ['maya'],
+                 'spec_list': [{'var': 'TEST_MAYA', 'value': '1'}]},
+            ], out_fp)
+
+        assert not events.has_event_callbacks(events.SNAPSHOT_BUILT)
+
+        events.add_event_callback(events.ALL_EVENTS, _on_event)
+        events.add_event_callback(events.PROCESS_EXITED, _failing_callback)
+
+        prj_env_spec_list = ConfigCache().load_json(cfg_filepath)
+        envr_env = EnvRunnerEnv([], {}, [], 'test', {}, prj_env_spec_list,
+                                use_resolve_cache=False)
+        envr_env.subprocess_check_call(sys.executable, ['-c', 'pass'])
+
+        event_d_by_name = dict(event_list)
+        for event_name in (events.CONFIG_LOADED, events.SESSION_SPEC_WRITTEN,
+                           events.SNAPSHOT_BUILT, events.SPEC_FLATTENED,
+                           events.VARS_EXPANDED, events.PROCESS_SPAWNED,
+                           events.PROCESS_EXITED):
+            assert event_name in event_d_by_name, event_name
+            assert event_d_by_name[event_name]['secs'] >= 0.0
+            assert 'time' in event_d_by_name[event_name]
+
+        assert event_d_by_name[events.CONFIG_LOADED]['source'] == 'file'
+        assert event_d_by_name[events.SPEC_FLATTENED]['groups_skipped'] == 1
+        assert event_d_by_name[events.VARS_EXPANDED]['var_count'] == 4
+        assert event_d_by_name[events.PROCESS_EXITED]['returncode'] == 0
+        assert event_d_by_name[events.PROCESS_EXITED]['pid'] == \
+                                event_d_by_name[events.PROCESS_SPAWNED]['pid']
+
+        # asyncio launches emit the same process events
+        if sys.version_info.major >= 3:
+            import asyncio
+
+            async_start_idx = len(event_list)
+            result_d = asyncio.run(envr_env.async_run(
+                            sys.executable, ['-c', 'import sys; sys.exit(3)']))
+            assert result_d['returncode'] == 3
+            asyncio.run(envr_env.async_subprocess_check_call(
+                                            sys.executable, ['-c', 'pass']))
+
+            process_event_list = [
+                (event_name, event_d) for (event_name, event_d)
+                    in event_list[async_start_idx:] if event_name in (events.PROCESS_SPAWNED,
+                                      events.PROCESS_EXITED)]
+            assert [event_name for (event_name, _) in process_event_list] == [
+                events.PROCESS_SPAWNED, events.PROCESS_EXITED,
+                events.PROCESS_SPAWNED, events.PROCESS_EXITED,
+            ], process_event_list
+            assert process_event_list[0][1]['detach'] is False
+            assert process_event_list[1][1]['returncode'] == 3
+            assert process_event_list[3][1]['returncode'] == 0
+            for idx in (0, 2):
+                assert process_event_list[idx][1]['pid'] == \
+                                        process_event_list[idx + 1][1]['pid']
+                assert process_event_list[idx][1]['cmd'] == sys.executable
+                assert process_event_list[idx + 1][1]['secs'] >= 0.0
+
+        # nothing is emitted once callbacks are removed
+        events.remove_event_callback(events.ALL_EVENTS, _on_event)
+        events.remove_event_callback(events.PROCESS_EXITED, _failing_callback)
+        assert not events.has_event_callbacks(events.PROCESS_EXITED)
+
+        event_count = len(event_list)
+        envr_env.subprocess_check_call(sys.executable, ['-c', 'pass'])
+        assert len(event_list) == event_count
+
+        print('')
+        print(':: Events seen: %s' % ', '.join(
+                                    [event_name for (event_name, _)
+                                        in event_list]))
+        print(':: All event checks passed.')
+        print('')
+    finally:
+        events.clear_event_callbacks()
+        shutil.rmtree(tmp_root)
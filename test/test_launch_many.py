@@ -0,0 +1,99 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.env_mechanism import EnvRunnerEnv
+
+
+def _python_cmd(code):
+
+    return [sys.executable, '-c', code]
+
+
+if __name__ == '__main__':
+
+    tmp_root = tempfile.mkdtemp(prefix='envr_launch_many_test_')
+    os.environ['ENVR_ALL_USERS_DATA_ROOT'] = tmp_root
+
+    try:
+        envr_env = EnvRunnerEnv([], {}, [], 'test', {},
+                                [{'var': 'TEST_GREETING', 'value': 'hello'}],
+                                use_resolve_cache=False)
+
+        result_list = envr_env.launch_many([
+            _python_cmd('import os; print(os.environ["TEST_GREETING"])'),
+            _python_cmd('import sys; sys.exit(3)'),
+            ['%s/no_such_command' % tmp_root],
+            {'command': sys.executable, 'args': ['-c', 'print("dict")']},
+            [sys.executable, 5],  # not a valid arg list
+        ], max_workers=3)
+
+        # in the same order as the commands
+        assert [r['status'] for r in result_list] == \
+                                    ['ok', 'failed', 'error', 'ok', 'error']
+        assert result_list[0]['stdout'].strip() == 'hello'
+        assert result_list[1]['returncode'] == 3
+        assert result_list[2]['error'] and \
+                                    result_list[2]['returncode'] is None
+        assert result_list[3]['stdout'].strip() == 'dict'
+        assert result_list[4]['error']
+
+        # fail_fast ... the running command is terminated and the one that
+        # has not started yet is skipped
+        start_t = time.time()
+        result_list = envr_env.launch_many([
+            _python_cmd('import time; time.sleep(30)'),
+            _python_cmd('import sys, time; time.sleep(0.5); sys.exit(1)'),
+            _python_cmd('print("never run")'),
+        ], max_workers=2, fail_fast=True)
+
+        assert [r['status'] for r in result_list] == \
+                                    ['terminated', 'failed', 'skipped']
+        assert result_list[1]['returncode'] == 1
+        assert time.time() - start_t < 20.0
+
+        # without fail_fast every command runs, and a failure is just that
+        result_list = envr_env.launch_many([
+            _python_cmd('import sys; sys.exit(1)'),
+            _python_cmd('import sys, time; time.sleep(0.5); sys.exit(2)'),
+            _python_cmd('pass'),
+        ], max_workers=1)
+        assert [r['status'] for r in result_list] == ['failed', 'failed', 'ok']
+
+        print('')
+        print(':: All launch_many checks passed.')
+        print('')
+    finally:
+        shutil.rmtree(tmp_root)
@@ -0,0 +1,126 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+# config roots are read when envrunner is imported
+_TMP_ROOT = tempfile.mkdtemp(prefix='envr_pure_env_test_')
+os.environ['ENVR_CFG_ROOT'] = os.path.abspath(
+                                        '%s/envrunner_cfg' % ENVRUNNER_ROOT)
+os.environ['ENVR_ALL_USERS_DATA_ROOT'] = '%s/data' % _TMP_ROOT
+os.environ['ENVR_LOCAL_CACHE_ROOT'] = '%s/local_cache' % _TMP_ROOT
+for _env_var in ('ENVR_CFG_SITE_ROOT', 'ENVR_CFG_PROJECTS_ROOT',
+                 'ENVR_CFG_SW_ENVS_ROOT', 'ENVR_ALL_USERS_SESSIONS_ROOT'):
+    os.environ.pop(_env_var, None)
+
+
+from envrunner.env_mechanism import (
+    EnvRunnerEnv,
+    ENVR_CFG_SITE_ROOT,
+    ENVR_CFG_PROJECTS_ROOT,
+)
+
+
+def _load_json(filepath):
+
+    with open(filepath, 'r') as in_fp:
+        return json.load(in_fp)
+
+
+if __name__ == '__main__':
+
+    prj_code = 'prj1'
+    sw_defs_d = _load_json('%s/sw_definitions.json' % ENVR_CFG_SITE_ROOT)
+    prj_env_spec_list = _load_json('%s/%s/%s_env.json' % (
+                                ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code))
+    prj_sw_versions_d = _load_json('%s/%s/%s_sw_versions.json' % (
+                                ENVR_CFG_PROJECTS_ROOT, prj_code, prj_code))
+
+    site_env_spec_list = [
+        {'single_path': 'TEST_SITE_APPS_ROOT',
+         'value': '${ENVR_ALL_USERS_DATA_ROOT}/site_apps'},
+        {'path': 'TEST_SITE_PATH', 'mode': 'overwrite',
+         'value': {'_all': ['${TEST_SITE_APPS_ROOT}/bin']}},
+        {'var': 'TEST_SITE_DELETED', 'DELETE_ENV_VAR': True},
+    ]
+    extra_env_spec_list = [
+        {'var': 'TEST_TOOL_ROOT', 'value': '${TEST_SITE_APPS_ROOT}/tool'},
+        {'path': 'TEST_SITE_PATH', 'mode': 'pre',
+         'value': {'_all': ['${TEST_TOOL_ROOT}/bin']}},
+    ]
+
+    def _create_env(pure):
+        return EnvRunnerEnv(['blender', 'fakepypkg'], sw_defs_d,
+                            site_env_spec_list, prj_code, prj_sw_versions_d,
+                            prj_env_spec_list,
+                            extra_env_spec_list=extra_env_spec_list,
+                            use_resolve_cache=False, pure=pure)
+
+    try:
+        os.environ['TEST_SITE_DELETED'] = 'still here'
+        os_env_d = dict(os.environ)
+
+        pure_env = _create_env(True)
+
+        # no process env changes and nothing written
+        assert dict(os.environ) == os_env_d
+        assert not os.path.exists(os.environ['ENVR_ALL_USERS_DATA_ROOT'])
+
+        site_apps_root = '%s/site_apps' % os.environ[
+                                                'ENVR_ALL_USERS_DATA_ROOT']
+        assert pure_env.get_env_d()['TEST_SITE_PATH'] == os.pathsep.join([
+                '%s/tool/bin' % site_apps_root, '%s/bin' % site_apps_root])
+
+        # same resolved env as a regular resolve, which does bootstrap the
+        # site env onto os.environ
+        envr_env = _create_env(False)
+        assert os.environ['TEST_SITE_APPS_ROOT'] == site_apps_root
+
+        pure_env_d = dict(pure_env.get_env_d())
+        env_d = dict(envr_env.get_env_d())
+        for resolved_env_d in (pure_env_d, env_d):
+            resolved_env_d.pop('ENVR_SESSION_SPEC_FILE')
+        assert pure_env_d == env_d
+
+        # the session spec is only written once the pure env is launched
+        assert not os.path.isfile(pure_env.session_spec_file)
+        child_env_d = pure_env.build_child_env_d()
+        assert os.path.isfile(pure_env.session_spec_file)
+        assert child_env_d['TEST_SITE_APPS_ROOT'] == site_apps_root
+        assert 'TEST_SITE_DELETED' not in child_env_d
+
+        print('')
+        print(':: All pure env checks passed.')
+        print('')
+    finally:
+        shutil.rmtree(_TMP_ROOT)
@@ -0,0 +1,138 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+# config roots are read when envrunner is imported, and install location
+# probes are not cached, so a new install folder is seen right away
+_TMP_ROOT = tempfile.mkdtemp(prefix='envr_resolve_cache_test_')
+_CFG_ROOT = '%s/cfg' % _TMP_ROOT
+shutil.copytree('%s/envrunner_cfg' % ENVRUNNER_ROOT, _CFG_ROOT)
+os.environ['ENVR_CFG_ROOT'] = _CFG_ROOT
+os.environ['ENVR_ALL_USERS_DATA_ROOT'] = '%s/data' % _TMP_ROOT
+os.environ['ENVR_LOCAL_CACHE_ROOT'] = '%s/local_cache' % _TMP_ROOT
+os.environ['ENVR_INSTALL_PROBE_TTL'] = '0'
+os.environ['ENVR_RESOLVE_DISK_CACHE'] = '0'
+for _env_var in ('ENVR_CFG_SITE_ROOT', 'ENVR_CFG_PROJECTS_ROOT',
+                 'ENVR_CFG_SW_ENVS_ROOT'):
+    os.environ.pop(_env_var, None)
+
+
+from envrunner import os_util
+from envrunner.env_mechanism import EnvRunnerEnv
+from envrunner.resolve_cache import ResolveCache, get_resolve_cache
+
+
+def _load_json(filepath):
+
+    with open(filepath, 'r') as in_fp:
+        return json.load(in_fp)
+
+
+if __name__ == '__main__':
+
+    prj_code = 'prj1'
+    sw_defs_d = _load_json('%s/site/sw_definitions.json' % _CFG_ROOT)
+    prj_sw_versions_d = _load_json('%s/projects/prj1/prj1_sw_versions.json' %
+                                   _CFG_ROOT)
+
+    # the first install location candidate does not exist (yet)
+    new_install_root = '%s/new_fake_sw/fakepypkg/0.0.1' % _CFG_ROOT
+    sw_defs_d['fakepypkg']['install_location'] = {'_all': [
+        '${ENVR_CFG_ROOT}/new_fake_sw/fakepypkg/{VER}',
+        '${ENVR_CFG_ROOT}/fake_sw/fakepypkg/{VER}',
+    ]}
+    env_spec_filepath = '%s/fake_sw/fakepypkg/0.0.1/envrunner_env.json' % \
+                                                                    _CFG_ROOT
+
+    extra_env_spec_list = [
+        {'var': 'TEST_CACHED_VALUE', 'value': '${TEST_CACHE_BASE}/value'},
+    ]
+    os.environ['TEST_CACHE_BASE'] = '/first'
+
+    def _create_env():
+        return EnvRunnerEnv(['fakepypkg'], sw_defs_d, [], prj_code,
+                            prj_sw_versions_d, [],
+                            extra_env_spec_list=extra_env_spec_list)
+
+    def _assert_miss_then_hit():
+        envr_env = _create_env()
+        assert not envr_env.resolved_from_cache
+        cached_env = _create_env()
+        assert cached_env.resolved_from_cache
+        assert cached_env.get_env_d()['TEST_CACHED_VALUE'] == \
+                                    envr_env.get_env_d()['TEST_CACHED_VALUE']
+        return envr_env
+
+    try:
+        _assert_miss_then_hit()
+
+        # env var dependency
+        os.environ['TEST_CACHE_BASE'] = '/second'
+        envr_env = _assert_miss_then_hit()
+        assert envr_env.get_env_d()['TEST_CACHED_VALUE'] == '/second/value'
+
+        # file dependency (the sw env spec file)
+        with open(env_spec_filepath, 'a') as out_fp:
+            out_fp.write('\n')
+        _assert_miss_then_hit()
+
+        # probe dependency (an install location candidate appears)
+        shutil.copytree('%s/fake_sw/fakepypkg/0.0.1' % _CFG_ROOT,
+                        new_install_root)
+        envr_env = _assert_miss_then_hit()
+        assert envr_env.get_sw_install_path('fakepypkg').replace(
+                                    '\\', '/') == new_install_root, \
+                                    envr_env.get_sw_install_path('fakepypkg')
+
+        assert get_resolve_cache().get_stats()['invalidations'] == 3
+
+        # env deps are looked up the way they were stored, i.e. upper case
+        # on Windows, also in a plain dict base env (e.g. of a pure env)
+        resolve_cache = ResolveCache()
+        resolve_cache.store('test_key', {'env_deps': {'Test_Mixed': 'v'},
+                                         'fs_deps': {}, 'probe_deps': {}},
+                            persist=False)
+        real_os = os_util.os_info.os
+        os_util.os_info.os = 'windows'
+        try:
+            assert resolve_cache.lookup('test_key', {'TEST_MIXED': 'v'})
+            assert not resolve_cache.lookup('test_key', {'TEST_MIXED': 'w'})
+        finally:
+            os_util.os_info.os = real_os
+
+        print('')
+        print(':: All resolve cache checks passed.')
+        print('')
+    finally:
+        shutil.rmtree(_TMP_ROOT)
@@ -0,0 +1,165 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+
+from types import MappingProxyType
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.os_util import fslash
+from envrunner.resolve_cache import get_fs_dep_state
+from envrunner.spec_includes import SpecIncludeResolver
+
+
+def _write_json(filepath, data):
+
+    with open(filepath, 'w') as out_fp:
+        json.dump(data, out_fp)
+
+
+def _get_cycle_error(resolver, filepath, env_spec_list):
+
+    try:
+        resolver.resolve(filepath, env_spec_list, get_fs_dep_state)
+    except Exception as e:
+        return str(e)
+    return None
+
+
+if __name__ == '__main__':
+
+    tmp_dir = fslash(os.path.realpath(tempfile.mkdtemp(
+                                        prefix='envr_spec_includes_test_')))
+    try:
+        os.makedirs('%s/sub' % tmp_dir)
+
+        main_filepath = '%s/main_env.json' % tmp_dir
+        common_filepath = '%s/inc_common.json' % tmp_dir
+        shared_filepath = '%s/sub/inc_shared.json' % tmp_dir
+
+        _write_json(common_filepath, [
+            {'var': 'COMMON_VAR', 'value': 'common'},
+            {'INCLUDES': ['./sub/inc_shared.json']},
+        ])
+        _write_json(shared_filepath, [
+            {'var': 'SHARED_PATH', 'path_list': ['${@INSTALL}/lib']},
+        ])
+
+        resolver = SpecIncludeResolver()
+
+        # --- includes, relative paths and diamonds (not a cycle) ---
+
+        main_spec_list = [
+            {'var': 'MAIN_VAR', 'value': 'main'},
+            {'INCLUDES': ['./inc_common.json', './sub/inc_shared.json']},
+        ]
+        spec_list = resolver.resolve(main_filepath, main_spec_list,
+                                     get_fs_dep_state)
+        assert spec_list == [
+            {'var': 'MAIN_VAR', 'value': 'main'},
+            {'var': 'COMMON_VAR', 'value': 'common'},
+            {'var': 'SHARED_PATH', 'path_list': ['${@INSTALL}/lib']},
+            {'var': 'SHARED_PATH', 'path_list': ['${@INSTALL}/lib']},
+        ], spec_list
+
+        # --- include cycles ---
+
+        # a file including itself
+        self_inc_filepath = '%s/inc_self.json' % tmp_dir
+        _write_json(self_inc_filepath, [{'INCLUDES': ['./inc_self.json']}])
+        error_msg = _get_cycle_error(resolver, main_filepath,
+                                     [{'INCLUDES': ['./inc_self.json']}])
+        assert error_msg == 'Cycle found in env spec INCLUDES: %s -> %s' % (
+                            self_inc_filepath, self_inc_filepath), error_msg
+
+        # a cycle through several files, entered from the main spec file
+        cyc_a_filepath = '%s/inc_cyc_a.json' % tmp_dir
+        cyc_b_filepath = '%s/sub/inc_cyc_b.json' % tmp_dir
+        _write_json(cyc_a_filepath, [{'INCLUDES': ['./sub/inc_cyc_b.json']}])
+        _write_json(cyc_b_filepath, [{'INCLUDES': ['../inc_cyc_a.json']}])
+        error_msg = _get_cycle_error(resolver, main_filepath,
+                                     [{'INCLUDES': ['./inc_cyc_a.json']}])
+        assert error_msg == \
+                'Cycle found in env spec INCLUDES: %s -> %s -> %s' % (
+                    cyc_a_filepath, cyc_b_filepath, cyc_a_filepath), error_msg
+
+        # a cycle back to the main spec file itself
+        _write_json(cyc_b_filepath, [{'INCLUDES': ['../main_env.json']}])
+        error_msg = _get_cycle_error(resolver, main_filepath,
+                                     [{'INCLUDES': ['./inc_cyc_a.json']}])
+        assert error_msg == \
+                'Cycle found in env spec INCLUDES: %s -> %s -> %s -> %s' % (
+                    main_filepath, cyc_a_filepath, cyc_b_filepath,
+                    main_filepath), error_msg
+
+        # --- frozen cache is immune to caller mutation ---
+
+        frozen_spec_list = resolver.load_spec_file(
+                                common_filepath,
+                                get_fs_dep_state(common_filepath))
+        assert type(frozen_spec_list) is tuple
+        assert type(frozen_spec_list[0]) is MappingProxyType
+        for mutate_fn in (
+                lambda: frozen_spec_list.append({}),
+                lambda: frozen_spec_list[0].__setitem__('value', 'changed'),
+                lambda: frozen_spec_list[1]['INCLUDES'].append('x.json')):
+            try:
+                mutate_fn()
+            except (TypeError, AttributeError):
+                pass
+            else:
+                raise Exception('Cached spec data could be mutated')
+
+        # resolved spec lists are mutable copies, changing one (as "${@"
+        # expansion does) never shows up in later resolves
+        spec_list = resolver.resolve(main_filepath, main_spec_list,
+                                     get_fs_dep_state)
+        spec_list[1]['value'] = 'changed'
+        spec_list[2]['path_list'][0] = '/changed/lib'
+        spec_list.append({'var': 'EXTRA_VAR', 'value': 'extra'})
+
+        hit_count = resolver.get_stats()['hits']
+        spec_list = resolver.resolve(main_filepath, main_spec_list,
+                                     get_fs_dep_state)
+        assert resolver.get_stats()['hits'] > hit_count
+        assert spec_list[1] == {'var': 'COMMON_VAR', 'value': 'common'}
+        assert spec_list[2]['path_list'] == ['${@INSTALL}/lib']
+        assert spec_list[3]['path_list'] == ['${@INSTALL}/lib']
+        assert len(spec_list) == 4
+        assert frozen_spec_list[0]['value'] == 'common'
+
+        print('')
+        print(':: All spec includes checks passed.')
+        print('')
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,76 @@
+# -----------------------------------------------------------------------------
+# MIT License
+#
+# Copyright (c) 2023 pxlc
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+# -----------------------------------------------------------------------------
+
+
+import os
+import re
+import sys
+
+ENVRUNNER_ROOT = '%s/..' % os.path.dirname(os.path.abspath(__file__))
+
+sys.path.append('%s/..' % ENVRUNNER_ROOT)
+
+
+from envrunner.renderfarm.stdout_classifier import (
+    ERROR,
+    StdoutClassifier,
+    get_pattern_literals,
+)
+
+
+if __name__ == '__main__':
+
+    # literals of a scoped case-insensitive group are not required as-is
+    assert get_pattern_literals('(?i:fatal error)') is None
+    assert get_pattern_literals('(?:(?i:fatal)|abort)') is None
+    assert get_pattern_literals('Error: (?i:fatal)') == set(['Error: '])
+    assert get_pattern_literals('(?i)fatal error') is None
+    assert get_pattern_literals('fatal error') == set(['fatal error'])
+
+    line_list = [
+        'FATAL ERROR happened',
+        'Fatal Error: disk full',
+        'Error: FATAL',
+        'error: fatal',
+        'Abort requested',
+        'nothing to see here',
+    ]
+
+    for error_pattern in ('(?i:fatal error)', 'Error: (?i:fatal)',
+                          '(?:(?i:fatal)|Abort)', '(?i)abort'):
+        classifier = StdoutClassifier(error_regex_list=[error_pattern],
+                                      use_default_patterns=False)
+        candidate_regex = re.compile(classifier.candidate_line_pattern)
+        for line in line_list:
+            is_error = re.search(error_pattern, line) is not None
+            match_list = classifier.classify(line)
+            assert (ERROR in [m.category for m in match_list]) == is_error, \
+                        (error_pattern, line)
+            if is_error:
+                # the Deadline stdout handler must hand the line over too
+                assert candidate_regex.match(line), (error_pattern, line)
+
+    print('')
+    print(':: All stdout classifier checks passed.')
+    print('')